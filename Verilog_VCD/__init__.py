@@ -4,22 +4,45 @@
 # This is a manual translation, from perl to python, of :
 # http://cpansearch.perl.org/src/GSULLIVAN/Verilog-VCD-0.03/lib/Verilog/VCD.pm
 
+import bisect
+import heapq
+import io
+import itertools
+import mmap
+import multiprocessing
 import re
+import sys
+from array import array
+
+from .compact import Net, ValueTable, TVList, CompactSignal
+from .cache import index_path, file_key, write_index, read_index
+from .timeindex import TimeIndex, NO_VALUE, time_index_path, \
+                       write_time_index, read_time_index
+from .compressed import FORMATS, detect, open_vcd_file, compress_file
+from .fingerprint import SignalHash, Fingerprints, FingerprintHasher, \
+                         fingerprint_path, write_fingerprints, \
+                         read_fingerprints
+from .fourstate import pack, unpack, value_size
 
 global timescale
 global endtime
 
+# size of the blocks the value change section is scanned in
+CHUNK_SIZE = 1 << 24
+# bytes of the value change section between time index checkpoints
+CHECKPOINT_SIZE = CHUNK_SIZE
+
 
 # our local exception for VCD parsing errors (inherited from Exception)
 class VCDParseError(Exception):
     pass
 
 
-def list_sigs(file):
+def list_sigs(file, scope=None):
     """Parse input VCD file into data structure,
     then return just a list of the signal names."""
 
-    vcd = parse_vcd(file, only_sigs=1)
+    vcd = parse_vcd(file, only_sigs=1, scope=scope)
 
     sigs = []
     for k in vcd.keys():
@@ -30,7 +53,30 @@ def list_sigs(file):
     return sigs
 
 
-def parse_vcd(file, only_sigs=0, use_stdout=0, siglist=[], opt_timescale=''):
+def scope_exact(path):
+    """Return a scope predicate selecting only the signals declared
+    directly in the scope path, e.g. 'top' or 'top.cpu'."""
+
+    return lambda hier: hier == path
+
+
+def scope_prefix(path):
+    """Return a scope predicate selecting the signals declared in the
+    scope path and in every scope below it."""
+
+    sub = path + '.'
+    return lambda hier: hier == path or hier.startswith(sub)
+
+
+def scope_depth(max_depth):
+    """Return a scope predicate selecting the signals declared at most
+    max_depth scopes deep. Top-level scopes have a depth of 1."""
+
+    return lambda hier: (hier.count('.') + 1 if hier else 0) <= max_depth
+
+
+def parse_vcd(file, only_sigs=0, use_stdout=0, siglist=[], opt_timescale='',
+        scope=None, compact=0, jobs=1):
     """Parse input VCD file into data structure.
     Also, print t-v pairs to STDOUT, if requested."""
 
@@ -46,14 +92,20 @@ def parse_vcd(file, only_sigs=0, use_stdout=0, siglist=[], opt_timescale=''):
         all_sigs = 1
 
     data = {}
-    mult = 0
+    registry = set()
+    table = ValueTable()
+    # times are kept as written until a $timescale says otherwise, as in
+    #   VCDStream
+    mult = 1
     num_sigs = 0
     hier = []
+    # whether the scope predicate selects each open scope
+    selected = [scope is None or scope('')]
     time = 0
 
-    with open(file, 'r') as fh:
+    with open_vcd_file(file, 'rb') as fh:
         while True:
-            line = fh.readline()
+            line = fh.readline().decode('latin-1')
             if line == '': # EOF
                 break
 
@@ -72,6 +124,8 @@ def parse_vcd(file, only_sigs=0, use_stdout=0, siglist=[], opt_timescale=''):
                 if (code in data):
                     if (use_stdout):
                         print( time, value )
+                    elif (compact):
+                        data[code].append( time, value )
                     else:
                         if 'tv' not in data[code]:
                             data[code]['tv'] = []
@@ -83,6 +137,8 @@ def parse_vcd(file, only_sigs=0, use_stdout=0, siglist=[], opt_timescale=''):
                 if (code in data):
                     if (use_stdout):
                         print( time, value )
+                    elif (compact):
+                        data[code].append( time, value )
                     else:
                         if 'tv' not in data[code]:
                             data[code]['tv'] = []
@@ -113,11 +169,26 @@ def parse_vcd(file, only_sigs=0, use_stdout=0, siglist=[], opt_timescale=''):
                 if only_sigs:
                     break
 
+                # from here on, only value changes and time stamps are left
+                if not use_stdout:
+                    ranges = None
+                    if jobs > 1 and len(data) and \
+                            not multiprocessing.current_process().daemon:
+                        ranges = _split_ranges(fh, jobs)
+                    if ranges and len(ranges) > 1:
+                        last_time = _parse_parallel(file, ranges, data, mult,
+                                                    compact, jobs)
+                    else:
+                        last_time = _parse_changes(fh, data, mult, compact)
+                    if last_time is not None:
+                        endtime = last_time
+                    break
+
             elif "$timescale" in line:
                 statement = line
                 if not "$end" in line:
                     while fh:
-                        line = fh.readline()
+                        line = fh.readline().decode('latin-1')
                         statement += line
                         if "$end" in line:
                             break
@@ -128,40 +199,1147 @@ def parse_vcd(file, only_sigs=0, use_stdout=0, siglist=[], opt_timescale=''):
                 # assumes all on one line
                 #   $scope module dff end
                 hier.append( line.split()[2] ) # just keep scope name
+                selected.append( scope is None or scope('.'.join(hier)) )
 
             elif "$upscope" in line:
                 hier.pop()
+                selected.pop()
 
             elif "$var" in line:
-                # assumes all on one line:
-                #   $var reg 1 *@ data $end
-                #   $var wire 4 ) addr [3:0] $end
-                ls = line.split()
-                type = ls[1]
-                size = ls[2]
-                code = ls[3]
-                name = "".join(ls[4:-1])
-                path = '.'.join(hier)
-                full_name = path + '.' + name
-                if (full_name in usigs) or all_sigs:
+                # codes outside the scope are never registered, so their
+                #   value changes are skipped by the code lookup above
+                if not selected[-1]:
+                    continue
+                (code, var_struct) = parse_var(line, hier)
+                full_name = var_struct['hier'] + '.' + var_struct['name']
+                if ((full_name in usigs) or all_sigs) and compact:
+                  if code not in data:
+                      time_type = 'q' if isinstance(mult, int) else 'd'
+                      data[code] = CompactSignal(table, time_type)
+                  _register_net(registry, data[code].nets, code,
+                                Net(**var_struct))
+                elif (full_name in usigs) or all_sigs:
                   if code not in data:
                       data[code] = {}
                   if 'nets' not in data[code]:
                       data[code]['nets'] = []
-                  var_struct = {
-                      'type' : type,
-                      'name' : name,
-                      'size' : size,
-                      'hier' : path,
-                   }
-                  if var_struct not in data[code]['nets']:
-                      data[code]['nets'].append( var_struct )
+                  _register_net(registry, data[code]['nets'], code,
+                                var_struct)
 
     fh.close()
 
     return data
 
 
+def _mmap(fh):
+    """Memory-map the binary file fh. Return None if it is not a plain
+    regular file: decompressing readers report the descriptor of the
+    compressed file, which must not be mapped."""
+
+    if not isinstance(fh, io.BufferedReader):
+        return None
+    try:
+        return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, IOError, OSError, ValueError):
+        # not a regular file, or an empty one
+        return None
+
+
+def _chunks(fh, chunk_size=CHUNK_SIZE, start=None, end=None):
+    """Yield the rest of the binary file fh, or the byte range [start, end)
+    of it, in blocks of about chunk_size bytes that end at line boundaries.
+    Regular files are memory-mapped, anything else is read sequentially."""
+
+    mm = _mmap(fh)
+    if mm is not None:
+        try:
+            pos = fh.tell() if start is None else start
+            size = len(mm) if end is None else min(end, len(mm))
+            while pos < size:
+                stop = pos + chunk_size
+                if stop < size:
+                    stop = mm.find(b'\n', stop, size)
+                    stop = size if stop < 0 else stop + 1
+                else:
+                    stop = size
+                yield mm[pos:stop]
+                pos = stop
+        finally:
+            mm.close()
+        return
+
+    rest = b''
+    while True:
+        buf = fh.read(chunk_size)
+        if not buf:
+            if rest:
+                yield rest
+            return
+        buf = rest + buf
+        cut = buf.rfind(b'\n') + 1
+        (rest, buf) = (buf[cut:], buf[:cut])
+        if buf:
+            yield buf
+
+
+# first bytes of value change lines
+_SCALARS = dict((ord(c), c) for c in '01xXzZ')
+_VECTORS = frozenset(ord(c) for c in 'bBrR')
+_HASH = ord('#')
+_SPACE = ord(' ')
+_NEWLINE = ord('\n')
+_SPACES = b' \t\r\n'
+
+# up to this many selected codes, the lines of each code may be searched for
+#   with bytes.find, which skips all other lines without looking at them
+FIND_MAX_CODES = 8
+# the lines of a code are found through one of its bytes if, in the first
+#   ANCHOR_SAMPLE bytes of a block, that byte occurs at most once every
+#   ANCHOR_SPACING bytes; otherwise the whole code is searched for, in one
+#   pass over the block per code
+ANCHOR_SAMPLE = 1 << 16
+ANCHOR_SPACING = 256
+# a pass over a block costs about as much as splitting FIND_LINE_BYTES bytes
+#   of it into lines, so the passes of the codes without a rare byte must
+#   not add up to more than that per line
+FIND_LINE_BYTES = 384
+# a line found by searching costs a few times more than a line split off, so
+#   codes are only searched for if at most one line in FIND_SPARSE of the
+#   sample is theirs
+FIND_SPARSE = 8
+# up to this many selected codes, blocks whose lines average at most
+#   REGEX_MAX_LINE bytes are scanned with a regular expression that only
+#   matches their lines and the time stamps; blocks of longer lines are
+#   split into lines
+REGEX_MAX_CODES = 32
+REGEX_MAX_LINE = 24
+# byte sequences that simulators never write in the value change section:
+#   blocks with any of them are not searched for codes
+_IRREGULAR = (b'\r', b'\t', b' \n', b'\n ')
+_STAMP = re.compile(br'#(\d+)\n')
+_STAMPS = re.compile(br'\n#(\d+)')
+
+
+def _changes_regex(codes):
+    """Compile a regular expression matching the time stamp lines and the
+    value change lines of the given identifier codes only."""
+
+    alt = b'|'.join(re.escape(c) for c in sorted(codes, key=len, reverse=True))
+    # the value is matched atomically, as a lookahead group and a reference
+    #   to it, so that a line of another code fails without backtracking
+    #   through every shorter prefix of its value
+    return re.compile(br'^[ \t]*(?:#(\d+)|([01xXzZ])(' + alt + br')|'
+            br'[bBrR](?=(\S+))\4[ \t]+(' + alt + br'))[ \t\r]*$', re.M)
+
+
+def _anchor(sample, code):
+    """Return the index of the byte of code that is rare enough in the
+    bytes sample to search for, or None if none is."""
+
+    (count, k) = min((sample.count(code[k:k + 1]), k)
+                     for k in range(len(code)))
+    if count * ANCHOR_SPACING > len(sample):
+        return None
+    return k
+
+
+def _code_lines(buf, code, k):
+    """Yield the offset of every occurrence of code followed by a newline
+    in the block of bytes buf. If k is not None, the occurrences are found
+    by searching for the byte code[k], which skips the other lines at the
+    speed of memchr."""
+
+    needle = code + b'\n'
+    find = buf.find
+    if k is None:
+        pos = find(needle)
+        while pos >= 0:
+            yield pos
+            pos = find(needle, pos + len(needle))
+        return
+
+    anchor = code[k:k + 1]
+    startswith = buf.startswith
+    pos = find(anchor, k)
+    while pos >= 0:
+        if startswith(needle, pos - k):
+            yield pos - k
+        pos = find(anchor, pos + 1)
+
+
+def _find_changes(chunk, anchors, targets, mult, compact, time):
+    """Feed the value changes in the block of bytes chunk to the append
+    functions in targets, by searching for the lines ending with each code,
+    through the byte given by anchors. The block must hold whole lines
+    written without carriage returns, tabs, indentation or trailing spaces.
+    time is the time in effect at the start of the block. Return the time
+    at the end of the block, and its last time stamp or None."""
+
+    buf = chunk if chunk.endswith(b'\n') else chunk + b'\n'
+    # offsets and times of the time stamps
+    stamps = []
+    times = []
+    first = _STAMP.match(buf)
+    if first:
+        stamps.append(0)
+        times.append(mult * int(first.group(1)))
+    for match in _STAMPS.finditer(buf):
+        stamps.append(match.start() + 1)
+        times.append(mult * int(match.group(1)))
+
+    for (code, target) in targets.items():
+        for pos in _code_lines(buf, code, anchors[code]):
+            if pos == 0:
+                continue
+            c = buf[pos - 1]
+            if c == _SPACE:
+                # the end of a vector line, unless it is some keyword line
+                start = buf.rfind(b'\n', 0, pos) + 1
+                if buf[start] not in _VECTORS:
+                    continue
+                value = buf[start + 1:pos - 1].decode('latin-1')
+            elif c in _SCALARS and (pos == 1 or buf[pos - 2] == _NEWLINE):
+                value = _SCALARS[c]
+            else:
+                # the end of a longer code
+                continue
+            n = bisect.bisect(stamps, pos)
+            stamp = times[n - 1] if n else time
+            if compact:
+                target(stamp, value)
+            else:
+                target( (stamp, value) )
+
+    if times:
+        return (times[-1], times[-1])
+    return (time, None)
+
+
+def _regex_changes(chunk, pattern, get, mult, compact, time):
+    """Feed the value changes in the block of bytes chunk to the append
+    functions returned by get, for the lines matched by pattern. time is the
+    time in effect at the start of the block. Return the time at the end of
+    the block, and its last time stamp or None."""
+
+    last_time = None
+    for (stamp, svalue, scode, vvalue, vcode) in pattern.findall(chunk):
+        if stamp:
+            time = mult * int(stamp)
+            last_time = time
+        elif scode:
+            if compact:
+                get(scode)(time, svalue.decode('latin-1'))
+            else:
+                get(scode)( (time, svalue.decode('latin-1')) )
+        else:
+            if compact:
+                get(vcode)(time, vvalue.decode('latin-1'))
+            else:
+                get(vcode)( (time, vvalue.decode('latin-1')) )
+    return (time, last_time)
+
+
+def _line_changes(chunk, get, mult, compact, time):
+    """Feed the value changes in the block of bytes chunk to the append
+    functions returned by get, line by line. time is the time in effect at
+    the start of the block. Return the time at the end of the block, and its
+    last time stamp or None."""
+
+    last_time = None
+    scalar = _SCALARS.get
+    for line in chunk.splitlines():
+        if not line:
+            continue
+        c = line[0]
+        value = scalar(c)
+        if value is not None:
+            target = get(line[1:])
+            if target is None:
+                if line[-1] not in _SPACES:
+                    continue
+                target = get(line[1:].strip())
+                if target is None:
+                    continue
+            if compact:
+                target(time, value)
+            else:
+                target( (time, value) )
+        elif c == _HASH:
+            time = mult * int(line[1:])
+            last_time = time
+        elif c in _VECTORS:
+            (value, code) = line[1:].split()
+            target = get(code)
+            if target is None:
+                continue
+            if compact:
+                target(time, value.decode('latin-1'))
+            else:
+                target( (time, value.decode('latin-1')) )
+        elif c in _SPACES:
+            # indented lines are rare, give them another go
+            line = line.strip()
+            if line and line[0] not in _SPACES:
+                stamp = _parse_one(line, get, mult, compact, time)
+                if stamp is not None:
+                    time = last_time = stamp
+        # anything else is a keyword line: $dumpvars, $end, ...
+    return (time, last_time)
+
+
+def _targets(data, compact):
+    """Map the identifier codes of data, as bytes, to the append functions
+    of their time-value storage."""
+
+    targets = {}
+    for code in data:
+        if compact:
+            targets[code.encode('latin-1')] = data[code].append
+        else:
+            data[code]['tv'] = []
+            targets[code.encode('latin-1')] = data[code]['tv'].append
+    return targets
+
+
+def _drop_empty(data, compact):
+    """Keep the 'tv' key only for codes that changed, as parse_vcd always
+    did."""
+
+    if not compact:
+        for code in data:
+            if len(data[code]['tv']) == 0:
+                del data[code]['tv']
+
+
+def _parse_changes(fh, data, mult, compact):
+    """Fast path of parse_vcd for the value change section, which starts at
+    the current position of the binary file fh. Works on raw bytes, and only
+    decodes the values of the codes registered in data. Return the last
+    time stamp, or None if there was none."""
+
+    last_time = _scan_changes(_chunks(fh), _targets(data, compact), mult,
+                              compact)
+    _drop_empty(data, compact)
+    return last_time
+
+
+def _scan_changes(chunks, targets, mult, compact):
+    """Feed the value changes in the blocks of bytes chunks to the append
+    functions in targets. Return the last time stamp, or None if there was
+    none.
+
+    Each block goes the cheapest of three ways: few selected codes are
+    searched for, skipping all other lines at the speed of a byte search;
+    blocks of short lines are scanned with a regular expression matching
+    only the selected lines; blocks of long lines, or any block when many
+    codes are selected, are split into lines."""
+
+    get = targets.get
+    time = 0
+    last_time = None
+    if not targets:
+        return None
+    pattern = None
+    for chunk in chunks:
+        sample = chunk[:ANCHOR_SAMPLE]
+        line_size = len(sample) / max(1, sample.count(b'\n'))
+        if len(targets) <= FIND_MAX_CODES and \
+                not any(seq in chunk for seq in _IRREGULAR):
+            anchors = dict((code, _anchor(sample, code)) for code in targets)
+            passes = sum(1 for k in anchors.values() if k is None)
+            found = sum(sample.count(code + b'\n') for code in targets)
+            if passes * line_size <= FIND_LINE_BYTES and \
+                    found * FIND_SPARSE <= len(sample) / line_size:
+                (time, stamp) = _find_changes(chunk, anchors, targets, mult,
+                                              compact, time)
+                if stamp is not None:
+                    last_time = stamp
+                continue
+        if len(targets) <= REGEX_MAX_CODES and line_size <= REGEX_MAX_LINE:
+            if pattern is None:
+                pattern = _changes_regex(targets)
+            (time, stamp) = _regex_changes(chunk, pattern, get, mult, compact,
+                                           time)
+        else:
+            (time, stamp) = _line_changes(chunk, get, mult, compact, time)
+        if stamp is not None:
+            last_time = stamp
+
+    return last_time
+
+
+def _split_ranges(fh, jobs, min_size=None):
+    """Split the rest of the binary file fh into at most jobs byte ranges of
+    at least about min_size bytes, CHUNK_SIZE by default. Every range but
+    the first starts at a time stamp line, so it can be parsed without
+    knowing what came before. Return a list of (start, end) pairs, or None
+    if fh cannot be memory-mapped."""
+
+    if min_size is None:
+        min_size = CHUNK_SIZE
+    mm = _mmap(fh)
+    if mm is None:
+        return None
+
+    try:
+        start = fh.tell()
+        size = len(mm)
+        jobs = max(1, min(jobs, (size - start) // max(1, min_size)))
+        step = (size - start) // jobs
+        bounds = [start]
+        for i in range(1, jobs):
+            pos = mm.find(b'\n#', max(bounds[-1], start + i * step))
+            if pos < 0:
+                break
+            bounds.append(pos + 1)
+        bounds.append(size)
+    finally:
+        mm.close()
+
+    return [(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1)
+            if bounds[i] < bounds[i + 1]]
+
+
+def _parse_range(args):
+    """Pool worker of _parse_parallel: parse the value changes of the codes
+    given in a byte range of file. Return the time-value storage of every
+    code that changed, the values table in compact mode, and the last time
+    stamp of the range."""
+
+    (file, start, end, codes, mult, compact) = args
+    table = ValueTable()
+    time_type = 'q' if isinstance(mult, int) else 'd'
+    data = {}
+    for code in codes:
+        data[code] = CompactSignal(table, time_type) if compact else {}
+
+    with open(file, 'rb') as fh:
+        last_time = _scan_changes(_chunks(fh, start=start, end=end),
+                                  _targets(data, compact), mult, compact)
+
+    if compact:
+        result = dict((code, (sig.times, sig.index))
+                      for (code, sig) in data.items() if len(sig.times))
+        return (result, table.values, last_time)
+    result = dict((code, sig['tv']) for (code, sig) in data.items()
+                  if len(sig['tv']))
+    return (result, None, last_time)
+
+
+def _parse_parallel(file, ranges, data, mult, compact, jobs):
+    """Parse the value change section of file, split into byte ranges by
+    _split_ranges, in a pool of jobs processes, and merge the results into
+    data in time order. Return the last time stamp, or None if there was
+    none."""
+
+    args = [(file, start, end, list(data), mult, compact)
+            for (start, end) in ranges]
+    pool = multiprocessing.Pool(min(jobs, len(ranges)))
+    try:
+        # imap keeps the ranges in file order, so extending each signal's
+        #   changes range by range keeps them sorted by time
+        for code in data:
+            if not compact:
+                data[code]['tv'] = []
+        last_time = None
+        for (result, values, range_time) in pool.imap(_parse_range, args):
+            if compact and len(result):
+                # the ranges have their own value tables, renumber into ours
+                table = next(iter(data.values())).table
+                remap = array('I', [table.intern(v) for v in values])
+                identity = all(remap[i] == i for i in range(len(remap)))
+                for (code, (times, index)) in result.items():
+                    data[code].times.extend(times)
+                    if identity:
+                        data[code].index.extend(index)
+                    else:
+                        data[code].index.extend(remap[i] for i in index)
+            else:
+                for (code, tv) in result.items():
+                    data[code]['tv'].extend(tv)
+            if range_time is not None:
+                last_time = range_time
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+    _drop_empty(data, compact)
+    return last_time
+
+
+def _parse_one(line, get, mult, compact, time):
+    """Handle a single stripped value change or time stamp line for
+    _scan_changes. Return the time of a time stamp line, or None for any
+    other line."""
+
+    c = line[0]
+    if c == _HASH:
+        return mult * int(line[1:])
+    elif c in _SCALARS:
+        (code, value) = (line[1:].strip(), _SCALARS[c])
+    elif c in _VECTORS:
+        (value, code) = line[1:].split()
+        value = value.decode('latin-1')
+    else:
+        return None
+    target = get(code)
+    if target is not None:
+        if compact:
+            target(time, value)
+        else:
+            target( (time, value) )
+    return None
+
+
+def parse_var(line, hier):
+    """Parse a single-line $var declaration within the scope stack hier.
+    Return the identifier code and the net structure for the signal."""
+
+    # assumes all on one line:
+    #   $var reg 1 *@ data $end
+    #   $var wire 4 ) addr [3:0] $end
+    ls = line.split()
+    var_struct = {
+        'type' : ls[1],
+        'name' : "".join(ls[4:-1]),
+        'size' : ls[2],
+        'hier' : '.'.join(hier),
+    }
+    return (ls[3], var_struct)
+
+
+def _register_net(registry, nets, code, net):
+    """Append net to nets, the nets of identifier code, unless a net of the
+    same hier and name is already registered under code. registry is the
+    set of registered (code, hier, name) keys, so that aliases are
+    deduplicated without scanning nets."""
+
+    key = (code, net['hier'], net['name'])
+    if key not in registry:
+        registry.add(key)
+        nets.append(net)
+
+
+class VCDStream(object):
+    """Read a VCD file incrementally, one timestamp at a time.
+
+    The header is parsed when the stream is opened, so that the data
+    attribute holds the same structure as parse_vcd(file, only_sigs=1).
+    Value changes are never stored: changes() yields them block by block,
+    so memory use does not depend on the length of the trace."""
+
+    def __init__(self, file, opt_timescale='', scope=None, time_index=None):
+        self.file = file
+        self.data = {}
+        self.mult = 1
+        self.endtime = 0
+        self.time_index = time_index
+        # text is read through a wrapper of the binary file, which _seek
+        #   positions by byte offset
+        self.raw = open_vcd_file(file, 'rb')
+        self.fh = io.TextIOWrapper(self.raw, encoding='latin-1')
+        try:
+            self._parse_header(opt_timescale, scope)
+        except:
+            self.fh.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.fh.close()
+
+    def _parse_header(self, opt_timescale, scope):
+        fh = self.fh
+        hier = []
+        selected = [scope is None or scope('')]
+        registry = set()
+        declared = False
+        while True:
+            line = fh.readline()
+            if line == '': # EOF
+                break
+            line = line.strip()
+            if line == '':
+                continue
+
+            if "$enddefinitions" in line:
+                break
+
+            elif "$timescale" in line:
+                statement = line
+                if not "$end" in line:
+                    while True:
+                        line = fh.readline()
+                        statement += line
+                        if line == '' or "$end" in line:
+                            break
+
+                self.mult = calc_mult(statement, opt_timescale)
+
+            elif "$scope" in line:
+                hier.append( line.split()[2] )
+                selected.append( scope is None or scope('.'.join(hier)) )
+
+            elif "$upscope" in line:
+                hier.pop()
+                selected.pop()
+
+            elif "$var" in line:
+                declared = True
+                if not selected[-1]:
+                    continue
+                (code, var_struct) = parse_var(line, hier)
+                nets = self.data.setdefault(code, {'nets' : []})['nets']
+                _register_net(registry, nets, code, var_struct)
+
+        # a scope that selects nothing leaves data empty, so that callers
+        #   can report the missing signals themselves
+        if not declared:
+            raise VCDParseError("Error: No signals were found in the VCD "\
+                    "file "+self.file+". Check the VCD file for proper var "\
+                    "syntax.")
+
+    def bytes_read(self):
+        """Return how many bytes of the file, after decompression, have been
+        read so far, including read-ahead."""
+
+        return self.raw.tell()
+
+    def _indexed(self, codes):
+        """Whether the time index holds the values of all the given codes,
+        or of every signal of the file if codes is None."""
+
+        if self.time_index is None:
+            return False
+        if codes is None:
+            return self.time_index.top is None
+        indexed = set(self.time_index.codes)
+        return all(code in indexed for code in codes)
+
+    def _seek(self, start, codes):
+        """Position the stream after the last time stamp at or before start,
+        starting from the closest time index checkpoint if the index holds
+        every code of codes. Return the first time stamp after start, or
+        None at the end of the file, and the values of the signals at
+        start."""
+
+        mult = self.mult
+        values = {}
+        checkpoint = None
+        if self._indexed(codes):
+            checkpoint = self.time_index.checkpoint(start, mult)
+        if checkpoint is not None:
+            (cp_time, offset, cp_values) = checkpoint
+            # the offset is a byte position, so seek the binary file and
+            #   wrap it anew rather than the text wrapper, whose positions
+            #   are opaque cookies
+            self.fh.detach()
+            self.raw.seek(offset)
+            self.fh = io.TextIOWrapper(self.raw, encoding='latin-1')
+            for (code, value) in cp_values.items():
+                if (codes is None) or (code in codes):
+                    values[code] = value
+
+        for line in self.fh:
+            line = line.strip()
+            if line == '':
+                continue
+
+            c = line[0]
+            if c in ('b', 'B', 'r', 'R'):
+                (value, code) = line[1:].split()
+            elif c in ('0', '1', 'x', 'X', 'z', 'Z'):
+                value = c
+                code = line[1:]
+            elif c == '#':
+                time = mult * int(line[1:])
+                self.endtime = time
+                if time > start:
+                    return (time, values)
+                continue
+            else:
+                continue
+
+            if (codes is None) or (code in codes):
+                values[code] = value
+
+        return (None, values)
+
+    def changes(self, codes=None, start=None, end=None):
+        """Yield (time, [(code, value), ...]) for every timestamp that has
+        at least one value change, in file order. If codes is given, only
+        changes to those identifier codes are reported.
+
+        With start, the first block holds the values of all signals at
+        start instead, followed by the changes after start. With end, no
+        changes after end are reported."""
+
+        mult = self.mult
+        time = 0
+        block = []
+        if start is not None:
+            (time, values) = self._seek(start, codes)
+            if len(values):
+                yield (start, sorted(values.items()))
+            if (time is None) or (end is not None and time > end):
+                return
+
+        for line in self.fh:
+            line = line.strip()
+            if line == '':
+                continue
+
+            c = line[0]
+            if c in ('b', 'B', 'r', 'R'):
+                (value, code) = line[1:].split()
+            elif c in ('0', '1', 'x', 'X', 'z', 'Z'):
+                value = c
+                code = line[1:]
+            elif c == '#':
+                new_time = mult * int(line[1:])
+                if (new_time != time and len(block)):
+                    yield (time, block)
+                    block = []
+                if (end is not None and new_time > end):
+                    return
+                time = new_time
+                self.endtime = time
+                continue
+            else:
+                # $dumpvars, $end and other keyword lines
+                continue
+
+            if (codes is None) or (code in codes):
+                block.append( (code, value) )
+
+        if len(block):
+            yield (time, block)
+
+
+def filter_scope(data, scope):
+    """Return the part of a parsed VCD data structure whose nets are
+    declared in scopes selected by the scope predicate."""
+
+    return _filter_nets(data, lambda net: scope(net['hier']))
+
+
+def filter_sigs(data, siglist):
+    """Return the part of a parsed VCD data structure whose nets are in
+    siglist, given as full hierarchical names like parse_vcd's siglist."""
+
+    usigs = set(siglist)
+    return _filter_nets(data, lambda net: net['hier'] + '.' + net['name']
+                        in usigs)
+
+
+def _filter_nets(data, keep):
+    """Return the part of a parsed VCD data structure whose nets the
+    predicate keep accepts, dropping codes left without any net."""
+
+    new_data = {}
+    for code in data:
+        sig = data[code]
+        nets = [n for n in sig['nets'] if keep(n)]
+        if len(nets) == 0:
+            continue
+        if isinstance(sig, CompactSignal):
+            # share the columns, only the nets differ
+            new_sig = CompactSignal(sig.table)
+            (new_sig.times, new_sig.index) = (sig.times, sig.index)
+            new_sig.nets = nets
+        else:
+            new_sig = dict(sig)
+            new_sig['nets'] = nets
+        new_data[code] = new_sig
+    return new_data
+
+
+def parse_vcd_cached(file, scope=None, cache_file=None, verify=0, jobs=1,
+        siglist=[]):
+    """Parse input VCD file like parse_vcd(file, compact=1, jobs=jobs),
+    through a sidecar binary index. The index is written on the first parse
+    and memory-mapped by later calls, as long as the size, mtime and content
+    hash of the VCD file still match. The index always holds every signal,
+    so that it serves any later scope or siglist; only the signals selected
+    by both are returned."""
+
+    global timescale, endtime
+
+    if cache_file is None:
+        cache_file = index_path(file)
+    key = file_key(file, verify)
+    cached = read_index(cache_file, key)
+    if cached is None:
+        data = parse_vcd(file, compact=1, jobs=jobs)
+        try:
+            write_index(cache_file, key, data, globals().get('timescale'),
+                    globals().get('endtime'))
+        except Exception:
+            # the index only saves later parses, so e.g. an unwritable
+            #   location just means going on without one
+            pass
+    else:
+        (data, timescale, endtime) = cached
+
+    if scope is not None:
+        data = filter_scope(data, scope)
+    if len(siglist):
+        data = filter_sigs(data, siglist)
+    return data
+
+
+def _header_end(fh):
+    """Return the offset just past the $enddefinitions line of the binary
+    file fh, or None if there is none."""
+
+    fh.seek(0)
+    while True:
+        line = fh.readline()
+        if line == b'':
+            return None
+        if b'$enddefinitions' in line:
+            return fh.tell()
+
+
+def _checkpointed(fh, interval, checkpoint):
+    """Yield the rest of the binary file fh in blocks of about interval
+    bytes, like _chunks, but split each block at its first time stamp line.
+    Before yielding the part from that line on, call checkpoint with the
+    raw time and the offset of that line, once the consumer has seen every
+    change yielded so far."""
+
+    base = fh.tell()
+    for chunk in _chunks(fh, interval):
+        if chunk[:1] == b'#':
+            cut = 0
+        else:
+            cut = chunk.find(b'\n#')
+            cut = -1 if cut < 0 else cut + 1
+        if cut < 0:
+            yield chunk
+        else:
+            if cut:
+                yield chunk[:cut]
+            stop = chunk.find(b'\n', cut)
+            stamp = chunk[cut + 1:] if stop < 0 else chunk[cut + 1:stop]
+            checkpoint(int(stamp), base + cut)
+            yield chunk[cut:]
+        base += len(chunk)
+
+
+def _setter(values, code):
+    def set_value(time, value):
+        values[code] = value
+    return set_value
+
+
+def build_time_index(file, interval=CHECKPOINT_SIZE, top=None):
+    """Scan the value change section of input VCD file once and return a
+    TimeIndex with a checkpoint at the first time stamp of every interval
+    bytes, holding the values of the signals declared directly in scope
+    top, or of all signals if top is None. Checkpoint times are raw, not
+    scaled by any timescale."""
+
+    data = parse_vcd(file, only_sigs=1,
+                     scope=None if top is None else scope_exact(top))
+    codes = sorted(data)
+    values = {}
+    targets = {}
+    for code in codes:
+        targets[code.encode('latin-1')] = _setter(values, code)
+
+    table = ValueTable()
+    times = array('q')
+    offsets = array('Q')
+    rows = array('I')
+    def checkpoint(time, offset):
+        times.append(time)
+        offsets.append(offset)
+        rows.extend(table.intern(values[code]) if code in values
+                    else NO_VALUE for code in codes)
+
+    with open_vcd_file(file, 'rb') as fh:
+        start = _header_end(fh)
+        if start is not None:
+            _scan_changes(_checkpointed(fh, interval, checkpoint), targets,
+                          1, 1)
+    return TimeIndex(times, offsets, codes, rows, table.values, interval, top)
+
+
+def load_time_index(file, index_file=None, interval=CHECKPOINT_SIZE,
+        verify=0, top=None):
+    """Return the TimeIndex of the signals declared directly in scope top
+    of input VCD file, or of all signals if top is None, from its sidecar
+    time index. The index is built and written on first use, and rebuilt
+    whenever the size, mtime or content hash of the VCD file or the scope
+    change."""
+
+    if index_file is None:
+        index_file = time_index_path(file)
+    key = file_key(file, verify)
+    index = read_time_index(index_file, key, interval, top)
+    if index is None:
+        index = build_time_index(file, interval, top)
+        try:
+            write_time_index(index_file, key, index)
+        except (IOError, OSError):
+            pass    # unwritable location, go on without a sidecar
+    return index
+
+
+def fingerprint_vcd(file, scope=None, opt_timescale=''):
+    """Hash the (time, value) sequence of every signal of input VCD file
+    selected by the scope predicate, in one pass that keeps no changes.
+    Return the Fingerprints of the signals, by full signal name."""
+
+    with VCDStream(file, opt_timescale, scope) as stream:
+        (data, mult) = (stream.data, stream.mult)
+
+    hasher = FingerprintHasher(data)
+    targets = {}
+    for code in data:
+        targets[code.encode('latin-1')] = hasher.hashes[code].append
+
+    last_time = None
+    with open_vcd_file(file, 'rb') as fh:
+        if _header_end(fh) is not None:
+            last_time = _scan_changes(_chunks(fh), targets, mult, 1)
+    return hasher.finish(last_time)
+
+
+def stored_fingerprints(file, top=None, fp_file=None, verify=0):
+    """Return the Fingerprints of the signals declared directly in scope top
+    of input VCD file, or of all signals if top is None, from its sidecar
+    fingerprint file, or None if the sidecar holds none that match the
+    size, mtime or content hash of the file."""
+
+    if fp_file is None:
+        fp_file = fingerprint_path(file)
+    scope_name = '' if top is None else top
+    return read_fingerprints(fp_file, file_key(file, verify), scope_name)
+
+
+def store_fingerprints(file, fingerprints, top=None, fp_file=None,
+        verify=0):
+    """Store Fingerprints of the signals declared directly in scope top of
+    input VCD file, e.g. from a FingerprintHasher fed by a pass that read
+    the whole file, in its sidecar fingerprint file. An unwritable location
+    is ignored."""
+
+    if fp_file is None:
+        fp_file = fingerprint_path(file)
+    scope_name = '' if top is None else top
+    try:
+        write_fingerprints(fp_file, file_key(file, verify), scope_name,
+                           fingerprints)
+    except (IOError, OSError):
+        pass    # unwritable location, go on without a sidecar
+
+
+def load_fingerprints(file, top=None, fp_file=None, verify=0):
+    """Return the Fingerprints of the signals declared directly in scope top
+    of input VCD file, or of all signals if top is None, from its sidecar
+    fingerprint file. They are computed and stored on first use, and
+    recomputed whenever the size, mtime or content hash of the file
+    change."""
+
+    fingerprints = stored_fingerprints(file, top, fp_file, verify)
+    if fingerprints is None:
+        scope = None if top is None else scope_exact(top)
+        fingerprints = fingerprint_vcd(file, scope)
+        store_fingerprints(file, fingerprints, top, fp_file, verify)
+    return fingerprints
+
+
+def _tagged_changes(n, code, tv, lo=0, hi=None):
+    for (k, (time, value)) in enumerate(itertools.islice(tv, lo, hi), lo):
+        yield (time, n, k, code, value)
+
+
+def _window(sig, start, end):
+    """Return the index range of the changes of sig within start and end."""
+
+    if isinstance(sig, CompactSignal):
+        times = sig.times
+    else:
+        times = [time for (time, value) in sig['tv']]
+    lo = 0 if start is None else bisect.bisect_right(times, start)
+    hi = len(times) if end is None else bisect.bisect_right(times, end)
+    return (lo, hi)
+
+
+class DataStream(object):
+    """Present an already parsed VCD data structure through the same
+    interface as VCDStream, e.g. for a structure loaded from an index."""
+
+    def __init__(self, data):
+        self.data = data
+        self.endtime = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        pass
+
+    def bytes_read(self):
+        """Nothing is read from a file."""
+
+        return 0
+
+    def changes(self, codes=None, start=None, end=None):
+        """Yield (time, [(code, value), ...]) for every timestamp that has
+        at least one value change. If codes is given, only changes to
+        those identifier codes are reported. Time windows work as in
+        VCDStream.changes(), by searching the times of every signal."""
+
+        initial = []
+        tagged = []
+        for (n, code) in enumerate(self.data):
+            if (codes is not None) and (code not in codes):
+                continue
+            tv = self.data[code]['tv']
+            (lo, hi) = _window(self.data[code], start, end)
+            if (start is not None and lo > 0):
+                initial.append( (code, tv[lo - 1][1]) )
+            tagged.append(_tagged_changes(n, code, tv, lo, hi))
+
+        if len(initial):
+            yield (start, sorted(initial))
+
+        merged = heapq.merge(*tagged)
+        time = None
+        block = []
+        for (new_time, n, k, code, value) in merged:
+            if (new_time != time and len(block)):
+                yield (time, block)
+                block = []
+            time = new_time
+            self.endtime = time
+            block.append( (code, value) )
+
+        if len(block):
+            yield (time, block)
+
+
+class Recording(object):
+    """Value changes of a VCD file recorded in file order, in compact
+    columns: the time and end offset of every block, and an index into the
+    codes and into a value table for every change. Reading the file once,
+    a Recording can be replayed any number of times through stream(), much
+    faster than the file can be read again. Only the signals selected by
+    scope are recorded."""
+
+    def __init__(self, file, opt_timescale='', scope=None):
+        table = ValueTable()
+        with VCDStream(file, opt_timescale, scope) as stream:
+            self.data = stream.data
+            self.codes = list(stream.data)
+            ids = dict((code, n) for (n, code) in enumerate(self.codes))
+            self.times = array('q' if isinstance(stream.mult, int) else 'd')
+            self.ends = array('Q')
+            self.change_codes = array('I')
+            self.change_values = array('I')
+            for (time, block) in stream.changes(stream.data):
+                self.times.append(time)
+                for (code, value) in block:
+                    self.change_codes.append(ids[code])
+                    self.change_values.append(table.intern(value))
+                self.ends.append(len(self.change_codes))
+            self.endtime = stream.endtime
+        self.values = table.values
+
+    def nbytes(self):
+        """Return an estimate of the memory held by the recording."""
+
+        size = sum(sys.getsizeof(column) for column in (self.times,
+                   self.ends, self.change_codes, self.change_values))
+        # the strings, and their slots in the value table's dict and list
+        size += sum(sys.getsizeof(value) + 120 for value in self.values)
+        for sig in self.data.values():
+            size += sum(sys.getsizeof(net) + sum(map(sys.getsizeof,
+                        net.values())) for net in sig['nets'])
+        return size
+
+    def stream(self):
+        """Return a stream replaying the recording, with the interface of
+        VCDStream."""
+
+        return RecordedStream(self)
+
+
+class RecordedStream(object):
+    """Replay of a Recording through the same interface as VCDStream."""
+
+    def __init__(self, recording):
+        self.recording = recording
+        self.data = recording.data
+        self.endtime = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        pass
+
+    def bytes_read(self):
+        """Nothing is read from a file."""
+
+        return 0
+
+    def changes(self, codes=None, start=None, end=None):
+        """Yield (time, [(code, value), ...]) for every timestamp that has
+        at least one value change, in file order, as VCDStream.changes()
+        does, including its time windows."""
+
+        rec = self.recording
+        (names, values) = (rec.codes, rec.values)
+        (change_codes, change_values) = (rec.change_codes, rec.change_values)
+        keep = None
+        if codes is not None:
+            keep = set(n for (n, code) in enumerate(names) if code in codes)
+        lo = 0 if start is None else bisect.bisect_right(rec.times, start)
+        hi = len(rec.times) if end is None else \
+             bisect.bisect_right(rec.times, end)
+        begin = rec.ends[lo - 1] if lo > 0 else 0
+
+        if start is not None:
+            # the last value of each signal wins
+            current = dict(zip(change_codes[:begin], change_values[:begin]))
+            initial = sorted((names[n], values[v])
+                             for (n, v) in current.items()
+                             if (keep is None) or (n in keep))
+            if len(initial):
+                yield (start, initial)
+
+        for i in range(lo, hi):
+            stop = rec.ends[i]
+            pairs = zip(change_codes[begin:stop], change_values[begin:stop])
+            if keep is None:
+                block = [(names[n], values[v]) for (n, v) in pairs]
+            else:
+                block = [(names[n], values[v]) for (n, v) in pairs
+                         if n in keep]
+            begin = stop
+            if len(block):
+                self.endtime = rec.times[i]
+                yield (rec.times[i], block)
+
+
 def calc_mult (statement, opt_timescale=''):
     """
     Calculate a new multiplier for time values.
@@ -210,8 +1388,7 @@ def calc_mult (statement, opt_timescale=''):
         'ms' : 1e-03,
          's' : 1e-00,
     }
-    mults_keys = mults.keys()
-    mults_keys.sort(key=lambda x : mults[x])
+    mults_keys = sorted(mults.keys(), key=lambda x : mults[x])
     usage = '|'.join(mults_keys)
 
     scale = 0
@@ -276,6 +1453,14 @@ def get_endtime():
 # Since the input file is assumed to be legal VCD syntax, only minimal
 # validation is performed.
 #
+# Files compressed with gzip, bzip2 or xz are read as they are.  The format
+# is detected from the magic bytes at the start of the file, and the file is
+# decompressed while it is parsed, without writing the plain text anywhere.
+# Compressed files cannot be memory-mapped, so they are always parsed in a
+# single process, and seeking to a time window decompresses from the start.
+# C<compress_file(src, dest, name)> writes a compressed copy of a file, in
+# one of the formats in C<FORMATS>.
+#
 # =head1 SUBROUTINES
 #
 #
@@ -285,7 +1470,8 @@ def get_endtime():
 # includes hierarchical signal definitions and time-value data for all
 # the specified signals.  A file name is required.  By default, all
 # signals in the VCD file are included, and times are in units
-# specified by the C<$timescale> VCD keyword.
+# specified by the C<$timescale> VCD keyword, or as written in the file if
+# it has none.
 #
 #     vcd = parse_vcd('/path/to/some.vcd')
 #
@@ -323,7 +1509,8 @@ def get_endtime():
 #
 # Since each code could have multiple hierarchical signal names, the names are
 # stored as an Array-of-Hashes, referenced by the C<nets> key.  The example above
-# only shows one signal name for the code.
+# only shows one signal name for the code.  A name declared more than once for
+# the same code is listed once.
 #
 #
 # =head3 OPTIONS
@@ -360,6 +1547,49 @@ def get_endtime():
 # Limiting the number of signals can substantially reduce memory usage of the
 # returned data structure because only the time-value data for the selected
 # signals is loaded into the data structure.
+# It also speeds up parsing: the value change section is read as raw bytes
+# and only the values of selected signals are decoded.  The lines of up to
+# FIND_MAX_CODES (8) selected identifier codes that change rarely are
+# searched for directly, and with up to REGEX_MAX_CODES (32) of them, short
+# lines of other signals are skipped by a single regular expression scan.
+# Files of long vector lines are split into lines as before, at about the
+# speed of the original parser.
+#
+# =item scope
+#
+# A scope predicate restricts parsing to the signals declared in matching
+# scopes.  It is called once per scope with the dot-separated scope path,
+# and signals in scopes it rejects are never registered, so their value
+# changes are skipped cheaply.  Predicates for the common cases are
+# provided by scope_exact, scope_prefix and scope_depth:
+#
+#     vcd = parse_vcd(file, scope=scope_exact('top'))
+#     vcd = parse_vcd(file, scope=scope_prefix('top.chip.cpu'))
+#     vcd = parse_vcd(file, scope=scope_depth(2))
+#
+# =item compact
+#
+# Store the time-value data in array columns instead of lists of tuples,
+# which cuts the memory used by large dumps several times over.  Each code
+# maps to a CompactSignal, whose times are kept in an array and whose values
+# are interned in a table shared by all signals.  Nets are __slots__ records.
+# Item access is kept compatible, so vcd[code]['tv'] returns a read-only
+# sequence of (time, value) tuples and net['hier'] works as before:
+#
+#     vcd = parse_vcd(file, compact=1)
+#
+# =item jobs
+#
+# Parse the value change section of a large VCD file in a pool of jobs
+# processes.  The section is split into byte ranges starting at time stamp
+# lines, of at least CHUNK_SIZE bytes each, and every process parses one
+# range for the selected signals.  The results are merged in time order, so
+# they are identical to those of a single process.  Files too small to
+# split, input that cannot be memory-mapped, and calls from daemonic pool
+# workers (which cannot start processes of their own) are parsed in the
+# calling process.  Only use this with spare cores: it is slower on one.
+#
+#     vcd = parse_vcd(file, compact=1, jobs=8)
 #
 # =item use_stdout
 #
@@ -412,6 +1642,85 @@ def get_endtime():
 #     top.chip.cpu.alu.status
 #     top.chip.cpu.alu.sum[15:0]
 #
+# =head2 parse_vcd_cached(file, scope=None, cache_file=None, verify=0, jobs=1, siglist=[])
+#
+# Parse a VCD file like C<parse_vcd(file, compact=1)>, through a sidecar
+# binary index (C<file.idx> by default).  The first call parses the text and
+# writes the index; later calls memory-map the index instead, as long as the
+# size, mtime and content hash of the VCD file still match.  The content hash
+# covers the first and last megabyte of the file, or all of it with C<verify>.
+# The index holds every signal of the file; C<scope> and C<siglist> select
+# the signals returned, as they do for C<parse_vcd>.
+#
+#     vcd = parse_vcd_cached('golden.vcd', scope=scope_exact('top'))
+#
+# C<Recording(file, opt_timescale='', scope=None)> reads a whole VCD file once
+# and keeps its value changes in time order, in compact arrays with every
+# distinct value stored once, so that it can be replayed many times.  Its
+# C<stream()> returns an object with the C<VCDStream> interface, time windows
+# included, and C<nbytes()> estimates its size in memory.
+#
+# =head2 load_time_index(file, index_file=None, interval=CHECKPOINT_SIZE, verify=0, top=None)
+#
+# Return the sparse time index of a VCD file, from a binary sidecar file
+# (C<file.tix> by default), built by scanning the value change section once
+# on first use.  Every C<interval> bytes, it holds the time and byte offset
+# of a timestamp line and the values, just before it, of the signals
+# declared directly in scope C<top> (all signals if C<top> is None).  An
+# index of another scope is rebuilt.  Passed to
+# C<VCDStream(file, scope=scope_exact(top), time_index=index)>, it lets
+# C<changes(codes, start, end)> seek to the last checkpoint before C<start>
+# and replay only the changes from there, as long as the index holds all of
+# C<codes>.  Without C<codes>, changes of signals in every scope are
+# reported, so only an index of all signals is used:
+#
+#     index = load_time_index('input.vcd', top='top')
+#     with VCDStream('input.vcd', scope=scope_exact('top'),
+#                    time_index=index) as stream:
+#         for (time, changes) in stream.changes(stream.data, 5000, 6000):
+#             ...
+#
+# =head2 load_fingerprints(file, top=None, fp_file=None, verify=0)
+#
+# Return the fingerprints of the signals declared directly in scope C<top>
+# (all signals if C<top> is None), from a sidecar file (C<file.fp> by
+# default).  The first call hashes the (time, value) sequence of every signal
+# in one pass that keeps no changes, and stores the result.  The
+# C<signals> attribute maps full signal names to fingerprints, C<digest>
+# covers the whole trace, and C<diff(other)> lists the signals whose
+# fingerprints differ.  C<fingerprint_vcd(file, scope)> computes
+# fingerprints without touching the sidecar.
+#
+# A pass that already reads every change of a file, such as a comparison
+# streaming it, can hash it on the way instead of reading it again: feed
+# each C<(time, changes)> block of C<VCDStream.changes()> to
+# C<FingerprintHasher(stream.data).add()>, call C<finish(stream.endtime)>
+# once the stream is exhausted, and save the result with
+# C<store_fingerprints(file, fingerprints, top)>.
+# C<stored_fingerprints(file, top)> returns the sidecar's fingerprints
+# without computing them, or None.
+#
+#     fp1 = load_fingerprints('golden.vcd', 'top')
+#     fp2 = load_fingerprints('new.vcd', 'top')
+#     if fp1.digest != fp2.digest:
+#         print(fp1.diff(fp2))
+#
+# =head2 pack(value, size)
+#
+# Return the value of a scalar or vector change (without the C<b> prefix)
+# packed into one integer: its 4-state bits as an aval/bval pair, C<aval |
+# bval << size>, left-extended to C<size> bits as VCD extends vectors.
+# C<b1> and C<b0001> of a 4-bit variable pack to the same integer, and
+# values of 0s and 1s pack to their binary value.  A value wider than
+# C<size>, or with anything but 0, 1, x and z digits, is returned unchanged
+# and only matches itself.  C<unpack(packed, size)> gives the value back as
+# C<size> digits.  C<value_size(net)> returns the
+# size to pack the values of a variable to from its C<nets> entry, or None
+# for C<real> variables.
+#
+#     pack('1', 4) == pack('0001', 4)     # True
+#     unpack(pack('x0', 4), 4)            # 'xxx0'
+#
 # =head2 get_timescale( )
 #
 # This returns a string corresponding to the timescale as specified
@@ -0,0 +1,169 @@
+# cache.py
+# Sidecar binary index for parse_vcd(file, compact=1) results.
+#
+# Layout of an index file:
+#   8 bytes     magic
+#   8 bytes     length of the metadata block (little-endian)
+#   metadata    JSON: source file key, header info, nets and column offsets
+#   padding     up to a multiple of 8 bytes
+#   columns     raw array data of every signal, each 8-byte aligned, then the
+#               value table as newline-separated strings
+#
+# Loading memory-maps the file and hands out memoryviews of the columns, so
+# nothing but the metadata and the value table is decoded up front.
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from .compact import Net, ValueTable, CompactSignal
+
+MAGIC = b'VCDIDX02'
+# bytes hashed at each end of the source file for the content check
+SAMPLE_SIZE = 1 << 20
+
+
+def index_path(file):
+    """Return the default sidecar index path for a VCD file."""
+
+    return file + '.idx'
+
+
+def file_key(file, verify=0):
+    """Return the key identifying the current contents of a VCD file: its
+    size, its mtime and a hash of its first and last SAMPLE_SIZE bytes.
+    With verify, the whole file is hashed instead."""
+
+    st = os.stat(file)
+    mtime_ns = st.st_mtime_ns
+
+    h = hashlib.sha1()
+    with open(file, 'rb') as fh:
+        if verify or st.st_size <= 2 * SAMPLE_SIZE:
+            while True:
+                buf = fh.read(SAMPLE_SIZE)
+                if not buf:
+                    break
+                h.update(buf)
+        else:
+            h.update(fh.read(SAMPLE_SIZE))
+            fh.seek(-SAMPLE_SIZE, os.SEEK_END)
+            h.update(fh.read(SAMPLE_SIZE))
+
+    return {
+        'size' : st.st_size,
+        'mtime_ns' : mtime_ns,
+        'hash' : h.hexdigest(),
+        'full' : bool(verify or st.st_size <= 2 * SAMPLE_SIZE),
+    }
+
+
+def _align(n):
+    return (n + 7) & ~7
+
+
+def write_index(path, key, data, timescale=None, endtime=None):
+    """Write a compact parse_vcd result to the index file at path.
+    The file is written under a temporary name and renamed into place."""
+
+    table = None
+    signals = []
+    chunks = []
+    offset = 0
+    for code in data:
+        sig = data[code]
+        table = sig.table
+        times = sig.times.tobytes()
+        index = sig.index.tobytes()
+        signals.append({
+            'code' : code,
+            'nets' : [[n.type, n.name, n.size, n.hier] for n in sig.nets],
+            'time_type' : sig.times.typecode,
+            'times' : [offset, len(times)],
+            'index' : [offset + _align(len(times)), len(index)],
+        })
+        for buf in (times, index):
+            chunks.append(buf)
+            chunks.append(b'\0' * (_align(len(buf)) - len(buf)))
+            offset += _align(len(buf))
+
+    # values are read from the file as latin-1, so any byte round-trips
+    values = '\n'.join(table.values if table else []).encode('latin-1')
+    meta = {
+        'key' : key,
+        'byteorder' : sys.byteorder,
+        'itemsize' : {'q' : array('q').itemsize, 'd' : array('d').itemsize,
+                      'I' : array('I').itemsize},
+        'timescale' : timescale,
+        'endtime' : endtime,
+        'signals' : signals,
+        'values' : [offset, len(values), len(table.values) if table else 0],
+    }
+    meta = json.dumps(meta).encode('utf-8')
+    head = MAGIC + struct.pack('<Q', len(meta)) + meta
+    head += b'\0' * (_align(len(head)) - len(head))
+
+    tmp = "{}.{}.tmp".format(path, os.getpid())
+    try:
+        with open(tmp, 'wb') as fh:
+            fh.write(head)
+            for buf in chunks:
+                fh.write(buf)
+            fh.write(values)
+        os.rename(tmp, path)
+    except:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def read_index(path, key=None):
+    """Memory-map the index file at path. Return (data, timescale, endtime),
+    or None if the file is missing, unreadable, was written on a different
+    platform, or does not match key."""
+
+    try:
+        fh = open(path, 'rb')
+    except (IOError, OSError):
+        return None
+    with fh:
+        if fh.read(len(MAGIC)) != MAGIC:
+            return None
+        (meta_len,) = struct.unpack('<Q', fh.read(8))
+        try:
+            meta = json.loads(fh.read(meta_len).decode('utf-8'))
+        except ValueError:
+            return None
+        if key is not None and meta['key'] != key:
+            return None
+        itemsize = {'q' : array('q').itemsize, 'd' : array('d').itemsize,
+                    'I' : array('I').itemsize}
+        if meta['byteorder'] != sys.byteorder or meta['itemsize'] != itemsize:
+            return None
+        base = _align(len(MAGIC) + 8 + meta_len)
+        buf = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+    view = memoryview(buf)
+    (offset, length, count) = meta['values']
+    table = ValueTable()
+    if count:
+        start = base + offset
+        table.values = view[start:start + length].tobytes().decode('latin-1') \
+                       .split('\n')
+
+    data = {}
+    for entry in meta['signals']:
+        sig = CompactSignal(table)
+        sig.nets = [Net(*n) for n in entry['nets']]
+        (offset, length) = entry['times']
+        sig.times = view[base + offset:base + offset + length] \
+                    .cast(entry['time_type'])
+        (offset, length) = entry['index']
+        sig.index = view[base + offset:base + offset + length].cast('I')
+        data[entry['code']] = sig
+
+    return (data, meta['timescale'], meta['endtime'])
@@ -0,0 +1,130 @@
+# compact.py
+# Array-backed storage for parse_vcd(file, compact=1).
+#
+# Each change costs a Python (time, value) tuple in the default result, which
+# is well over 100 bytes. In compact mode, times are kept in an array column
+# per signal and values are interned into a table shared by the whole parse,
+# so that a change costs 8 bytes of time plus 4 bytes of value index, an
+# array('I') column, which is 4 bytes wide on every common platform.
+
+from array import array
+
+
+class Net(object):
+    """Metadata of one hierarchical signal name. Supports the same item
+    access as the net dicts of the default result."""
+
+    __slots__ = ('type', 'name', 'size', 'hier')
+
+    def __init__(self, type, name, size, hier):
+        self.type = type
+        self.name = name
+        self.size = size
+        self.hier = hier
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __eq__(self, other):
+        return (self.type, self.name, self.size, self.hier) == \
+               (other['type'], other['name'], other['size'], other['hier'])
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.type, self.name, self.size, self.hier))
+
+    def __repr__(self):
+        return "Net({!r}, {!r}, {!r}, {!r})".format(self.type, self.name,
+                self.size, self.hier)
+
+
+class ValueTable(object):
+    """Intern table for value strings, shared by all signals of a parse."""
+
+    __slots__ = ('ids', 'values')
+
+    def __init__(self):
+        self.ids = {}
+        self.values = []
+
+    def intern(self, value):
+        try:
+            return self.ids[value]
+        except KeyError:
+            idx = len(self.values)
+            self.ids[value] = idx
+            self.values.append(value)
+            return idx
+
+
+class TVList(object):
+    """Read-only sequence of (time, value) tuples over compact columns.
+    Compares equal to any sequence holding the same pairs."""
+
+    __slots__ = ('times', 'index', 'values')
+
+    def __init__(self, times, index, values):
+        self.times = times
+        self.index = index
+        self.values = values
+
+    def __len__(self):
+        return len(self.times)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return (self.times[i], self.values[self.index[i]])
+
+    def __iter__(self):
+        values = self.values
+        for (time, idx) in zip(self.times, self.index):
+            yield (time, values[idx])
+
+    def __eq__(self, other):
+        if len(self) != len(other):
+            return False
+        if isinstance(other, TVList) and other.values is self.values:
+            return self.times == other.times and self.index == other.index
+        for (a, b) in zip(self, other):
+            if a != b:
+                return False
+        return True
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class CompactSignal(object):
+    """Nets and value changes of one identifier code. Item access with
+    'nets' and 'tv' mirrors the dicts of the default result."""
+
+    __slots__ = ('nets', 'times', 'index', 'table')
+
+    def __init__(self, table, time_type='q'):
+        self.nets = []
+        self.times = array(time_type)
+        self.index = array('I')
+        self.table = table
+
+    def append(self, time, value):
+        self.times.append(time)
+        self.index.append(self.table.intern(value))
+
+    def __getitem__(self, key):
+        if key == 'nets':
+            return self.nets
+        elif key == 'tv':
+            return TVList(self.times, self.index, self.table.values)
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in ('nets', 'tv')
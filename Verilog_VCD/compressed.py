@@ -0,0 +1,62 @@
+# compressed.py
+# Transparent decoding of compressed VCD files.
+#
+# Compressed files are recognized by their magic bytes rather than their
+# names, and are decoded while they are read, so the plain text never has
+# to be written to disk. gzip, bzip2 and xz are supported, with the codecs
+# of the standard library; xz only where Python was built with lzma.
+
+import bz2
+import gzip
+import os
+import shutil
+
+try:
+    import lzma
+except ImportError:
+    lzma = None
+
+# name -> (magic bytes, open function, file name suffix)
+FORMATS = {
+    'gzip' : (b'\x1f\x8b', gzip.open, '.gz'),
+    'bz2' : (b'BZh', bz2.open, '.bz2'),
+}
+if lzma is not None:
+    FORMATS['xz'] = (b'\xfd7zXZ\x00', lzma.open, '.xz')
+
+
+def detect(file):
+    """Return the name of the compression format of file, or None if it is
+    not compressed in a known format. Only regular files are looked at, as
+    reading from a pipe would consume its data."""
+
+    if not os.path.isfile(file):
+        return None
+    with open(file, 'rb') as fh:
+        head = fh.read(8)
+    for (name, (magic, opener, suffix)) in FORMATS.items():
+        if head.startswith(magic):
+            return name
+    return None
+
+
+def open_vcd_file(file, mode='rb'):
+    """Open a VCD file for reading like open(file, mode), decoding it on the
+    fly if it is compressed."""
+
+    name = detect(file)
+    if name is None:
+        return open(file, mode)
+    opener = FORMATS[name][1]
+    if 'b' not in mode and 't' not in mode:
+        mode += 't'
+    return opener(file, mode)
+
+
+def compress_file(src, dest, name='gzip'):
+    """Write a compressed copy of file src to dest, in the format name."""
+
+    opener = FORMATS[name][1]
+    with open(src, 'rb') as fin:
+        with opener(dest, 'wb') as fout:
+            shutil.copyfileobj(fin, fout, 1 << 20)
@@ -0,0 +1,170 @@
+# fingerprint.py
+# Per-signal fingerprints of VCD traces, and their sidecar storage.
+#
+# The fingerprint of a signal is a hash of its (time, value) sequence, fed
+# one change at a time while the value change section is parsed, so no
+# changes are kept. Two traces of a signal have the same fingerprint exactly
+# when they hold the same changes at the same (scaled) times, barring hash
+# collisions. The trace digest hashes the fingerprints of all signals by
+# name, so one comparison decides whether two dumps agree.
+#
+# The sidecar is a JSON file:
+#   magic   MAGIC
+#   key     key of the source file contents, from cache.file_key
+#   scopes  scope name ('' for the whole file) -> {'signals' : {full signal
+#           name : fingerprint}, 'endtime' : last time stamp}
+
+import hashlib
+import json
+import os
+import sys
+from array import array
+
+MAGIC = 'VCDFP001'
+# number of changes hashed at once
+BLOCK_SIZE = 4096
+
+
+def fingerprint_path(file):
+    """Return the default sidecar fingerprint path for a VCD file."""
+
+    return file + '.fp'
+
+
+class SignalHash(object):
+    """Running hash of the (time, value) sequence of one signal. Changes are
+    hashed in blocks of BLOCK_SIZE: the times as little-endian 64-bit
+    numbers, then the values, each followed by a newline."""
+
+    __slots__ = ('h', 'times', 'values')
+
+    def __init__(self):
+        self.h = hashlib.sha1()
+        self.times = []
+        self.values = []
+
+    def append(self, time, value):
+        self.times.append(time)
+        self.values.append(value)
+        if len(self.times) >= BLOCK_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if len(self.times) == 0:
+            return
+        times = array('q' if isinstance(self.times[0], int) else 'd',
+                      self.times)
+        if sys.byteorder != 'little':
+            times.byteswap()
+        self.h.update(times.tobytes())
+        self.values.append('')
+        self.h.update('\n'.join(self.values).encode('latin-1'))
+        self.times = []
+        self.values = []
+
+    def hexdigest(self):
+        self._flush()
+        return self.h.hexdigest()
+
+
+class Fingerprints(object):
+    """Fingerprints of the signals of a trace, by full signal name, and
+    the digest of the whole trace."""
+
+    def __init__(self, signals, endtime=None):
+        self.signals = signals
+        self.endtime = endtime
+        h = hashlib.sha1()
+        for name in sorted(signals):
+            h.update('{}\0{}\n'.format(name, signals[name]).encode('utf-8'))
+        self.digest = h.hexdigest()
+
+    def diff(self, other):
+        """Return the sorted names of the signals whose fingerprints differ
+        from those in other, including signals only one side has."""
+
+        names = set(self.signals) | set(other.signals)
+        return sorted(name for name in names
+                      if self.signals.get(name) != other.signals.get(name))
+
+
+class FingerprintHasher(object):
+    """Fingerprints of the signals in data, by identifier code, hashed from
+    the change blocks of another pass over the trace, e.g. a comparison
+    streaming it, so that the trace is not read a second time to hash it.
+    Changes to codes that are not in data are ignored."""
+
+    def __init__(self, data):
+        self.data = data
+        self.hashes = dict((code, SignalHash()) for code in data)
+        self.fingerprints = None
+
+    def add(self, time, changes):
+        """Hash a block of (code, value) changes at time."""
+
+        hashes = self.hashes
+        for (code, value) in changes:
+            h = hashes.get(code)
+            if h is not None:
+                h.append(time, value)
+
+    def finish(self, endtime):
+        """Set and return the Fingerprints of the signals, once every
+        change of the trace has been added."""
+
+        signals = {}
+        for code in self.data:
+            digest = self.hashes[code].hexdigest()
+            for net in self.data[code]['nets']:
+                signals[net['hier'] + '.' + net['name']] = digest
+        self.fingerprints = Fingerprints(signals, endtime)
+        return self.fingerprints
+
+
+def write_fingerprints(path, key, scope_name, fingerprints):
+    """Store fingerprints of the scope scope_name in the sidecar at path,
+    keeping those of other scopes if they belong to the same key. The file
+    is written under a temporary name and renamed into place."""
+
+    scopes = {}
+    meta = _load(path)
+    if meta is not None and meta['key'] == key:
+        scopes = meta['scopes']
+    scopes[scope_name] = {
+        'signals' : fingerprints.signals,
+        'endtime' : fingerprints.endtime,
+    }
+
+    tmp = "{}.{}.tmp".format(path, os.getpid())
+    try:
+        with open(tmp, 'w') as fh:
+            json.dump({'magic' : MAGIC, 'key' : key, 'scopes' : scopes}, fh)
+        os.rename(tmp, path)
+    except:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def read_fingerprints(path, key, scope_name):
+    """Return the Fingerprints of the scope scope_name stored in the sidecar
+    at path, or None if there are none for key."""
+
+    meta = _load(path)
+    if meta is None or meta['key'] != key:
+        return None
+    entry = meta['scopes'].get(scope_name)
+    if entry is None:
+        return None
+    return Fingerprints(entry['signals'], entry['endtime'])
+
+
+def _load(path):
+    try:
+        with open(path, 'r') as fh:
+            meta = json.load(fh)
+    except (IOError, OSError, ValueError):
+        return None
+    if not isinstance(meta, dict) or meta.get('magic') != MAGIC:
+        return None
+    return meta
@@ -0,0 +1,67 @@
+# fourstate.py
+# Packed 4-state values of VCD vectors and scalars.
+#
+# A value is packed into the aval/bval pair of the Verilog PLI: bit i of
+# (aval, bval) is (0, 0) for 0, (1, 0) for 1, (1, 1) for x and (0, 1) for z.
+# Both halves live in one integer, aval | bval << size, so a value made of
+# 0s and 1s packs to its plain binary value and comparing two values is a
+# single integer comparison. Values are extended to the declared size of
+# their variable the way VCD left-extends vectors: with 0 when the leftmost
+# bit is 0 or 1, and with x or z when it is x or z. So 'b1' and 'b0001' of a
+# 4-bit variable pack to the same integer. Anything but these four digits is
+# not a value, and is left unpacked.
+
+
+_AVAL = str.maketrans('xXzZ', '1100')
+_BVAL = str.maketrans('1xXzZ', '01111')
+_DIGITS = '0', '1', 'z', 'x'
+
+
+def pack(value, size):
+    """Return the packed integer of value, the digits of a scalar or vector
+    change without the 'b' prefix, left-extended to size bits. A value that
+    is empty, wider than size or holds anything but 0, 1, x and z digits is
+    returned as it is, so that it only matches itself."""
+
+    if not 0 < len(value) <= size:
+        return value
+    if not value.strip('01'):
+        # plain 0/1 values are extended with 0 by int() itself
+        return int(value, 2)
+    if value.strip('01xXzZ'):
+        return value
+    aval = int(value.translate(_AVAL), 2)
+    bval = int(value.translate(_BVAL), 2)
+    if size > len(value) and value[0] not in ('0', '1'):
+        fill = ((1 << size) - 1) ^ ((1 << len(value)) - 1)
+        bval |= fill
+        if value[0] not in ('z', 'Z'):
+            aval |= fill
+    return aval | bval << size
+
+
+def unpack(packed, size):
+    """Return the value packed by pack() as size digits out of 0, 1, x and
+    z. Values pack() returned as they were are returned unchanged."""
+
+    if not isinstance(packed, int):
+        return packed
+    aval = packed & ((1 << size) - 1)
+    bval = packed >> size
+    if bval == 0:
+        return format(aval, '0{}b'.format(size))
+    return ''.join(_DIGITS[(aval >> i & 1) | (bval >> i & 1) << 1]
+                   for i in range(size - 1, -1, -1))
+
+
+def value_size(net):
+    """Return the size in bits to pack the values of the variable described
+    by net (an entry of the 'nets' of a parsed VCD) to, or None for real
+    variables, whose values are not 4-state."""
+
+    if net['type'] in ('real', 'realtime'):
+        return None
+    try:
+        return int(net['size'])
+    except ValueError:
+        return 1
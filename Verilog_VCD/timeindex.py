@@ -0,0 +1,176 @@
+# timeindex.py
+# Sparse sidecar index of time stamp checkpoints in a VCD file.
+#
+# Every checkpoint holds the raw time of a '#<time>' line, the byte offset of
+# that line and the value of every indexed signal just before it.  A reader
+# seeks to the last checkpoint before the time it wants, takes the signal
+# values from the checkpoint, and only replays the changes between the
+# checkpoint and that time.  Only the signals declared directly in one scope
+# are indexed, so the index stays small on large flattened designs.
+#
+# Layout of an index file, like the .idx index of cache.py:
+#   8 bytes     magic
+#   8 bytes     length of the metadata block (little-endian)
+#   metadata    JSON: source file key, interval, scope, identifier codes and
+#               column offsets
+#   padding     up to a multiple of 8 bytes
+#   columns     times ('q'), offsets ('Q') and values ('I') of the
+#               checkpoints, each 8-byte aligned, then the value table as
+#               newline-separated strings.  The values column holds one row
+#               per checkpoint and one value table index per code, NO_VALUE
+#               for codes that have no value yet.
+#
+# Loading memory-maps the file; the values of a checkpoint are only decoded
+# when it is looked up.
+
+import bisect
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from .cache import _align
+
+MAGIC = b'VCDTIX02'
+# value index of a code without any value at a checkpoint
+NO_VALUE = 0xFFFFFFFF
+
+
+def time_index_path(file):
+    """Return the default sidecar time index path for a VCD file."""
+
+    return file + '.tix'
+
+
+class TimeIndex(object):
+    """Checkpoints of a VCD file, searchable by time. times and offsets
+    hold one entry per checkpoint, and rows one value table index per
+    checkpoint and code, row by row."""
+
+    def __init__(self, times, offsets, codes, rows, values, interval=None,
+            top=None):
+        self.times = times
+        self.offsets = offsets
+        self.codes = codes
+        self.rows = rows
+        self.values = values
+        self.interval = interval
+        self.top = top
+
+    def __len__(self):
+        return len(self.times)
+
+    def checkpoint(self, time, mult=1):
+        """Return the last checkpoint (time, offset, values) whose time,
+        scaled by mult, is at most time, or None if there is none. values
+        maps the identifier codes that have a value to it."""
+
+        i = bisect.bisect_right(self.times, time / float(mult))
+        while i > 0 and self.times[i - 1] * mult > time:
+            # rounding of the division above
+            i -= 1
+        if i == 0:
+            return None
+        n = len(self.codes)
+        row = self.rows[(i - 1) * n:i * n]
+        values = dict((code, self.values[v])
+                      for (code, v) in zip(self.codes, row) if v != NO_VALUE)
+        return (self.times[i - 1], self.offsets[i - 1], values)
+
+
+def _itemsize():
+    return {'q' : array('q').itemsize, 'Q' : array('Q').itemsize,
+            'I' : array('I').itemsize}
+
+
+def write_time_index(path, key, index):
+    """Write a TimeIndex to path, under a temporary name renamed into
+    place."""
+
+    columns = {}
+    chunks = []
+    offset = 0
+    for (name, typecode) in (('times', 'q'), ('offsets', 'Q'),
+                             ('rows', 'I')):
+        buf = array(typecode, getattr(index, name)).tobytes()
+        columns[name] = [offset, len(buf)]
+        chunks.append(buf)
+        chunks.append(b'\0' * (_align(len(buf)) - len(buf)))
+        offset += _align(len(buf))
+
+    values = '\n'.join(index.values).encode('latin-1')
+    meta = {
+        'key' : key,
+        'byteorder' : sys.byteorder,
+        'itemsize' : _itemsize(),
+        'interval' : index.interval,
+        'top' : index.top,
+        'codes' : index.codes,
+        'columns' : columns,
+        'values' : [offset, len(values), len(index.values)],
+    }
+    meta = json.dumps(meta).encode('utf-8')
+    head = MAGIC + struct.pack('<Q', len(meta)) + meta
+    head += b'\0' * (_align(len(head)) - len(head))
+
+    tmp = "{}.{}.tmp".format(path, os.getpid())
+    try:
+        with open(tmp, 'wb') as fh:
+            fh.write(head)
+            for buf in chunks:
+                fh.write(buf)
+            fh.write(values)
+        os.rename(tmp, path)
+    except:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def read_time_index(path, key=None, interval=None, top=None):
+    """Memory-map the time index at path. Return a TimeIndex, or None if
+    the file is missing or unreadable, was written on a different platform,
+    or does not match key, interval or the indexed scope top."""
+
+    try:
+        fh = open(path, 'rb')
+    except (IOError, OSError):
+        return None
+    with fh:
+        if fh.read(len(MAGIC)) != MAGIC:
+            return None
+        (meta_len,) = struct.unpack('<Q', fh.read(8))
+        try:
+            meta = json.loads(fh.read(meta_len).decode('utf-8'))
+        except ValueError:
+            return None
+        if key is not None and meta['key'] != key:
+            return None
+        if interval is not None and meta['interval'] != interval:
+            return None
+        if meta['top'] != top:
+            return None
+        if meta['byteorder'] != sys.byteorder or \
+                meta['itemsize'] != _itemsize():
+            return None
+        base = _align(len(MAGIC) + 8 + meta_len)
+        buf = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+    view = memoryview(buf)
+    columns = {}
+    for (name, typecode) in (('times', 'q'), ('offsets', 'Q'),
+                             ('rows', 'I')):
+        (offset, length) = meta['columns'][name]
+        columns[name] = view[base + offset:base + offset + length] \
+                        .cast(typecode)
+    (offset, length, count) = meta['values']
+    values = []
+    if count:
+        start = base + offset
+        values = view[start:start + length].tobytes().decode('latin-1') \
+                 .split('\n')
+
+    return TimeIndex(columns['times'], columns['offsets'], meta['codes'],
+                     columns['rows'], values, meta['interval'], meta['top'])
@@ -0,0 +1,139 @@
+# legacy_vcd.py
+# The parse_vcd of Verilog_VCD as first imported into this repository, which
+# reads the whole file line by line as text. Kept unchanged for run_bench.py
+# to measure the current parser against.
+
+from Verilog_VCD import VCDParseError, calc_mult
+
+
+def parse_vcd(file, only_sigs=0, use_stdout=0, siglist=[], opt_timescale=''):
+    """Parse input VCD file into data structure.
+    Also, print t-v pairs to STDOUT, if requested."""
+
+    global endtime
+
+    usigs = {}
+    for i in siglist:
+        usigs[i] = 1
+
+    if len(usigs):
+        all_sigs = 0
+    else:
+        all_sigs = 1
+
+    data = {}
+    mult = 0
+    num_sigs = 0
+    hier = []
+    time = 0
+
+    with open(file, 'r') as fh:
+        while True:
+            line = fh.readline()
+            if line == '': # EOF
+                break
+
+            # chomp
+            # s/ ^ \s+ //x
+            line = line.strip()
+
+            # if nothing left after we strip whitespace, go to next line
+            if line == '':
+                continue
+
+            # put most frequent lines encountered at start of if/elif, so other
+            #   clauses usually don't need to be tested
+            if line[0] in ('b', 'B', 'r', 'R'):
+                (value,code) = line[1:].split()
+                if (code in data):
+                    if (use_stdout):
+                        print( time, value )
+                    else:
+                        if 'tv' not in data[code]:
+                            data[code]['tv'] = []
+                        data[code]['tv'].append( (time, value) )
+
+            elif line[0] in ('0', '1', 'x', 'X', 'z', 'Z'):
+                value = line[0]
+                code = line[1:]
+                if (code in data):
+                    if (use_stdout):
+                        print( time, value )
+                    else:
+                        if 'tv' not in data[code]:
+                            data[code]['tv'] = []
+                        data[code]['tv'].append( (time, value) )
+
+            elif line[0]=='#':
+                time = mult * int(line[1:])
+                endtime = time
+
+            elif "$enddefinitions" in line:
+                num_sigs = len(data)
+                if (num_sigs == 0):
+                    if (all_sigs):
+                        VCDParseError("Error: No signals were found in the "\
+                                "VCD file "+file+". Check the VCD file for "\
+                                "proper var syntax.")
+
+                    else:
+                        VCDParseError("Error: No matching signals were found "\
+                                "in the VCD file "+file+". Use list_sigs to "\
+                                "view all signals in the VCD file.")
+
+                if ((num_sigs>1) and use_stdout):
+                    VCDParseError("Error: There are too many signals "\
+                            "(num_sigs) for output to STDOUT.  Use list_sigs "\
+                            "to select a single signal.")
+
+                if only_sigs:
+                    break
+
+            elif "$timescale" in line:
+                statement = line
+                if not "$end" in line:
+                    while fh:
+                        line = fh.readline()
+                        statement += line
+                        if "$end" in line:
+                            break
+
+                mult = calc_mult(statement, opt_timescale)
+
+            elif "$scope" in line:
+                # assumes all on one line
+                #   $scope module dff end
+                hier.append( line.split()[2] ) # just keep scope name
+
+            elif "$upscope" in line:
+                hier.pop()
+
+            elif "$var" in line:
+                # assumes all on one line:
+                #   $var reg 1 *@ data $end
+                #   $var wire 4 ) addr [3:0] $end
+                ls = line.split()
+                type = ls[1]
+                size = ls[2]
+                code = ls[3]
+                name = "".join(ls[4:-1])
+                path = '.'.join(hier)
+                full_name = path + '.' + name
+                if (full_name in usigs) or all_sigs:
+                  if code not in data:
+                      data[code] = {}
+                  if 'nets' not in data[code]:
+                      data[code]['nets'] = []
+                  var_struct = {
+                      'type' : type,
+                      'name' : name,
+                      'size' : size,
+                      'hier' : path,
+                   }
+                  if var_struct not in data[code]['nets']:
+                      data[code]['nets'].append( var_struct )
+
+    fh.close()
+
+    return data
+
@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+# run_bench.py
+# Benchmarks of VCD parsing, filtering and comparison on synthetic dumps.
+#
+# Every case generates its dumps with vcd_gen.py, then runs each measurement
+# in a fresh worker process, so that peak RSS belongs to that measurement
+# alone. Results are printed as a table and written as JSON, to be compared
+# across runs. Nothing here needs VCS or a network connection.
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import Verilog_VCD as vcd
+import legacy_vcd
+import sv2v_test
+from vcd_gen import TOP, write_vcd
+
+RESULTS_VERSION = 1
+DEFAULT_OUTPUT = "bench_results.json"
+
+# name -> vcd_gen.write_vcd parameters
+CASES = {
+    "small": dict(signals=100, width=8, depth=2, density=0.1, length=20000),
+    "wide": dict(signals=50, width=64, depth=2, density=0.2, length=20000),
+    "deep": dict(signals=400, width=1, depth=8, density=0.05, length=20000),
+    "dense": dict(signals=200, width=4, depth=3, density=0.5, length=10000),
+    "long": dict(signals=200, width=4, depth=3, density=0.1, length=100000),
+}
+QUICK_CASES = ["small", "deep"]
+# Signals selected by the parse_few measurements
+FEW_SIGNALS = 4
+# measurement -> the same measurement with the legacy parser
+LEGACY = {"parse": "parse_legacy", "parse_few": "parse_legacy_few"}
+
+def count_changes(vcd_dict):
+    """Counts the value changes in a parsed VCD dictionary.
+
+    Args:
+        vcd_dict (dict):    VCD dictionary generated by the Verilog_VCD module
+
+    Returns:
+        (int):  number of value changes
+    """
+    return sum(len(sig["tv"]) for sig in vcd_dict.values() if "tv" in sig)
+
+def measure(task):
+    """Runs one measurement. Called in a fresh worker process.
+
+    Args:
+        task (tuple):   (kind, paths), with kind one of the MEASUREMENTS
+
+    Returns:
+        (dict): wall and CPU seconds, peak RSS in KiB and changes seen
+    """
+    (kind, paths) = task
+    sv2v_test.set_options()
+    changes = None
+    few = sorted(vcd.list_sigs(paths[0]))[:FEW_SIGNALS]
+    start_wall = time.time()
+    start_cpu = time.process_time()
+    if (kind == "parse_legacy"):
+        changes = count_changes(legacy_vcd.parse_vcd(paths[0]))
+    elif (kind == "parse"):
+        changes = count_changes(vcd.parse_vcd(paths[0]))
+    elif (kind == "parse_legacy_few"):
+        changes = count_changes(legacy_vcd.parse_vcd(paths[0], siglist=few))
+    elif (kind == "parse_few"):
+        changes = count_changes(vcd.parse_vcd(paths[0], siglist=few))
+    elif (kind == "parse_compact"):
+        changes = count_changes(vcd.parse_vcd(paths[0], compact=1))
+    elif (kind == "parse_top"):
+        changes = count_changes(vcd.parse_vcd(paths[0],
+                scope=vcd.scope_exact(TOP)))
+    elif (kind == "filter"):
+        parsed = vcd.parse_vcd(paths[0])
+        start_wall = time.time()
+        start_cpu = time.process_time()
+        sv2v_test.filter_vcd(parsed, TOP)
+    elif (kind in ("compare_match", "compare_mismatch")):
+        (is_equiv, out_str) = sv2v_test.compare_vcd(paths[0], paths[1], TOP,
+                paths[0], paths[1])
+        if (is_equiv != (kind == "compare_match")):
+            raise RuntimeError("{}: unexpected verdict {}".format(kind,
+                    is_equiv))
+    result = {
+        "wall_s": time.time() - start_wall,
+        "cpu_s": time.process_time() - start_cpu,
+        "peak_rss_kib": None,
+        "changes": changes,
+    }
+    if (resource != None):
+        # ru_maxrss is in KiB on Linux, but in bytes on macOS
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if (sys.platform == "darwin"):
+            rss //= 1024
+        result["peak_rss_kib"] = rss
+    return result
+
+# measurement -> indexes of the files it uses: 0 golden, 1 copy, 2 mismatch
+MEASUREMENTS = [
+    ("parse_legacy", (0,)),
+    ("parse", (0,)),
+    ("parse_legacy_few", (0,)),
+    ("parse_few", (0,)),
+    ("parse_compact", (0,)),
+    ("parse_top", (0,)),
+    ("filter", (0,)),
+    ("compare_match", (0, 1)),
+    ("compare_mismatch", (0, 2)),
+]
+
+def run_case(name, params, work_dir, repeat):
+    """Generates the dumps of a case and runs every measurement on them.
+
+    Args:
+        name (str):         name of the case
+        params (dict):      vcd_gen.write_vcd parameters
+        work_dir (str):     directory for the generated dumps
+        repeat (int):       runs per measurement, the fastest is kept
+
+    Returns:
+        (dict): parameters, file statistics and measurements of the case
+    """
+    paths = [os.path.join(work_dir, "{}_{}.vcd".format(name, suffix))
+             for suffix in ("golden", "copy", "mismatch")]
+    stats = write_vcd(paths[0], **params)
+    write_vcd(paths[1], **params)
+    write_vcd(paths[2], mismatch_at=params["length"] // 2, **params)
+
+    case = {"name": name, "params": params, "bytes": stats["bytes"],
+            "changes": stats["changes"], "results": dict()}
+    mb = stats["bytes"] / float(1024 ** 2)
+    for (kind, files) in MEASUREMENTS:
+        runs = []
+        for i in range(repeat):
+            pool = multiprocessing.Pool(1)
+            try:
+                runs.append(pool.apply(measure,
+                        ((kind, [paths[f] for f in files]),)))
+            finally:
+                pool.terminate()
+                pool.join()
+        best = min(runs, key=lambda r: r["wall_s"])
+        best["peak_rss_kib"] = max(r["peak_rss_kib"] for r in runs) \
+                if (best["peak_rss_kib"] != None) else None
+        if (kind.startswith("parse") or kind.startswith("compare")):
+            best["mb_per_s"] = len(files) * mb / best["wall_s"]
+            best["changes_per_s"] = len(files) * stats["changes"] / \
+                    best["wall_s"]
+        case["results"][kind] = best
+    return case
+
+def git_revision():
+    """Gets the commit the benchmarks ran on.
+
+    Args:
+        None
+
+    Returns:
+        (str | None):   commit hash, or None outside a git checkout
+    """
+    try:
+        out = subprocess.check_output(["git", "rev-parse", "HEAD"],
+                cwd=BENCH_DIR, stderr=open(os.devnull, "w"))
+        return out.decode("ascii").strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_case(case):
+    print("\n{} ({:.1f} MB, {} changes)".format(case["name"],
+            case["bytes"] / float(1024 ** 2), case["changes"]))
+    for (kind, files) in MEASUREMENTS:
+        r = case["results"][kind]
+        line = "\t{:<18} {:8.3f} s wall {:8.3f} s cpu".format(kind,
+                r["wall_s"], r["cpu_s"])
+        if ("mb_per_s" in r):
+            line += " {:8.2f} MB/s {:10.0f} changes/s".format(r["mb_per_s"],
+                    r["changes_per_s"])
+        if (r["peak_rss_kib"] != None):
+            line += " {:8.1f} MiB peak".format(r["peak_rss_kib"] / 1024.0)
+        if (kind in LEGACY):
+            line += " {:5.2f}x legacy".format(
+                    case["results"][LEGACY[kind]]["wall_s"] / r["wall_s"])
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(
+            description="Benchmark VCD parsing and comparison on synthetic "
+                        "dumps")
+    parser.add_argument("cases", nargs="*",
+            help="cases to run, out of {} (default: all)".format(
+                 ", ".join(sorted(CASES))))
+    parser.add_argument("--quick", action="store_true",
+            help="run only the {} cases".format(" and ".join(QUICK_CASES)))
+    parser.add_argument("--scale", type=float, default=1.0,
+            help="multiply the trace length of every case by SCALE "
+                 "(default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=1,
+            help="runs per measurement, the fastest is kept "
+                 "(default: %(default)s)")
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT,
+            help="JSON file to write the results to (default: %(default)s)")
+    parser.add_argument("--work-dir",
+            help="directory for the generated dumps, which are kept "
+                 "(default: a temporary directory)")
+    args = parser.parse_args()
+
+    names = args.cases or (QUICK_CASES if args.quick else sorted(CASES))
+    for name in names:
+        if (name not in CASES):
+            parser.error("unknown case {}".format(name))
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="vcd_bench_")
+    if not (os.path.isdir(work_dir)):
+        os.makedirs(work_dir)
+    results = {
+        "version": RESULTS_VERSION,
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": multiprocessing.cpu_count(),
+        "cases": [],
+    }
+    try:
+        for name in names:
+            params = dict(CASES[name])
+            params["length"] = max(1, int(params["length"] * args.scale))
+            case = run_case(name, params, work_dir, args.repeat)
+            print_case(case)
+            results["cases"].append(case)
+    finally:
+        if (args.work_dir == None):
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    with open(args.output, "w") as fh:
+        json.dump(results, fh, indent=2, sort_keys=True)
+    print("\nResults written to {}".format(args.output))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
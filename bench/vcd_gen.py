@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# vcd_gen.py
+# Deterministic synthetic VCD generator for the benchmarks.
+#
+# The same parameters and seed always produce the same file, so benchmark
+# runs on different days or machines parse the same input. Signals are
+# spread round-robin over a chain of nested scopes (top, top.u1, top.u1.u2,
+# ...), and every timestamp changes a fixed fraction of them.
+
+import argparse
+import os
+import random
+
+TOP = "top"
+TIMESTEP = 5
+
+def make_code(n):
+    """Makes the n-th VCD identifier code, from the printable characters.
+
+    Args:
+        n (int):    index of the signal
+
+    Returns:
+        (str):  identifier code
+    """
+    code = ""
+    while True:
+        code += chr(33 + n % 94)
+        n //= 94
+        if (n == 0):
+            return code
+
+def write_vcd(path, signals=100, width=8, depth=2, density=0.1, length=10000,
+        seed=1, mismatch_at=None):
+    """Writes a synthetic VCD file.
+
+    Args:
+        path (str):         path of the file to write
+        signals (int):      number of signals
+        width (int):        width of every signal, 1 for scalars
+        depth (int):        number of nested scopes the signals are spread over
+        density (float):    fraction of the signals changing per timestamp
+        length (int):       number of timestamps
+        seed (int):         seed of the value sequence
+        mismatch_at (int):  timestamp index at which the first top-level
+                            signal gets an extra, different value, or None for
+                            no mismatch. Files differing only in this parameter
+                            match everywhere else.
+
+    Returns:
+        (dict): size of the file in bytes and number of value changes
+    """
+    rng = random.Random(seed)
+    codes = [make_code(n) for n in range(signals)]
+    per_step = max(1, int(round(signals * density)))
+    changes = 0
+
+    with open(path, "w") as fh:
+        fh.write("$date synthetic $end\n$version vcd_gen.py $end\n")
+        fh.write("$timescale 1ns $end\n")
+        for level in range(depth):
+            fh.write("$scope module {} $end\n".format(
+                    TOP if level == 0 else "u{}".format(level)))
+            for n in range(level, signals, depth):
+                name = "s{}".format(n)
+                if (width > 1):
+                    name += " [{}:0]".format(width - 1)
+                fh.write("$var wire {} {} {} $end\n".format(width, codes[n],
+                        name))
+        fh.write("$upscope $end\n" * depth)
+        fh.write("$enddefinitions $end\n")
+
+        # All signals start out unknown
+        lines = ["#0", "$dumpvars"]
+        for code in codes:
+            lines.append(("b" + "x" * width + " " if width > 1 else "x") +
+                         code)
+        lines.append("$end")
+        changes += signals
+
+        last = "x" * width
+        for step in range(1, length + 1):
+            lines.append("#{}".format(step * TIMESTEP))
+            for n in rng.sample(range(signals), per_step):
+                if (width > 1):
+                    value = format(rng.getrandbits(width), "0{}b".format(width))
+                    lines.append("b{} {}".format(value, codes[n]))
+                else:
+                    value = rng.choice("01")
+                    lines.append(value + codes[n])
+                if (n == 0):
+                    last = value
+            if (step == mismatch_at):
+                # Signal 0 is declared in the top scope
+                value = "1" * width if (last != "1" * width) else "0" * width
+                lines.append(("b{} ".format(value) if width > 1 else value) +
+                             codes[0])
+                changes += 1
+                last = value
+            changes += per_step
+            if (len(lines) >= 100000):
+                fh.write("\n".join(lines) + "\n")
+                lines = []
+        fh.write("\n".join(lines) + "\n")
+
+    return {"bytes": os.path.getsize(path), "changes": changes}
+
+def main():
+    parser = argparse.ArgumentParser(
+            description="Write a deterministic synthetic VCD file")
+    parser.add_argument("path", help="path of the VCD file to write")
+    parser.add_argument("--signals", type=int, default=100,
+            help="number of signals (default: %(default)s)")
+    parser.add_argument("--width", type=int, default=8,
+            help="width of every signal (default: %(default)s)")
+    parser.add_argument("--depth", type=int, default=2,
+            help="number of nested scopes (default: %(default)s)")
+    parser.add_argument("--density", type=float, default=0.1,
+            help="fraction of signals changing per timestamp "
+                 "(default: %(default)s)")
+    parser.add_argument("--length", type=int, default=10000,
+            help="number of timestamps (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=1,
+            help="seed of the value sequence (default: %(default)s)")
+    parser.add_argument("--mismatch-at", type=int,
+            help="timestamp index of a deliberate mismatch on a top-level "
+                 "signal")
+    args = parser.parse_args()
+    stats = write_vcd(args.path, args.signals, args.width, args.depth,
+            args.density, args.length, args.seed, args.mismatch_at)
+    print("Wrote {} bytes, {} value changes to {}".format(stats["bytes"],
+            stats["changes"], args.path))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,279 @@
+# daemon.py
+# Comparison server on a local UNIX socket, and its client.
+#
+# The server keeps the VCD files it parsed in a ParsedCache, so that jobs
+# comparing against the same golden dump skip parsing it, and runs the job
+# of each client in a thread of its own, so that a long comparison does not
+# hold up the others. A job and its result
+# are single lines of JSON: the client sends the job and reads the result
+# back on the same connection. What a job holds and returns is up to the
+# function running it, which the server is given.
+
+import collections
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+
+PROTOCOL_VERSION = 1
+# Default memory budget of the parsed VCD files kept by a server
+CACHE_MAX_BYTES = 1024 ** 3
+# Estimated bytes in memory per byte of a VCD file on disk, until files have
+# been parsed to measure it
+SIZE_RATIO = 2.0
+# Number of files used once that are remembered, so that they are parsed on
+# their second use
+SEEN_MAX = 4096
+
+class ParsedCache(object):
+    """Least recently used cache of parsed VCD files, bounded by their
+    estimated size in memory. Entries are keyed by path and scope, and are
+    parsed again once their file changes on disk.
+
+    A file is only parsed and kept from its second use on, so that dumps
+    compared once, like fresh candidate dumps, never push out the golden
+    dumps compared again and again. A file whose size on disk, times the
+    ratio of memory to disk size of the files parsed so far, exceeds the
+    whole budget is never parsed, and neither is one found too large once
+    parsed. For those files and files used for the first time, get()
+    returns None, and the file is to be streamed from disk instead.
+
+    The cache is shared by the threads of a server. A file is parsed
+    outside of its lock, so jobs using other files do not wait for it.
+
+    Args:
+        max_bytes (int):    memory budget of the entries
+        parse (callable):   (path, scope name) -> parsed file, with an
+                            nbytes() method estimating its size
+    """
+    def __init__(self, max_bytes, parse):
+        self.max_bytes = max_bytes
+        self.parse = parse
+        self.entries = collections.OrderedDict()
+        self.bytes = 0
+        # key -> (stamp, whether it fits) of files that are not kept
+        self.seen = collections.OrderedDict()
+        self.parsed_bytes = 0
+        self.file_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def session(self):
+        """Gets a view of the cache counting the hits and misses of one job.
+
+        Args:
+            None
+
+        Returns:
+            (CacheSession): the view
+        """
+        return CacheSession(self)
+
+    def estimate(self, file_size):
+        """Estimates the size in memory of a parsed file.
+
+        Args:
+            file_size (int):    size of the file on disk
+
+        Returns:
+            (float):    estimated size of the file once parsed
+        """
+        if (self.file_bytes == 0):
+            return file_size * SIZE_RATIO
+        return file_size * self.parsed_bytes / self.file_bytes
+
+    def get(self, path, scope_name, session=None):
+        """Gets a parsed VCD file, parsing it if it is used for the second
+        time and not cached or changed.
+
+        Args:
+            path (str):         path to the VCD file
+            scope_name (str):   name of the scope to parse
+            session (CacheSession): view to count the hit or miss in too,
+                                    or None
+
+        Returns:
+            (object):   parsed file, as returned by parse, or None if the
+                        file is to be streamed from disk
+        """
+        st = os.stat(path)
+        stamp = (st.st_size, st.st_mtime_ns, st.st_ino)
+        key = (os.path.abspath(path), scope_name)
+        counters = [self] if (session == None) else [self, session]
+        with self.lock:
+            entry = self.entries.get(key)
+            if (entry != None and entry[0] == stamp):
+                self.entries.move_to_end(key)
+                for counter in counters:
+                    counter.hits += 1
+                return entry[1]
+            if (entry != None):
+                self._drop(key)
+
+            for counter in counters:
+                counter.misses += 1
+            seen = self.seen.get(key)
+            if (seen == None or seen[0] != stamp):
+                # First use of this version of the file
+                self._remember(key, stamp, True)
+                return None
+            if not (seen[1] and self.estimate(st.st_size) <= self.max_bytes):
+                self._remember(key, stamp, False)
+                return None
+            # Another job using the file meanwhile streams it
+            del self.seen[key]
+
+        data = self.parse(path, scope_name)
+        size = data.nbytes()
+        with self.lock:
+            self.parsed_bytes += size
+            self.file_bytes += st.st_size
+            if (size > self.max_bytes):
+                # Used this once, but not parsed again
+                self._remember(key, stamp, False)
+                return data
+            if (key in self.entries):
+                self._drop(key)
+            self.entries[key] = (stamp, data, size)
+            self.bytes += size
+            while (self.bytes > self.max_bytes):
+                self._drop(next(iter(self.entries)))
+        return data
+
+    def _remember(self, key, stamp, fits):
+        self.seen.pop(key, None)
+        self.seen[key] = (stamp, fits)
+        while (len(self.seen) > SEEN_MAX):
+            self.seen.popitem(last=False)
+
+    def _drop(self, key):
+        self.bytes -= self.entries.pop(key)[2]
+
+class CacheSession(object):
+    """View of a ParsedCache for one job, counting the hits and misses of
+    the job alone while jobs of other clients use the cache too.
+
+    Args:
+        cache (ParsedCache):    the cache
+    """
+    def __init__(self, cache):
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path, scope_name):
+        """Gets a parsed VCD file, like ParsedCache.get.
+
+        Args:
+            path (str):         path to the VCD file
+            scope_name (str):   name of the scope to parse
+
+        Returns:
+            (object):   parsed file, or None if the file is to be streamed
+                        from disk
+        """
+        return self.cache.get(path, scope_name, self)
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not (line):
+            return      # e.g. a probe for a running server
+        try:
+            job = json.loads(line.decode("utf-8"))
+            if (job.get("version") != PROTOCOL_VERSION):
+                raise ValueError("unsupported protocol version {}".format(
+                        job.get("version")))
+            result = self.server.run_job(job)
+        except Exception as e:
+            result = {"error": "{}: {}".format(type(e).__name__, e)}
+        try:
+            self.wfile.write((json.dumps(result) + "\n").encode("utf-8"))
+        except (IOError, OSError):
+            pass        # the client is gone
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Server running jobs sent to a UNIX socket, each connection in a
+    thread of its own. A stale socket file left by a server that died is
+    replaced.
+
+    Args:
+        path (str):             path of the socket
+        run_job (callable):     job (dict) -> result (dict), called from
+                                the threads of several connections at once
+    """
+    # Jobs still running when the server stops are abandoned
+    daemon_threads = True
+
+    def __init__(self, path, run_job):
+        self.run_job = run_job
+        if (os.path.exists(path)):
+            if (_listening(path)):
+                raise OSError("a server is already listening on " + path)
+            os.remove(path)
+        socketserver.UnixStreamServer.__init__(self, path, _Handler)
+
+def _listening(path):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        return True
+    except (IOError, OSError):
+        return False
+    finally:
+        sock.close()
+
+def serve(server):
+    """Runs a server until it gets SIGTERM or SIGINT, then removes its
+    socket.
+
+    Args:
+        server (Server):    the server
+
+    Returns:
+        None
+    """
+    path = server.server_address
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def request(path, job, timeout=None):
+    """Sends a job to a server and waits for its result.
+
+    Args:
+        path (str):         path of the server's socket
+        job (dict):         the job, without the protocol version
+        timeout (float):    seconds to wait for the result, or None
+
+    Returns:
+        (dict): result of the job
+
+    Raises:
+        OSError:    if no server listens on path, or the connection fails
+    """
+    job = dict(job, version=PROTOCOL_VERSION)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall((json.dumps(job) + "\n").encode("utf-8"))
+        with sock.makefile("rb") as fh:
+            line = fh.readline()
+    finally:
+        sock.close()
+    if not (line):
+        raise OSError("no result from the server on " + path)
+    return json.loads(line.decode("utf-8"))
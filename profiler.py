@@ -0,0 +1,196 @@
+# profiler.py
+# Per-phase timing and resource accounting, for --profile.
+#
+# A phase records its wall time, the CPU time of this process and of the
+# child processes reaped during it, and the peak memory of this process
+# while it ran. On Linux the peak is reset at the start of every phase
+# through /proc/self/clear_refs, so it belongs to that phase; elsewhere it is
+# the peak of the process so far. Python phases can also be run under
+# cProfile, with the statistics of all of them dumped to one file.
+
+import json
+import re
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+PROFILE_VERSION = 1
+
+def _maxrss_kib(who):
+    rss = resource.getrusage(who).ru_maxrss
+    # KiB on Linux, bytes on macOS
+    return rss // 1024 if (sys.platform == "darwin") else rss
+
+def reset_peak_rss():
+    """Resets the peak resident set size of this process, where the
+    platform allows it.
+
+    Args:
+        None
+
+    Returns:
+        (bool): whether the peak was reset
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+        return True
+    except (IOError, OSError):
+        return False
+
+def peak_rss_kib():
+    """Gets the peak resident set size of this process.
+
+    Args:
+        None
+
+    Returns:
+        (int | None):   peak RSS in KiB, since the last reset_peak_rss() if
+                        it succeeded, or None if unknown
+    """
+    try:
+        with open("/proc/self/status", "r") as fh:
+            match = re.search(r"VmHWM:\s+(\d+)", fh.read())
+        if (match):
+            return int(match.group(1))
+    except (IOError, OSError):
+        pass
+    if (resource == None):
+        return None
+    return _maxrss_kib(resource.RUSAGE_SELF)
+
+def _children_cpu():
+    if (resource == None):
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+def usage_of(rusage):
+    """Converts the resource usage of a single child process.
+
+    Args:
+        rusage (struct_rusage): usage from os.wait4(), or None
+
+    Returns:
+        (dict): child_cpu_s and child_peak_rss_kib, empty if rusage is None
+    """
+    if (rusage == None):
+        return dict()
+    rss = rusage.ru_maxrss
+    if (sys.platform == "darwin"):
+        rss //= 1024
+    return {"child_cpu_s": rusage.ru_utime + rusage.ru_stime,
+            "child_peak_rss_kib": rss}
+
+class Profile(object):
+    """Phases and per-file counters of one run.
+
+    Args:
+        cprofile_path (str):    file to dump cProfile statistics of the
+                                Python phases to, or None
+    """
+    def __init__(self, cprofile_path=None):
+        self.phases = []
+        self.files = dict()
+        self.start = time.time()
+        self.cprofile_path = cprofile_path
+        self.cprofile = None
+        if (cprofile_path != None):
+            import cProfile
+            self.cprofile = cProfile.Profile()
+
+    @contextmanager
+    def phase(self, name, side=None, python=False, **info):
+        """Context manager recording one phase. The record it yields can be
+        updated with more information, e.g. the usage of a child process.
+
+        Args:
+            name (str):     name of the phase
+            side (str):     design or file the phase works on, or None
+            python (bool):  run the phase under cProfile, if enabled
+            **info:         more fields of the record
+
+        Returns:
+            (generator):    yields the record (dict) of the phase
+        """
+        record = {"phase": name, "side": side}
+        record.update(info)
+        reset = reset_peak_rss()
+        children = _children_cpu()
+        wall = time.time()
+        cpu = time.process_time()
+        profiling = python and (self.cprofile != None)
+        if (profiling):
+            self.cprofile.enable()
+        try:
+            yield record
+        except BaseException as e:
+            record["error"] = type(e).__name__
+            raise
+        finally:
+            if (profiling):
+                self.cprofile.disable()
+            record["wall_s"] = time.time() - wall
+            record["cpu_s"] = time.process_time() - cpu
+            record.setdefault("child_cpu_s", _children_cpu() - children)
+            record["peak_rss_kib"] = peak_rss_kib()
+            record["peak_rss_scope"] = "phase" if (reset) else "process"
+            self.phases.append(record)
+
+    def count_file(self, path, **counters):
+        """Adds to the counters of a file, e.g. bytes parsed or changes.
+
+        Args:
+            path (str):     path to the file
+            **counters:     counter name -> amount to add
+
+        Returns:
+            None
+        """
+        entry = self.files.setdefault(path, dict())
+        for (name, amount) in counters.items():
+            entry[name] = entry.get(name, 0) + amount
+
+    def merge(self, phases):
+        """Adds the phases recorded by another process, e.g. a pool worker.
+
+        Args:
+            phases ([dict]):    phase records
+
+        Returns:
+            None
+        """
+        self.phases.extend(phases)
+
+    def write(self, path, command=None):
+        """Writes the profile as JSON, and the cProfile statistics if
+        enabled.
+
+        Args:
+            path (str):         JSON file to write
+            command ([str]):    command line of the run, or None
+
+        Returns:
+            None
+        """
+        out = {
+            "version": PROFILE_VERSION,
+            "command": command,
+            "wall_s": time.time() - self.start,
+            "phases": self.phases,
+            "files": self.files,
+            "cprofile": self.cprofile_path,
+        }
+        if (resource != None):
+            out["peak_rss_kib"] = _maxrss_kib(resource.RUSAGE_SELF)
+            out["children_peak_rss_kib"] = _maxrss_kib(
+                    resource.RUSAGE_CHILDREN)
+        with open(path, "w") as fh:
+            json.dump(out, fh, indent=2)
+        if (self.cprofile != None):
+            self.cprofile.dump_stats(self.cprofile_path)
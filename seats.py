@@ -0,0 +1,221 @@
+# seats.py
+# VCS license seats shared by every sv2v_test.py process on the host.
+#
+# A seat is a lock file, seat.N in the seat directory, held with flock()
+# while a compile or simulation runs. The kernel releases the lock when its
+# holder exits, however it exits, so seats never leak. Processes waiting for
+# seats queue as ticket files, also locked by their owners, and only the
+# waiter at the head of the queue may take free seats: higher priorities go
+# first, and equal priorities in order of arrival. Tickets of waiters that
+# died are found by their missing lock and removed.
+#
+# Runs of several users only share seats through a directory all of them can
+# write to, which the default one, of each user's own, is not. The
+# directories are created group-writable and setgid, and the files readable
+# by all, whatever the umask, so that a directory of a group every user is
+# in works for all of them.
+
+import fcntl
+import os
+import re
+import tempfile
+import time
+
+# Default directory of the seat and ticket files, one per user
+SEAT_DIR = os.path.join(tempfile.gettempdir(),
+        "sv2v_test_seats-{}".format(os.getuid()))
+# Modes of the directories and of the seat and ticket files created
+DIR_MODE = 0o2775
+FILE_MODE = 0o664
+# Seconds between two looks at the queue while waiting
+POLL_INTERVAL = 0.1
+# Retries of a VCS run that could not check out a license, and the delay
+# before the first one in seconds, doubled for every further retry
+LICENSE_RETRIES = 3
+RETRY_DELAY = 5
+# Lines of a failed VCS run that only a license checkout failure writes:
+#   the tagged license errors of VCS and the numbered errors of its
+#   FlexNet (FLEXlm) and Synopsys Common Licensing clients
+LICENSE_ERROR = re.compile(r"^\s*(?:Error-\[LIC[A-Z_-]*\]|"
+        r"(?:FLEXlm|FlexNet Licensing) error:\s*-\d+,\s*\d+|"
+        r"Error: .*\(SCL-\d+\))", re.MULTILINE)
+# Lines VCS writes when it cannot check out a license, which a design could
+#   also $display or $fatal, so they only count where seats are pooled and
+#   licenses are known to run short
+LICENSE_MESSAGE = re.compile(r"^\s*(?:Error:\s*)?(?:"
+        r"Unable to check ?out (?:a |the )?(?:VCS )?license|"
+        r"Failed to (?:obtain|check ?out) (?:a |the )?(?:VCS )?license|"
+        r"License checkout failed|"
+        r"Licensed number of users already reached)", re.MULTILINE |
+        re.IGNORECASE)
+
+def _lock(path, blocking=False):
+    # flock() needs no write access, so files created by other users can be
+    #   locked as long as they are readable
+    fd = os.open(path, os.O_RDONLY | os.O_CREAT, FILE_MODE)
+    try:
+        if (os.fstat(fd).st_uid == os.getuid()):
+            os.fchmod(fd, FILE_MODE)
+    except OSError:
+        pass
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | (0 if (blocking) else fcntl.LOCK_NB))
+        return fd
+    except (IOError, OSError):
+        os.close(fd)
+        if (blocking):
+            raise
+        return None
+
+def _make_dir(path):
+    if (os.path.isdir(path)):
+        return
+    try:
+        os.makedirs(path)
+        os.chmod(path, DIR_MODE)
+    except OSError:
+        if not (os.path.isdir(path)):
+            raise
+
+def _ticket_key(name):
+    (priority, arrival, pid) = name.split("_")
+    return (-int(priority), int(arrival), int(pid))
+
+class Seats(object):
+    """Seats held by this process, until release() is called or the process
+    exits. Usable as a context manager.
+
+    Attributes:
+        wait (float):   seconds spent waiting for the seats
+    """
+    def __init__(self, fds, wait):
+        self.fds = fds
+        self.wait = wait
+
+    def release(self):
+        """Gives the seats back.
+
+        Returns:
+            None
+        """
+        for fd in self.fds:
+            os.close(fd)
+        self.fds = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+class SeatPool(object):
+    """A fixed number of seats shared through a directory. Every process
+    using the same directory must use the same number of seats.
+
+    Args:
+        count (int):        number of seats
+        directory (str):    directory of the seat and ticket files
+        priority (int):     queue priority of this process, higher first
+        poll (float):       seconds between two looks at the queue
+    """
+    def __init__(self, count, directory=SEAT_DIR, priority=0,
+            poll=POLL_INTERVAL):
+        self.count = count
+        self.dir = directory
+        self.queue_dir = os.path.join(directory, "queue")
+        self.priority = priority
+        self.poll = poll
+
+    def _enqueue(self):
+        for path in (self.dir, self.queue_dir):
+            _make_dir(path)
+        name = "{}_{}_{}".format(self.priority, int(time.time() * 1e9),
+                os.getpid())
+        # Locked before it is visible, so that it never looks abandoned
+        tmp = os.path.join(self.dir, ".{}".format(name))
+        fd = _lock(tmp)
+        path = os.path.join(self.queue_dir, name)
+        os.rename(tmp, path)
+        return (name, path, fd)
+
+    def _waiting_ahead(self, name):
+        key = _ticket_key(name)
+        for other in sorted(os.listdir(self.queue_dir), key=_ticket_key):
+            if (_ticket_key(other) >= key):
+                return False
+            path = os.path.join(self.queue_dir, other)
+            fd = _lock(path) if (os.path.exists(path)) else None
+            if (fd == None):
+                return True     # a live waiter, or one that just left
+            # Its owner died without dequeuing
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            os.close(fd)
+        return False
+
+    def _take(self, count):
+        fds = []
+        for n in range(self.count):
+            fd = _lock(os.path.join(self.dir, "seat.{}".format(n)))
+            if (fd != None):
+                fds.append(fd)
+                if (len(fds) == count):
+                    return fds
+        for fd in fds:
+            os.close(fd)
+        return None
+
+    def acquire(self, count=1, block=True):
+        """Takes seats, queuing behind the processes that wait for seats
+        with a higher priority or since longer.
+
+        Args:
+            count (int):    number of seats, all taken at once
+            block (bool):   wait until the seats are free
+
+        Returns:
+            (Seats | None): the seats, or None if block is False and they
+                            are not free right away
+
+        Raises:
+            ValueError: if count is more than the seats in the pool
+        """
+        if (count > self.count):
+            raise ValueError("{} seats wanted out of {}".format(count,
+                    self.count))
+        start = time.time()
+        (name, path, fd) = self._enqueue()
+        try:
+            while True:
+                if not (self._waiting_ahead(name)):
+                    fds = self._take(count)
+                    if (fds != None):
+                        return Seats(fds, time.time() - start)
+                if not (block):
+                    return None
+                time.sleep(self.poll)
+        finally:
+            os.remove(path)
+            os.close(fd)
+
+def license_failure(returncode, output, pooled=False):
+    """Checks whether a VCS run failed for want of a license. Mentions of a
+    license anywhere else in the output, e.g. in a file name or a message
+    of the design, do not count.
+
+    Args:
+        returncode (int):   exit code of the run
+        output (str):       output of the run
+        pooled (bool):      whether the run took a seat of a SeatPool, so
+                            that VCS's plain checkout messages count too
+
+    Returns:
+        (bool): whether the run failed and blamed the license server
+    """
+    if (returncode == 0):
+        return False
+    if (LICENSE_ERROR.search(output) != None):
+        return True
+    return (pooled and LICENSE_MESSAGE.search(output) != None)
@@ -0,0 +1,320 @@
+# sim_cache.py
+# Content-addressed, size-bounded on-disk store for simulation artifacts.
+#
+# Every entry is a directory named after its key, holding the files the
+# entry was created with. Entries are written under a temporary name and
+# renamed into place, so concurrent runs never see half-written entries.
+# The mtime of an entry directory is bumped on every hit and the least
+# recently used entries, of whichever kind, are evicted once the stores under
+# one root grow past their shared limit.
+#
+# A run holds a shared flock on every entry it got or put, until release(),
+# and eviction skips entries it cannot lock exclusively, so that a dump or
+# simv in use by this or any other run is never removed under it. Entries
+# used in the last EVICT_GRACE seconds are skipped as well, which covers an
+# entry handed from a pool worker to its parent between their two locks.
+# Runs sharing a store in threads of one process each hold their entries
+# through a session() of their own, so that releasing them leaves the
+# entries of the other runs locked.
+
+import fcntl
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+# Default location and size of the store
+CACHE_DIR = os.environ.get("SV2V_CACHE_DIR",
+        os.path.join(os.path.expanduser("~"), ".cache", "sv2v_test"))
+CACHE_MAX_BYTES = 2 * 1024 ** 3
+# Seconds after its last use during which an entry is never evicted
+EVICT_GRACE = 60
+
+def hash_file(path):
+    """Hashes the contents of a file.
+
+    Args:
+        path (str): path to the file
+
+    Returns:
+        (str):  hex SHA-1 digest of the file's contents
+    """
+    h = hashlib.sha1()
+    with open(path, "rb") as fh:
+        while True:
+            buf = fh.read(1 << 20)
+            if not buf:
+                break
+            h.update(buf)
+    return h.hexdigest()
+
+def hash_key(*parts):
+    """Combines strings into a single cache key.
+
+    Args:
+        *parts (str):   strings identifying the cached artifact
+
+    Returns:
+        (str):  hex SHA-1 digest of the parts
+    """
+    h = hashlib.sha1()
+    for part in parts:
+        part = str(part).encode("utf-8")
+        h.update("{}:".format(len(part)).encode("ascii"))
+        h.update(part)
+    return h.hexdigest()
+
+def tree_size(path):
+    """Computes the total size of the files under path.
+
+    Args:
+        path (str): path to a file or directory
+
+    Returns:
+        (int):  size in bytes
+    """
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    size = 0
+    for (root, dirs, files) in os.walk(path):
+        for name in files:
+            full = os.path.join(root, name)
+            if not os.path.islink(full):
+                size += os.path.getsize(full)
+    return size
+
+class ArtifactStore(object):
+    """Content-addressed store of files and directories, evicted in least
+    recently used order once its total size exceeds max_bytes.
+
+    Args:
+        root (str):         directory holding the store
+        max_bytes (int):    size limit of all the stores under root together
+        namespace (str):    subdirectory separating kinds of artifacts, which
+                            share the size limit
+    """
+    def __init__(self, root=CACHE_DIR, max_bytes=CACHE_MAX_BYTES,
+            namespace="sims"):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.dir = os.path.join(root, namespace)
+        # entry path -> descriptor holding its shared lock, for all the
+        # stores under the same root, and the lock guarding it against
+        # concurrent threads
+        self.held = {}
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        # Locks belong to the process that took them
+        state = dict(self.__dict__)
+        state["held"] = {}
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def sub(self, namespace):
+        """Returns a store for another kind of artifact under the same root,
+        sharing the size limit of this one.
+
+        Args:
+            namespace (str):    subdirectory of the other store
+
+        Returns:
+            (ArtifactStore):    the other store
+        """
+        store = ArtifactStore(self.root, self.max_bytes, namespace)
+        store.held = self.held
+        store.lock = self.lock
+        return store
+
+    def session(self):
+        """Returns a store of the same entries, whose locks are held and
+        released apart from those of this one, for a run sharing the store
+        with runs in other threads.
+
+        Returns:
+            (ArtifactStore):    the store of the run
+        """
+        return ArtifactStore(self.root, self.max_bytes,
+                os.path.basename(self.dir))
+
+    def entry_path(self, key):
+        return os.path.join(self.dir, key)
+
+    def get(self, key):
+        """Looks up an entry, marking it as recently used and locking it
+        against eviction until release().
+
+        Args:
+            key (str):  key of the entry
+
+        Returns:
+            (str | None):   path to the entry directory, or None on a miss
+        """
+        path = self.entry_path(key)
+        return path if self.hold(path) else None
+
+    def hold(self, path):
+        """Locks an entry against eviction until release(), marking it as
+        recently used.
+
+        Args:
+            path (str): path to the entry directory
+
+        Returns:
+            (bool): whether the entry still exists
+        """
+        with self.lock:
+            if (path in self.held):
+                os.utime(path, None)
+                return True
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            return False
+        try:
+            fcntl.flock(fd, fcntl.LOCK_SH)
+            # An evicting process may have renamed the entry away before
+            # the lock was granted
+            st = os.fstat(fd)
+            cur = os.stat(path)
+            if ((st.st_dev, st.st_ino) != (cur.st_dev, cur.st_ino)):
+                raise OSError("entry was evicted")
+            os.utime(path, None)
+        except OSError:
+            os.close(fd)
+            return False
+        with self.lock:
+            if (path in self.held):
+                # Held by another thread of this run meanwhile
+                os.close(fd)
+            else:
+                self.held[path] = fd
+        return True
+
+    def release(self):
+        """Releases the locks of every entry this run got or put, in all
+        the stores under the same root.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            while self.held:
+                (path, fd) = self.held.popitem()
+                os.close(fd)
+
+    def put(self, key, sources):
+        """Adds an entry holding copies of the given files or directories,
+        then evicts old entries if the store is over its size limit.
+
+        Args:
+            key (str):          key of the entry
+            sources (dict):     name in the entry -> path of file/directory
+
+        Returns:
+            (str):  path to the entry directory
+        """
+        if not os.path.isdir(self.dir):
+            try:
+                os.makedirs(self.dir)
+            except OSError:
+                if not os.path.isdir(self.dir):
+                    raise
+        path = self.entry_path(key)
+        tmp = tempfile.mkdtemp(prefix=".tmp-", dir=self.dir)
+        fd = None
+        try:
+            for (name, src) in sources.items():
+                dest = os.path.join(tmp, name)
+                if os.path.isdir(src):
+                    shutil.copytree(src, dest, symlinks=True)
+                else:
+                    shutil.copy2(src, dest)
+            # Locked before it becomes visible, so it cannot be evicted
+            # before this run is done with it
+            fd = os.open(tmp, os.O_RDONLY)
+            fcntl.flock(fd, fcntl.LOCK_SH)
+            os.rename(tmp, path)
+        except OSError:
+            # Another process stored the same entry first
+            if (fd != None):
+                os.close(fd)
+            shutil.rmtree(tmp, ignore_errors=True)
+            if not self.hold(path):
+                raise
+        except:
+            if (fd != None):
+                os.close(fd)
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        else:
+            with self.lock:
+                if (path in self.held):
+                    os.close(self.held[path])
+                self.held[path] = fd
+            os.utime(path, None)
+        self.evict(keep=key)
+        return path
+
+    def evict(self, keep=None):
+        """Removes least recently used entries until all the stores under
+        the same root fit in max_bytes together, whichever store the entries
+        belong to. Entries locked by a run, or used in the last EVICT_GRACE
+        seconds, are skipped.
+
+        Args:
+            keep (str): key of an entry of this store that must not be
+                        evicted
+
+        Returns:
+            None
+        """
+        keep = self.entry_path(keep) if (keep != None) else None
+        entries = []
+        total = 0
+        for namespace in os.listdir(self.root):
+            store_dir = os.path.join(self.root, namespace)
+            if namespace.startswith(".") or not os.path.isdir(store_dir):
+                continue
+            for name in os.listdir(store_dir):
+                path = os.path.join(store_dir, name)
+                if name.startswith(".") or not os.path.isdir(path):
+                    continue
+                try:
+                    size = tree_size(path)
+                    entries.append((os.path.getmtime(path), size, store_dir,
+                            name))
+                except OSError:
+                    continue    # evicted by another process meanwhile
+                total += size
+        entries.sort()
+        recent = time.time() - EVICT_GRACE
+        for (mtime, size, store_dir, name) in entries:
+            if (total <= self.max_bytes or mtime > recent):
+                break
+            path = os.path.join(store_dir, name)
+            if (path == keep):
+                continue
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except OSError:
+                continue
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                # Rename first, so readers never see a partially removed
+                # entry; they re-check the path once they get their lock
+                doomed = os.path.join(store_dir, ".evict-{}-{}".format(name,
+                        os.getpid()))
+                os.rename(path, doomed)
+            except (IOError, OSError):
+                continue    # in use, or evicted by another process
+            finally:
+                os.close(fd)
+            shutil.rmtree(doomed, ignore_errors=True)
+            total -= size
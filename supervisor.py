@@ -0,0 +1,301 @@
+# supervisor.py
+# Child process supervision with timeouts, for running simulations.
+#
+# Children are waited on through pidfds where the platform has them, so a
+# supervisor sleeps in select() until a child exits or the nearest deadline
+# passes, instead of polling. Elsewhere a thread per child waits for it to
+# exit, without reaping it, and wakes the select() through a pipe. Each child
+# runs in its own process group, which gets SIGTERM when its deadline passes
+# and SIGKILL if it is still alive after a grace period.
+
+import json
+import os
+import selectors
+import signal
+import subprocess
+import threading
+import time
+
+# Seconds between SIGTERM and SIGKILL for a timed out child
+GRACE_PERIOD = 5
+# Adaptive timeouts: multiple of the longest recorded duration, lower bound
+# in seconds, and number of durations kept per key
+ADAPT_FACTOR = 3
+ADAPT_MIN = 5
+HISTORY_LEN = 20
+
+def exit_code(status):
+    """Converts a wait status to a return code the way subprocess does.
+
+    Args:
+        status (int):   status from os.wait4()
+
+    Returns:
+        (int):  exit status of the process, or minus the signal that
+                killed it
+    """
+    if (os.WIFSIGNALED(status)):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+class Child(object):
+    """A supervised child process.
+
+    Attributes:
+        proc (Popen):       the process
+        timeout (float):    seconds it may run, or None
+        deadline (float):   monotonic time at which it times out, or None
+        start (float):      monotonic time at which it was started
+        duration (float):   run time, once it has exited
+        timed_out (bool):   whether it was killed for passing its deadline
+        rusage (struct_rusage): resource usage of the child and its reaped
+                                descendants, once it has exited, if the
+                                platform reports it
+    """
+    def __init__(self, proc, timeout):
+        self.proc = proc
+        self.timeout = timeout
+        self.start = time.monotonic()
+        self.deadline = None if (timeout == None) else self.start + timeout
+        self.kill_at = None
+        self.duration = None
+        self.timed_out = False
+        self.pidfd = None
+        self.watcher = None
+        self.exited = threading.Event()
+        self.rusage = None
+
+    @property
+    def returncode(self):
+        return self.proc.returncode
+
+class Supervisor(object):
+    """Runs child processes in their own process groups and waits for them
+    without polling, enforcing a timeout per child.
+
+    Args:
+        grace (float):  seconds between SIGTERM and SIGKILL on timeout
+    """
+    def __init__(self, grace=GRACE_PERIOD):
+        self.grace = grace
+        self.children = []
+        self.selector = selectors.DefaultSelector()
+        # Wakes the selector for children watched by threads
+        (self.wake_r, self.wake_w) = os.pipe()
+        self.selector.register(self.wake_r, selectors.EVENT_READ, None)
+
+    def __del__(self):
+        os.close(self.wake_r)
+        os.close(self.wake_w)
+
+    def spawn(self, command, timeout=None, **kwargs):
+        """Starts a child process.
+
+        Args:
+            command ([str]):    command to be passed into subprocess.Popen()
+            timeout (float):    seconds the child may run, or None
+            **kwargs:           other arguments to subprocess.Popen()
+
+        Returns:
+            (Child):    the new child
+        """
+        proc = subprocess.Popen(command, preexec_fn=os.setsid, **kwargs)
+        child = Child(proc, timeout)
+        if hasattr(os, "pidfd_open"):
+            try:
+                child.pidfd = os.pidfd_open(proc.pid)
+                self.selector.register(child.pidfd, selectors.EVENT_READ,
+                        child)
+            except OSError:
+                child.pidfd = None
+        if (child.pidfd == None):
+            child.watcher = threading.Thread(target=self._watch,
+                    args=(child,))
+            child.watcher.daemon = True
+            child.watcher.start()
+        self.children.append(child)
+        return child
+
+    def _watch(self, child):
+        # Leaves the child unreaped, for _reap to get its resource usage
+        try:
+            os.waitid(os.P_PID, child.proc.pid, os.WEXITED | os.WNOWAIT)
+        except OSError:
+            pass
+        child.exited.set()
+        os.write(self.wake_w, b"\0")
+
+    def _signal(self, child, sig):
+        try:
+            os.killpg(child.proc.pid, sig)
+        except OSError:
+            pass    # already gone
+
+    def _check_deadlines(self, now):
+        for child in self.children:
+            if (child.deadline != None and now >= child.deadline and
+                    not child.timed_out):
+                child.timed_out = True
+                child.kill_at = now + self.grace
+                self._signal(child, signal.SIGTERM)
+            elif (child.kill_at != None and now >= child.kill_at):
+                child.kill_at = None
+                self._signal(child, signal.SIGKILL)
+
+    def _next_wakeup(self, now):
+        times = [t for child in self.children
+                 for t in (None if child.timed_out else child.deadline,
+                           child.kill_at) if t != None]
+        if (len(times) == 0):
+            return None
+        return max(0, min(times) - now)
+
+    def _reap(self, child):
+        if (child.proc.returncode == None and hasattr(os, "wait4")):
+            # Reap it ourselves, to get its resource usage along; nothing
+            #   else may reap it first, or the usage is lost
+            try:
+                (pid, status, child.rusage) = os.wait4(child.proc.pid, 0)
+                child.proc.returncode = exit_code(status)
+            except ChildProcessError:
+                child.proc.wait()
+        else:
+            child.proc.wait()
+        child.duration = time.monotonic() - child.start
+        if (child.watcher != None):
+            # Done once the child is gone, before the pipe can be closed
+            child.watcher.join()
+        if (child.pidfd != None):
+            self.selector.unregister(child.pidfd)
+            os.close(child.pidfd)
+        self.children.remove(child)
+
+    def wait_any(self):
+        """Waits until at least one child has exited.
+
+        Returns:
+            ([Child]):  the children that exited, empty if there are none
+        """
+        done = []
+        while (len(self.children) and len(done) == 0):
+            now = time.monotonic()
+            self._check_deadlines(now)
+            wakeup = self._next_wakeup(now)
+            for (key, events) in self.selector.select(wakeup):
+                if (key.data == None):
+                    os.read(self.wake_r, 512)
+                    done.extend([c for c in self.children if
+                                 c.exited.is_set() and c not in done])
+                elif (key.data not in done):
+                    done.append(key.data)
+        for child in done:
+            self._reap(child)
+        return done
+
+    def wait(self, child):
+        """Waits until the given child has exited, enforcing the deadlines
+        of every child meanwhile.
+
+        Args:
+            child (Child):  the child to wait for
+
+        Returns:
+            (Child):    the child, with its return code and duration set
+        """
+        while (child in self.children):
+            self.wait_any()
+        return child
+
+    def wait_all(self):
+        """Waits until every child has exited.
+
+        Returns:
+            ([Child]):  the children, in the order they exited
+        """
+        done = []
+        while (len(self.children)):
+            done.extend(self.wait_any())
+        return done
+
+    def kill(self, child):
+        """Kills the process group of a child without waiting for it. It is
+        reaped by the next wait, which may run in another thread.
+
+        Args:
+            child (Child):  the child to kill
+
+        Returns:
+            None
+        """
+        self._signal(child, signal.SIGKILL)
+
+    def kill_all(self):
+        """Kills the process groups of every child and reaps them.
+
+        Returns:
+            None
+        """
+        for child in self.children:
+            self._signal(child, signal.SIGKILL)
+        while (len(self.children)):
+            self._reap(self.children[0])
+
+class DurationHistory(object):
+    """Durations of previous runs, stored as JSON, used to derive adaptive
+    timeouts. Concurrent writers may lose each other's updates, which only
+    costs a sample.
+
+    Args:
+        path (str): path to the JSON file
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as fh:
+                return json.load(fh)
+        except (IOError, OSError, ValueError):
+            return dict()
+
+    def timeout(self, key, default):
+        """Derives the timeout of a run from its recorded durations.
+
+        Args:
+            key (str):          key identifying the run
+            default (float):    timeout to use without any history
+
+        Returns:
+            (float):    ADAPT_FACTOR times the longest recorded duration, but
+                        at least ADAPT_MIN seconds, or default without any
+                        history
+        """
+        durations = self._load().get(key)
+        if not (durations):
+            return default
+        return max(ADAPT_MIN, ADAPT_FACTOR * max(durations))
+
+    def record(self, key, duration):
+        """Records the duration of a successful run.
+
+        Args:
+            key (str):          key identifying the run
+            duration (float):   run time in seconds
+
+        Returns:
+            None
+        """
+        history = self._load()
+        durations = history.get(key, [])
+        durations.append(round(duration, 3))
+        history[key] = durations[-HISTORY_LEN:]
+        tmp = "{}.{}.tmp".format(self.path, os.getpid())
+        try:
+            parent = os.path.dirname(self.path)
+            if (parent and not os.path.isdir(parent)):
+                os.makedirs(parent)
+            with open(tmp, "w") as fh:
+                json.dump(history, fh)
+            os.rename(tmp, self.path)
+        except (IOError, OSError):
+            pass    # history is best effort
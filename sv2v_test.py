@@ -1,15 +1,29 @@
-#!/usr/bin/python
-from __future__ import print_function
+#!/usr/bin/env python3
 
 import sys
 import os
-import time
 import tempfile
 import argparse
+import shlex
+import contextlib
+import multiprocessing
 import subprocess
+import math
+import random
+import stat
+import threading
+import time
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
 from subprocess import CalledProcessError
 import shutil
+from io import StringIO
 import Verilog_VCD as vcd
+import sim_cache
+import supervisor
+import profiler
+import daemon
+import seats
 
 # Global constants
 ##################
@@ -22,17 +36,45 @@ EX_FILE1_BAD    = EX_DIR + "ham_bad.sv"
 EX_FILE2        = EX_DIR + "ham.v"
 EX_TB           = EX_DIR + "ham_tb.sv"
 EX_MOD          = "hamFix_test"
-# Time to wait (seconds) before simulation times out
+# Default time to wait (seconds) before simulation times out
 TIMEOUT = 10
+# Name of the file recording simulation durations, in the cache directory
+HISTORY_FILE = "durations.json"
+# Default caps on the mismatches written by verbose mode, per signal and total
+MAX_SIGNAL_DIFFS = 10
+MAX_DIFFS = 1000
+# Name of the VCD file simv dumps to, and inside a simulation cache entry
+SIM_DUMP = "dump.vcd"
+# Name of the file simv's output goes to, checked for license failures
+SIM_LOG = "simv.log"
+# Seconds of waiting for VCS seats worth a status message
+SEAT_WAIT_NOTICE = 1
+# Profile of the current run with --profile, or None
+PROFILE = None
+# Parsed VCD files kept by a --serve server, or None
+PARSED_CACHE = None
+# Progress messages of a thread are dropped while its "on" attribute is set,
+#   by check_equivalence
+QUIET = threading.local()
+# Options a --server client passes on to the server, out of set_options
+SERVER_OPTIONS = ("verbose", "fail_fast", "report_path", "max_signal_diffs",
+                  "max_diffs", "window_start", "window_end", "fingerprint",
+                  "summary")
 # Error codes
 # argparse errors
 BAD_ARG_ERR     = 1
 # basic test errors
 FAIL_BASIC      = 20
+# batch errors
+BATCH_FAIL_ERR  = 21
+BAD_MANIFEST_ERR = 22
+# equivalence errors, used as the exit code of batch jobs
+NOT_EQUIV_ERR   = 30
 # script runtime errors
 NO_FILE_ERR     = 10
 VCS_COMP_ERR    = 11
 SIM_TIMEOUT_ERR = 12
+LICENSE_ERR     = 13
 # wtf happened here
 UNKNOWN_ERR     = 255
 
@@ -48,6 +90,10 @@ class VCSCompileError(Exception):
     pass
 class SimTimeoutError(Exception):
     pass
+class ManifestError(Exception):
+    pass
+class LicenseError(Exception):
+    pass
 
 # Function for raising error exceptions
 #######################################
@@ -59,7 +105,10 @@ def raise_err(err_code, err_params=[]):
             msg = "error: too few arguments"
         raise NotEnoughArgError(msg)
     elif (err_code == SIM_TIMEOUT_ERR):
-        raise SimTimeoutError("SimTimeoutError: simulation timed out")
+        msg = "SimTimeoutError: simulation timed out"
+        if (len(err_params)):
+            msg += " after {:g} seconds".format(err_params[0])
+        raise SimTimeoutError(msg)
     elif (err_code == VCS_COMP_ERR):
         msg = ""
         if (len(err_params) > 0):
@@ -70,6 +119,20 @@ def raise_err(err_code, err_params=[]):
         if (len(err_params) > 0):
             msg += ". Please check output for errors"
         raise VCSCompileError(msg)
+    elif (err_code == BAD_MANIFEST_ERR):
+        msg = "ManifestError: expected 'file1 file2 testbench [module] "
+        msg += "[timeout=SECONDS]'"
+        if (len(err_params) > 1):
+            msg += " in {}, line {}".format(err_params[0], err_params[1])
+        raise ManifestError(msg)
+    elif (err_code == LICENSE_ERR):
+        msg = ""
+        if (len(err_params) > 0 and err_params[0]):
+            msg += "{}\n".format(err_params[0])
+        msg += "LicenseError: VCS could not check out a license"
+        if (len(err_params) > 1):
+            msg += " for {}".format(err_params[1])
+        raise LicenseError(msg)
     elif (err_code == NO_FILE_ERR):
         msg = "NoFileError: no file found"
         if (len(err_params)):
@@ -86,7 +149,7 @@ def parse_args():
     Returns:
         None
     """
-    usage = "%(prog)s [-h] [-v] [-m MODULE] [--check IN_FILE] "
+    usage = "%(prog)s [-h] [-v] [-m MODULE] [--fail-fast] [--check IN_FILE] "
     usage += "file1 file2 testbench"
     parser = argparse.ArgumentParser(description="testing tool for sv2v",
             usage=usage, prog=PROG)
@@ -100,6 +163,102 @@ def parse_args():
     parser.add_argument("--vcd", nargs=2, help="paths to two VCD files for comparison")
     parser.add_argument("-m", "--module",
             help="name of the (top) module to test for equivalence")
+    parser.add_argument("--fail-fast", action="store_true",
+            help="stop comparing at the first diverging timestamp")
+    parser.add_argument("--fingerprint", action="store_true",
+            help="compare per-signal fingerprints stored next to the VCD "
+                 "files (FILE.fp) first, and only stream the signals whose "
+                 "fingerprints differ")
+    parser.add_argument("--start", type=int,
+            help="only compare the traces from time START on, starting from "
+                 "the values of the signals at START")
+    parser.add_argument("--end", type=int,
+            help="only compare the traces up to time END")
+    parser.add_argument("--report",
+            help="write the mismatches found in verbose mode to REPORT "
+                 "instead of stdout")
+    parser.add_argument("--summary", action="store_true",
+            help="summarize the mismatches in one pass and bounded memory: "
+                 "signals ranked by their first mismatch, with their "
+                 "mismatch counts and a sample of their mismatches")
+    parser.add_argument("--max-signal-diffs", type=int,
+            default=MAX_SIGNAL_DIFFS,
+            help="most mismatches reported per signal in verbose mode, or "
+                 "sampled per signal with --summary (default: %(default)s)")
+    parser.add_argument("--max-diffs", type=int, default=MAX_DIFFS,
+            help="most mismatches reported in total in verbose mode "
+                 "(default: %(default)s)")
+    parser.add_argument("--vcd-index", action="store_true", dest="use_index",
+            help="load VCD files through sidecar binary indexes (FILE.idx), "
+                 "creating them on first use")
+    parser.add_argument("--parse-jobs", type=int, default=1,
+            help="number of processes parsing each VCD file while creating "
+                 "its index with --vcd-index (default: %(default)s)")
+    parser.add_argument("--batch", dest="manifest",
+            help="run every 'file1 file2 testbench [module]' job listed in "
+                 "MANIFEST on a pool of worker processes")
+    parser.add_argument("-j", "--jobs", type=int,
+            help="number of worker processes for --batch, and of shard "
+                 "simulations and comparisons run at once with --shard or "
+                 "--seeds (default: number of CPUs)")
+    parser.add_argument("-t", "--timeout", type=float,
+            help="seconds each simulation may run (default: {})".format(
+                 TIMEOUT))
+    parser.add_argument("--adaptive-timeout", action="store_true",
+            help="derive simulation timeouts from the recorded durations of "
+                 "previous runs of the same design, unless --timeout is "
+                 "given")
+    parser.add_argument("--no-cache", action="store_true",
+            help="always simulate, without using the simulation cache")
+    parser.add_argument("--cache-dir", default=sim_cache.CACHE_DIR,
+            help="directory of the simulation cache (default: %(default)s)")
+    parser.add_argument("--cache-size", type=int,
+            default=sim_cache.CACHE_MAX_BYTES // 1024 ** 2,
+            help="size limit of the simulation cache in MiB "
+                 "(default: %(default)s)")
+    parser.add_argument("--vcs-seats", type=int,
+            default=os.environ.get("SV2V_VCS_SEATS"),
+            help="VCS licenses shared by every run on this host: at most "
+                 "VCS_SEATS compiles and simulations run at once, queued by "
+                 "--priority (default: $SV2V_VCS_SEATS, or no limit)")
+    parser.add_argument("--seat-dir",
+            default=os.environ.get("SV2V_SEAT_DIR", seats.SEAT_DIR),
+            help="directory shared by the runs taking VCS seats, which "
+                 "runs of other users share only if it is writable by a "
+                 "group of theirs (default: $SV2V_SEAT_DIR, or {})".format(
+                 seats.SEAT_DIR.replace("%", "%%")))
+    parser.add_argument("--priority", type=int, default=0,
+            help="priority of this run in the queue for VCS seats, higher "
+                 "first (default: %(default)s)")
+    parser.add_argument("--pipe", action="store_true",
+            help="stream the simulation dumps through named pipes into the "
+                 "comparison while the simulations run, killing both at the "
+                 "first divergence (implies --fail-fast, bypasses the "
+                 "simulation result cache)")
+    parser.add_argument("--shard", action="append", metavar="PLUSARGS",
+            help="run the compiled simv of each design once per --shard, "
+                 "passing it PLUSARGS (e.g. '+ntb_random_seed=2 "
+                 "+cycles=1000'), and compare the dumps shard by shard")
+    parser.add_argument("--seeds", type=int, metavar="N",
+            help="run N shards, passing +ntb_random_seed=1 to N")
+    parser.add_argument("--compress-dumps", choices=sorted(vcd.FORMATS),
+            help="compress the simulation dumps, also in the simulation cache")
+    parser.add_argument("--profile", metavar="JSON",
+            help="write the wall/CPU time and peak memory of every phase, and "
+                 "the bytes and changes read per VCD file, to JSON")
+    parser.add_argument("--profile-python", metavar="PSTATS",
+            help="with --profile, also run the Python phases under cProfile "
+                 "and dump the statistics to PSTATS")
+    parser.add_argument("--serve", metavar="SOCKET",
+            help="run as a comparison server listening on the UNIX socket "
+                 "SOCKET, keeping recently parsed VCD files in memory")
+    parser.add_argument("--serve-cache", type=int,
+            default=daemon.CACHE_MAX_BYTES // 1024 ** 2,
+            help="memory budget in MiB of the parsed VCD files kept by "
+                 "--serve (default: %(default)s)")
+    parser.add_argument("--server", metavar="SOCKET",
+            help="run --vcd comparisons on the server listening on SOCKET, "
+                 "comparing locally if there is none")
     parser.add_argument("--check", dest="in_file",
             help="check if IN_FILE can be processed without errors")
     parser.add_argument("--ex-pass", action="store_true", dest="use_good",
@@ -111,48 +270,343 @@ def parse_args():
 
     args = parser.parse_args()
     # Checks to see if any positional arg is missing and not just comparing VCD
-    not_enough_args = (args.vcd == None) and \
+    not_enough_args = (args.vcd == None) and (args.manifest == None) and \
+                      (args.serve == None) and \
                       (None in [args.file1, args.file2, args.testbench])
     use_example = args.use_good or args.use_bad
     if (not use_example and args.in_file == None and not_enough_args):
         parser.print_usage(sys.stderr)
         raise_err(BAD_ARG_ERR, (PROG,))
+    if (args.start != None and args.end != None and args.start > args.end):
+        parser.error("--start must not be after --end")
+    if (args.pipe):
+        if (args.vcd != None):
+            parser.error("--pipe needs designs to simulate, not VCD files")
+        for (option, value) in (("--vcd-index", args.use_index),
+                                ("--fingerprint", args.fingerprint),
+                                ("--compress-dumps", args.compress_dumps)):
+            if (value):
+                parser.error("--pipe cannot be combined with " + option)
+    if (args.vcs_seats != None and args.vcs_seats < 1):
+        parser.error("--vcs-seats needs at least one seat")
+    if (args.pipe and args.vcs_seats != None and args.vcs_seats < 2):
+        parser.error("--pipe runs two simulations at once, so it needs "
+                     "--vcs-seats of at least 2")
+    args.shards = None
+    if (args.seeds != None):
+        if (args.shard != None):
+            parser.error("--seeds cannot be combined with --shard")
+        if (args.seeds < 1):
+            parser.error("--seeds needs at least one seed")
+        args.shards = [["+ntb_random_seed={}".format(n)]
+                       for n in range(1, args.seeds + 1)]
+    elif (args.shard != None):
+        args.shards = [shlex.split(plusargs) for plusargs in args.shard]
+    if (args.shards != None):
+        if (args.vcd != None):
+            parser.error("shards need designs to simulate, not VCD files")
+        if (args.pipe):
+            parser.error("--pipe cannot be combined with shards")
     return args
 
-def run_timeout(command, suppress=True):
+def profile_phase(name, side=None, python=False, **info):
+    """Records a phase of the run in the --profile output.
+
+    Args:
+        name (str):     name of the phase
+        side (str):     design or file the phase works on, or None
+        python (bool):  whether the phase runs Python code worth profiling
+        **info:         more fields of the phase record
+
+    Returns:
+        (context manager):  yields the record of the phase (a throwaway dict
+                            without --profile)
+    """
+    return phase_of(PROFILE, name, side, python, **info)
+
+def phase_of(profile, name, side=None, python=False, **info):
+    """Records a phase of the run in the given profile, like profile_phase
+    does in the --profile output.
+
+    Args:
+        profile (Profile):  profile to record the phase in, or None
+        name (str):     name of the phase
+        side (str):     design or file the phase works on, or None
+        python (bool):  whether the phase runs Python code worth profiling
+        **info:         more fields of the phase record
+
+    Returns:
+        (context manager):  yields the record of the phase (a throwaway dict
+                            without a profile)
+    """
+    if (profile == None):
+        return contextlib.nullcontext(dict())
+    return profile.phase(name, side, python, **info)
+
+def progress(text):
+    """Writes a progress message in one write, as the other design may print
+    concurrently, unless the current thread runs quietly.
+
+    Args:
+        text (str): the message, with its newline
+
+    Returns:
+        None
+    """
+    if not (getattr(QUIET, "on", False)):
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+def init_worker(options, quiet):
+    """Initializes a pool worker process generating VCD files with the
+    options of the parent, running quietly if the parent thread does.
+
+    Args:
+        options (tuple):    options, in the argument order of set_options
+        quiet (bool):       drop the progress messages of the worker
+
+    Returns:
+        None
+    """
+    set_options(*options)
+    QUIET.on = quiet
+
+class SimSettings(object):
+    """Options of the simulations of one check, passed down to every step
+    that compiles, simulates or stores a dump, so that a check run as a
+    library call does not depend on the options set by set_options.
+
+    Args:
+        timeout (float):    simulation timeout in seconds, or None for
+                            TIMEOUT or an adaptive one
+        history (DurationHistory):  simulation durations for adaptive
+                                    timeouts, or None
+        compression (str):  format to compress simulation dumps in, or None
+        seat_pool (SeatPool):   VCS seats shared with the other runs on the
+                                host, or None for no limit
+        profile (Profile):  profile to record the phases in, or None
+    """
+    def __init__(self, timeout=None, history=None, compression=None,
+            seat_pool=None, profile=None):
+        self.timeout = timeout
+        self.history = history
+        self.compression = compression
+        self.seat_pool = seat_pool
+        self.profile = profile
+
+def sim_settings():
+    """Gets the simulation options set by set_options, and the --profile
+    output.
+
+    Args:
+        None
+
+    Returns:
+        (SimSettings):  the current simulation options
+    """
+    return SimSettings(SIM_TIMEOUT, TIMEOUT_HISTORY, DUMP_COMPRESSION,
+            SEAT_POOL, PROFILE)
+
+def take_seats(side, what, count=1, block=True, since=None, settings=None):
+    """Takes seats from the --vcs-seats pool for VCS runs, recording the
+    time spent waiting for them.
+
+    Args:
+        side (str):     design the runs are for
+        what (str):     what the seats are for, e.g. "compile"
+        count (int):    number of seats, all taken at once
+        block (bool):   wait until the seats are free
+        since (float):  time the runs started waiting, if before this call
+        settings (SimSettings): options of the check, defaults to those set
+                                by set_options
+
+    Returns:
+        (Seats | None): the seats, or None without a pool, or if block is
+                        False and the seats are not free right away
+    """
+    if (settings == None):
+        settings = sim_settings()
+    if (settings.seat_pool == None):
+        return None
+    held = settings.seat_pool.acquire(count, block)
+    if (held == None):
+        return None
+    if (since != None):
+        held.wait = time.time() - since
+    if (held.wait >= SEAT_WAIT_NOTICE):
+        progress("\tWaited {:.1f} s for {} VCS seat{} to {} {}\n".format(
+                held.wait, count, "s" if (count > 1) else "", what, side))
+    if (settings.profile != None):
+        settings.profile.merge([{"phase": "seat_wait", "side": side,
+                "for": what, "seats": count,
+                "priority": settings.seat_pool.priority,
+                "wall_s": held.wait}])
+    return held
+
+def licensed(side, what, run, settings=None):
+    """Runs a VCS compile or simulation on a seat of the --vcs-seats pool,
+    if there is one. A run that fails to check out a license is retried
+    with exponential backoff, giving its seat back meanwhile.
+
+    Args:
+        side (str):     design the run is for
+        what (str):     what the run does, e.g. "compile"
+        run (callable): the run, raising LicenseError if VCS could not check
+                        out a license
+        settings (SimSettings): options of the check, defaults to those set
+                                by set_options
+
+    Returns:
+        (object):   what run returned
+    """
+    delay = seats.RETRY_DELAY
+    for attempt in range(seats.LICENSE_RETRIES + 1):
+        held = take_seats(side, what, settings=settings)
+        try:
+            return run()
+        except LicenseError:
+            if (attempt == seats.LICENSE_RETRIES):
+                raise
+        finally:
+            if (held != None):
+                held.release()
+        progress("\tNo VCS license to {} {}, retrying in {:g} s...\n".format(
+                what, side, delay))
+        time.sleep(delay)
+        delay *= 2
+
+def sim_timeout(timeout, run_key=None, settings=None):
+    """Picks the timeout of a simulation. A timeout given explicitly, with
+    --timeout or per batch job, is used as is. Otherwise --adaptive-timeout
+    derives one from the recorded durations of the run, falling back to
+    TIMEOUT.
+
+    Args:
+        timeout (float):    explicit timeout in seconds, or None
+        run_key (str):      key of the run in the duration history, or None
+        settings (SimSettings): options of the check, defaults to those set
+                                by set_options
+
+    Returns:
+        (float):    timeout in seconds
+    """
+    if (timeout != None):
+        return timeout
+    if (settings == None):
+        settings = sim_settings()
+    if (settings.history != None and run_key != None):
+        return settings.history.timeout(run_key, TIMEOUT)
+    return TIMEOUT
+
+def run_timeout(command, suppress=True, cwd=None, timeout=None, usage=None,
+        log=None, settings=None):
     """Run a command with timeout. Suppresses command output by default.
+    The command runs in its own process group, which gets SIGTERM once the
+    timeout passes and SIGKILL if it doesn't exit within a grace period.
 
     Args:
         command (str | [str]):  command to be passed into subprocess.Popen()
+        cwd (str):              directory to run the command in
+        timeout (float):        seconds to wait for the command, defaults to
+                                the --timeout option
+        usage (dict):           dict to add the CPU time and peak memory of
+                                the command to, or None
+        log (str):              file to write the output of the command to,
+                                instead of suppressing it, or None
+        settings (SimSettings): options of the check, defaults to those set
+                                by set_options
 
     Returns:
-        None
+        (float):    run time of the command, in seconds
+
+    Raises:
+        LicenseError:   if the command failed, blaming the license server
+                        in its log
     """
+    if (settings == None):
+        settings = sim_settings()
+    timeout = sim_timeout(settings.timeout if (timeout == None) else timeout,
+            settings=settings)
     devnull = open(os.devnull, 'w')
-    if (suppress):
+    if (log != None):
+        dest = open(log, 'w')
+    elif (suppress):
         dest = devnull
     else:
         dest = None
-    proc = subprocess.Popen(command, stdout=dest, stderr=dest,
-            preexec_fn=os.setsid)
-    # Time to wait until timeout, in seconds
-    wait_remaining_sec = TIMEOUT;
-    timedOut = False;
-
-    # Wait for either simulation end or timeout
-    while proc.poll() is None and wait_remaining_sec > 0:
-        time.sleep(1)
-        wait_remaining_sec -= 1
-
-    if wait_remaining_sec <= 0:
-        os.killpg(os.getpgid(proc.pid), signal.SIGTERM)
-        timedOut = True
-
-    if(timedOut):
+    sup = supervisor.Supervisor()
+    try:
+        child = sup.spawn(command, timeout, stdout=dest, stderr=dest, cwd=cwd)
+        sup.wait(child)
+    except KeyboardInterrupt:
+        sup.kill_all()
+        raise
+    finally:
         devnull.close()
-        raise_err(SIM_TIMEOUT_ERR)
-    devnull.close()
-    return
+        if (log != None):
+            dest.close()
+
+    if (usage != None):
+        usage.update(profiler.usage_of(child.rusage))
+    if (child.timed_out):
+        raise_err(SIM_TIMEOUT_ERR, (timeout,))
+    if (log != None and license_failed(child.returncode, log, settings)):
+        raise_err(LICENSE_ERR, (None, os.path.basename(command[0])))
+    return child.duration
+
+def license_failed(returncode, log, settings=None):
+    """Checks whether a VCS run failed for want of a license.
+
+    Args:
+        returncode (int):   exit code of the run
+        log (str):          path to the output of the run
+        settings (SimSettings): options of the check, defaults to those set
+                                by set_options
+
+    Returns:
+        (bool): whether the run failed, blaming the license server in a way
+                seats.license_failure accepts with or without --vcs-seats
+    """
+    if (returncode == 0):
+        return False
+    if (settings == None):
+        settings = sim_settings()
+    try:
+        with open(log, "r") as fh:
+            return seats.license_failure(returncode, fh.read(),
+                    settings.seat_pool != None)
+    except (IOError, OSError):
+        return False
+
+def run_vcs(vcd_cmd, work_dir, settings=None):
+    """Runs a VCS compile, raising LicenseError if it failed for want of a
+    license.
+
+    Args:
+        vcd_cmd ([str]):    VCS command line
+        work_dir (str):     directory to compile in
+        settings (SimSettings): options of the check, defaults to those set
+                                by set_options
+
+    Returns:
+        None
+
+    Raises:
+        CalledProcessError: if the compile failed otherwise
+    """
+    if (settings == None):
+        settings = sim_settings()
+    try:
+        subprocess.check_output(vcd_cmd, cwd=work_dir,
+                stderr=subprocess.STDOUT)
+    except CalledProcessError as e:
+        output = e.output
+        if isinstance(output, bytes):
+            output = output.decode("utf-8", "replace")
+        if (seats.license_failure(e.returncode, output,
+                settings.seat_pool != None)):
+            raise_err(LICENSE_ERR, (output, "compilation"))
+        raise
 
 def path_make_absolute(file_path, ori_path):
     """Makes a path absolute by prepending an absolute path to a relative one
@@ -171,7 +625,90 @@ def basic_check():
     print("basic check not currently supported :(")
     return
 
-def generate_vcd(hdl_file, tb_file, vcd_name="dump.vcd"):
+def source_key(hdl_file, tb_file, vcd_cmd, *extra):
+    """Computes a cache key over the contents of a design's sources and its
+    VCS command line. Source paths are left out of the command line, so
+    that the same design compiled as file1 or file2 shares an entry.
+
+    Args:
+        hdl_file (str):     path to the DUT description
+        tb_file (str):      path to the testbench
+        vcd_cmd ([str]):    VCS command line
+        *extra:             anything else the cached artifact depends on
+
+    Returns:
+        (str):  cache key
+    """
+    flags = [arg for arg in vcd_cmd if arg not in (hdl_file, tb_file)]
+    return sim_cache.hash_key(sim_cache.hash_file(hdl_file),
+            sim_cache.hash_file(tb_file), " ".join(flags), *extra)
+
+def compile_simv(hdl_file, tb_file, vcd_cmd, work_dir, cache=None,
+        settings=None):
+    """Compiles a design with VCS. If a simulator compiled from the same
+    sources and flags is in the artifact store, it is reused instead, and
+    freshly compiled simulators are added to the store.
+
+    Args:
+        hdl_file (str):     path to the DUT description
+        tb_file (str):      path to the testbench
+        vcd_cmd ([str]):    VCS command line
+        work_dir (str):     directory to compile in
+        cache (ArtifactStore):  simulation cache, or None
+        settings (SimSettings): options of the check, defaults to those set
+                                by set_options
+
+    Returns:
+        (str):  path to the simv executable
+    """
+    if (settings == None):
+        settings = sim_settings()
+    hdl_base = os.path.basename(hdl_file)
+    if (cache != None):
+        store = cache.sub("simv")
+        key = source_key(hdl_file, tb_file, vcd_cmd)
+        entry = store.get(key)
+        if (entry != None):
+            progress("\tUsing compiled simulator of {}...\n".format(
+                    hdl_base))
+            return os.path.join(entry, "simv")
+
+    progress("\tCompiling {}...\n".format(hdl_base))
+    with phase_of(settings.profile, "compile", hdl_base):
+        licensed(hdl_base, "compile",
+                lambda: run_vcs(vcd_cmd, work_dir, settings), settings)
+    simv = os.path.join(work_dir, "simv")
+
+    if (cache != None):
+        artifacts = {"simv": simv}
+        daidir = os.path.join(work_dir, "simv.daidir")
+        if (os.path.isdir(daidir)):
+            artifacts["simv.daidir"] = daidir
+        try:
+            entry = store.put(key, artifacts)
+            return os.path.join(entry, "simv")
+        except (IOError, OSError) as e:
+            progress("Warning: could not store simulator of {}: {}\n".format(
+                    hdl_base, e))
+    return simv
+
+def vcs_command(hdl_file, tb_file):
+    """Builds the VCS command line compiling a design with its testbench.
+
+    Args:
+        hdl_file (str): path to the DUT description
+        tb_file (str):  path to the testbench
+
+    Returns:
+        ([str]):    VCS command line
+    """
+    # The dump name is compiled into simv, so it is the same for every
+    # design to let compiled simulators be reused
+    dump_opt = "+vcs+dumpvars+" + SIM_DUMP
+    return ["vcs", "-sverilog", "-q", "+v2k", hdl_file, tb_file, dump_opt]
+
+def generate_vcd(hdl_file, tb_file, vcd_name="dump.vcd", work_dir=None,
+        cache=None, timeout=None, settings=None):
     """Uses VCS to create a VCD file, for comparing later.
     Requires a testbench file that drives the DUT's signals.
 
@@ -179,42 +716,140 @@ def generate_vcd(hdl_file, tb_file, vcd_name="dump.vcd"):
         hdl_file (str): path to the DUT description
         tb_file (str):  path to the testbench
         vcd_name (str): name of the output VCD file
+        work_dir (str): directory to compile and simulate in, defaults to
+                        the current directory
+        cache (ArtifactStore):  simulation cache, or None
+        timeout (float):    seconds the simulation may run, defaults to the
+                            --timeout option
+        settings (SimSettings): options of the check, defaults to those set
+                                by set_options
 
     Returns:
-        None
+        (str):  path to the generated VCD file, which is inside the cache
+                when a cache is used
     """
+    if (settings == None):
+        settings = sim_settings()
+    if (work_dir == None):
+        work_dir = os.getcwd()
+    if (timeout == None):
+        timeout = settings.timeout
     hdl_base = os.path.basename(hdl_file)
     tb_base = os.path.basename(tb_file)
-    dump_opt = "+vcs+dumpvars+" + vcd_name
-    vcd_cmd = ["vcs", "-sverilog", "-q", "+v2k", hdl_file, tb_file, dump_opt]
+    vcd_cmd = vcs_command(hdl_file, tb_file)
+    if (cache != None):
+        # Simulations that time out are never cached, so a dump does not
+        # depend on the timeout it ran with
+        key = source_key(hdl_file, tb_file, vcd_cmd)
+        entry = cache.get(key)
+        if (entry != None):
+            progress("\tUsing cached simulation of {}...\n".format(
+                    hdl_base))
+            return os.path.join(entry, SIM_DUMP)
     try:
-        print("\tCompiling {}...".format(hdl_base), end="")
-        sys.stdout.flush()
-        subprocess.check_output(vcd_cmd)
-        print("done")
-        print("\tRunning sim for {}...".format(tb_base), end="")
-        sys.stdout.flush()
-        run_timeout(["./simv"])
-        print("done")
+        simv = compile_simv(hdl_file, tb_file, vcd_cmd, work_dir, cache,
+                settings)
+        progress("\tRunning sim of {} for {}...\n".format(hdl_base,
+                tb_base))
+        run_key = source_key(hdl_file, tb_file, vcd_cmd)
+        timeout = sim_timeout(timeout, run_key, settings)
+        with phase_of(settings.profile, "simulate", hdl_base) as record:
+            duration = licensed(hdl_base, "simulate",
+                    lambda: run_timeout([simv], cwd=work_dir, timeout=timeout,
+                    usage=record, log=os.path.join(work_dir, SIM_LOG),
+                    settings=settings), settings)
+        if (settings.history != None):
+            settings.history.record(run_key, duration)
     except CalledProcessError as e:
-        exp_str = e.output + "\nVCSCompileError: "
-        exp_str += "compilation failed with code {}. ".format(e.returncode)
-        exp_str += "please check output for errors"
-        raise_err(VCS_COMP_ERR, (e.output, e.returncode))
+        output = e.output
+        if isinstance(output, bytes):
+            output = output.decode("utf-8", "replace")
+        raise_err(VCS_COMP_ERR, (output, e.returncode))
     except SimTimeoutError:
         raise
 
-def generate_vcds(path1, path2, tb_path):
-    """Wrapper function to generate the two VCDs needed.
+    return store_dump(os.path.join(work_dir, SIM_DUMP),
+            os.path.join(work_dir, vcd_name), hdl_base, cache,
+            key if (cache != None) else None, settings)
+
+def store_dump(dump_path, vcd_path, hdl_base, cache=None, key=None,
+        settings=None):
+    """Moves the dump of a finished simulation to its final name,
+    compressing it with --compress-dumps, and adds it to the cache.
+
+    Args:
+        dump_path (str):    path simv dumped to
+        vcd_path (str):     path to move the dump to, before the suffix of
+                            the compression format
+        hdl_base (str):     name of the design, for status printing
+        cache (ArtifactStore):  simulation cache, or None
+        key (str):          cache key of the simulation
+        settings (SimSettings): options of the check, defaults to those set
+                                by set_options
+
+    Returns:
+        (str):  path to the VCD file, which is inside the cache when a cache
+                is used
+    """
+    if (settings == None):
+        settings = sim_settings()
+    if (vcd_path != dump_path):
+        os.rename(dump_path, vcd_path)
+    if (settings.compression != None):
+        # Readers detect the format by its magic bytes, not the file name
+        plain_path = vcd_path
+        vcd_path += vcd.FORMATS[settings.compression][2]
+        with phase_of(settings.profile, "compress", hdl_base, python=True):
+            vcd.compress_file(plain_path, vcd_path, settings.compression)
+        os.remove(plain_path)
+    if (cache != None):
+        try:
+            entry = cache.put(key, {SIM_DUMP: vcd_path})
+            return os.path.join(entry, SIM_DUMP)
+        except (IOError, OSError) as e:
+            progress("Warning: could not cache simulation of {}: {}\n".format(
+                    hdl_base, e))
+    return vcd_path
+
+def generate_vcd_profiled(*args):
+    """Runs generate_vcd() in a pool worker, with a profile of its own.
+
+    Args:
+        *args:  arguments to generate_vcd(), up to its settings
+
+    Returns:
+        (str, [dict]):  path to the generated VCD file, and the phases
+                        recorded meanwhile
+    """
+    settings = args[-1]
+    settings.profile = profiler.Profile()
+    return (generate_vcd(*args), settings.profile.phases)
+
+def generate_vcds(path1, path2, tb_path, parallel=True, timeout=None,
+        work_dir=None, cache=None, settings=None):
+    """Wrapper function to generate the two VCDs needed. Each design is
+    compiled and simulated in its own work directory under work_dir, with
+    both pipelines running in parallel worker processes unless parallel is
+    False.
 
     Args:
         path1 (str):    path to the first SV/V file
         path2 (str):    path to the second SV/V file
         tb_path (str):  path to the testbench file
+        parallel (bool):    run the two pipelines concurrently
+        timeout (float):    seconds each simulation may run, defaults to the
+                            --timeout option
+        work_dir (str): directory to create the work directories in,
+                        defaults to the current directory
+        cache (ArtifactStore):  simulation cache, or None
+        settings (SimSettings): options of the check, defaults to those set
+                                by set_options
 
     Returns:
-        None
+        (str, str):     paths to the VCD files of the first and second design
     """
+    if (settings == None):
+        settings = sim_settings()
     # Check to see if the files exist
     if not (os.path.isfile(path1)):
         raise_err(NO_FILE_ERR, (path1,))
@@ -223,205 +858,1477 @@ def generate_vcds(path1, path2, tb_path):
     if not (os.path.isfile(tb_path)):
         raise_err(NO_FILE_ERR, (tb_path,))
 
+    if (work_dir == None):
+        work_dir = os.getcwd()
+    progress("Generating VCD files:\n")
+    design_dirs = []
+    for n in (1, 2):
+        design_dirs.append(os.path.join(work_dir, "design{}".format(n)))
+        os.mkdir(design_dirs[-1])
+    if not (parallel):
+        vcds = []
+        for (n, (path, design_dir)) in enumerate(zip((path1, path2),
+                design_dirs), 1):
+            vcds.append(generate_vcd(path, tb_path, "out{}.vcd".format(n),
+                    design_dir, cache, timeout, settings))
+        return tuple(vcds)
+
+    # The workers record their phases in profiles of their own, merged into
+    #   this one as they finish
+    profile = settings.profile
+    worker_settings = SimSettings(settings.timeout, settings.history,
+            settings.compression, settings.seat_pool)
+    jobs = []
+    pool = multiprocessing.Pool(2, initializer=init_worker,
+            initargs=(get_options(), getattr(QUIET, "on", False)))
     try:
-        print("Generating VCD files:")
-        generate_vcd(path1, tb_path, vcd_name="out1.vcd")
-        generate_vcd(path2, tb_path, vcd_name="out2.vcd")
-    except (SimTimeoutError, VCSCompileError, KeyboardInterrupt):
+        for (n, (path, design_dir)) in enumerate(zip((path1, path2),
+                design_dirs), 1):
+            vcd_name = "out{}.vcd".format(n)
+            func = generate_vcd if (profile == None) else generate_vcd_profiled
+            jobs.append(pool.apply_async(func, (path, tb_path, vcd_name,
+                    design_dir, cache, timeout, worker_settings)))
+        pool.close()
+
+        # Wait for both designs, so that each one's outcome gets reported
+        results = []
+        for (path, job) in zip((path1, path2), jobs):
+            hdl_base = os.path.basename(path)
+            try:
+                result = job.get()
+                if (profile != None):
+                    (result, phases) = result
+                    profile.merge(phases)
+                entry = os.path.dirname(result)
+                if (cache != None and os.path.dirname(entry) == cache.dir):
+                    # The worker's lock on the cache entry ends with it
+                    cache.hold(entry)
+                results.append(result)
+                progress("\t{}: done\n".format(hdl_base))
+            except (SimTimeoutError, VCSCompileError, LicenseError) as e:
+                results.append(e)
+                progress("\t{}: failed with {}\n".format(hdl_base,
+                        type(e).__name__))
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        return tuple(results)
+    except KeyboardInterrupt:
+        pool.terminate()
         raise
+    finally:
+        pool.join()
 
-def filter_vcd(vcd_dict, top):
-    """Filters out the signals that aren't in the top-level scope.
+def shard_desc(n, plusargs):
+    """Describes a shard for status printing.
 
     Args:
-        vcd_dict (dict):    VCD dictionary generated by the Verilog_VCD module
-        top (str):          name of the top-level module
+        n (int):            index of the shard
+        plusargs ([str]):   plusargs of the shard
 
     Returns:
-        (dict): new dictionary, with irrelevant signals filtered out
+        (str):  description of the shard
     """
-    new_vcd = dict()
-    for key in vcd_dict:
-        tv = vcd_dict[key]["tv"]
-        for net in vcd_dict[key]["nets"]:
-            if (net["hier"] == top):    # If it is a signal we care about
-                sig_name = "{}.{}".format(net["hier"], net["name"])
-                new_vcd[sig_name] = tv
-    return new_vcd
+    return "shard {} ({})".format(n + 1, " ".join(plusargs) or "no plusargs")
 
-def get_diff(str1, str2):
-    """Get the difference between two strings
+def generate_shard_vcds(path1, path2, tb_path, parallel=True, timeout=None,
+        work_dir=None, cache=None):
+    """Generates the VCD files of every shard of the two designs. Each design
+    is compiled once, and its simv is run once per shard with the plusargs
+    of the shard, in a directory of its own. The simulations of both designs
+    share one supervisor, running at most --jobs at a time (one per CPU by
+    default). Shard dumps are cached like whole simulations, keyed by their
+    plusargs too.
 
     Args:
-        str1 (str): first string to compare
-        str2 (str): second string to compare
+        path1 (str):    path to the first SV/V file
+        path2 (str):    path to the second SV/V file
+        tb_path (str):  path to the testbench file
+        parallel (bool):    compile the two designs concurrently
+        timeout (float):    seconds each simulation may run, defaults to the
+                            --timeout option
+        work_dir (str): directory to create the work directories in,
+                        defaults to the current directory
+        cache (ArtifactStore):  simulation cache, or None
 
     Returns:
-        (str | None):   a side-by-side diff of the strings if there are diffs,
-                        otherwise None
+        ([(str, str)]): paths to the VCD files of the first and second
+                        design, per shard
     """
-    tf1 = tempfile.NamedTemporaryFile()
-    tf2 = tempfile.NamedTemporaryFile()
-    tf1.write(str1)
-    tf1.seek(0)
-    tf2.write(str2)
-    tf2.seek(0)
+    paths = (path1, path2)
+    for path in paths + (tb_path,):
+        if not (os.path.isfile(path)):
+            raise_err(NO_FILE_ERR, (path,))
+    if (timeout == None):
+        timeout = SIM_TIMEOUT
+    if (work_dir == None):
+        work_dir = os.getcwd()
+
+    print("Generating VCD files of {} shards:".format(len(SHARDS)))
+    vcds = ([None] * len(SHARDS), [None] * len(SHARDS))
+    work_dirs = []
+    runs = []
+    for (i, path) in enumerate(paths):
+        work_dirs.append(os.path.join(work_dir, "design{}".format(i + 1)))
+        os.mkdir(work_dirs[-1])
+        vcd_cmd = vcs_command(path, tb_path)
+        for (n, plusargs) in enumerate(SHARDS):
+            key = source_key(path, tb_path, vcd_cmd, *plusargs)
+            entry = cache.get(key) if (cache != None) else None
+            if (entry != None):
+                vcds[i][n] = os.path.join(entry, SIM_DUMP)
+            else:
+                runs.append((i, n, key))
+        cached = len(SHARDS) - vcds[i].count(None)
+        if (cached):
+            print("\tUsing cached simulations of {} for {} of {} "
+                  "shards...".format(os.path.basename(path), cached,
+                  len(SHARDS)))
+
+    # Compilation runs in subprocesses, so threads are enough to overlap it
+    designs = sorted(set(i for (i, n, key) in runs))
+    with ThreadPoolExecutor(2 if (parallel) else 1) as executor:
+        jobs = [executor.submit(compile_design, paths[i], tb_path,
+                work_dirs[i], cache) for i in designs]
+        simvs = dict(zip(designs, [job.result() for job in jobs]))
 
-    diff_cmd = ["diff", "-y", "--suppress-common-lines", tf1.name, tf2.name]
+    max_running = SIM_JOBS or multiprocessing.cpu_count()
+    sup = supervisor.Supervisor()
+    running = dict()
+    failure = None
+    # Runs are (design, shard, cache key, attempt, time to start at)
+    runs = [(i, n, key, 0, 0) for (i, n, key) in runs]
+    waiting_since = None
     try:
-        subprocess.check_output(diff_cmd)
-        return None     # returncode of 0 means no diffs
-    except subprocess.CalledProcessError as e:
-        if (e.returncode != 1): # retcode of 1 means there is a diff
-            raise
-        else:
-            return e.output
+        while (len(running) or (len(runs) and failure == None)):
+            ready = [run for run in runs if run[4] <= time.time()]
+            while (len(ready) and len(running) < max_running and
+                    failure == None):
+                (i, n, key, attempt, start) = ready[0]
+                hdl_base = os.path.basename(paths[i])
+                # Seats are only waited for while no simulation of this
+                #   check runs, so that their deadlines are still enforced
+                if (waiting_since == None):
+                    waiting_since = time.time()
+                held = take_seats(hdl_base, "simulate",
+                        block=(len(running) == 0), since=waiting_since)
+                if (SEAT_POOL != None and held == None):
+                    break
+                waiting_since = None
+                runs.remove(ready.pop(0))
+                shard_dir = os.path.join(work_dirs[i],
+                        "shard{}".format(n + 1))
+                if (os.path.isdir(shard_dir)):
+                    shutil.rmtree(shard_dir)
+                os.mkdir(shard_dir)
+                run_key = source_key(paths[i], tb_path,
+                        vcs_command(paths[i], tb_path), *SHARDS[n])
+                sys.stdout.write("\tRunning {} of {}...\n".format(
+                        shard_desc(n, SHARDS[n]), hdl_base))
+                sys.stdout.flush()
+                with open(os.path.join(shard_dir, SIM_LOG), "w") as log:
+                    child = sup.spawn([simvs[i]] + SHARDS[n],
+                            sim_timeout(timeout, run_key),
+                            stdout=log, stderr=log, cwd=shard_dir)
+                running[child] = ((i, n, key, attempt), shard_dir, run_key,
+                        held)
+            if (len(running) == 0):
+                if (failure == None):
+                    # Only license retries waiting for their delay are left
+                    time.sleep(max(0, min(run[4] for run in runs) -
+                            time.time()))
+                continue
+
+            for child in sup.wait_any():
+                ((i, n, key, attempt), shard_dir, run_key, held) = \
+                        running.pop(child)
+                if (held != None):
+                    held.release()
+                hdl_base = os.path.basename(paths[i])
+                if (PROFILE != None):
+                    record = {"phase": "simulate", "side": hdl_base,
+                              "shard": n + 1, "wall_s": child.duration}
+                    record.update(profiler.usage_of(child.rusage))
+                    PROFILE.merge([record])
+                if (failure == None and child.timed_out):
+                    failure = SIM_TIMEOUT_ERR
+                    timed_out = child
+                elif (failure == None and license_failed(child.returncode,
+                        os.path.join(shard_dir, SIM_LOG))):
+                    if (attempt < seats.LICENSE_RETRIES):
+                        delay = seats.RETRY_DELAY * 2 ** attempt
+                        sys.stdout.write("\tNo VCS license to simulate {} of "
+                                "{}, retrying in {:g} s...\n".format(
+                                shard_desc(n, SHARDS[n]), hdl_base, delay))
+                        sys.stdout.flush()
+                        runs.append((i, n, key, attempt + 1,
+                                time.time() + delay))
+                        continue
+                    failure = LICENSE_ERR
+                if (failure != None):
+                    # A failed simulation fails the whole check, so the
+                    #   others are not worth finishing
+                    for other in running:
+                        sup.kill(other)
+                    continue
+                if (TIMEOUT_HISTORY != None):
+                    TIMEOUT_HISTORY.record(run_key, child.duration)
+                vcds[i][n] = store_dump(os.path.join(shard_dir, SIM_DUMP),
+                        os.path.join(work_dirs[i], "out{}_{}.vcd".format(
+                        i + 1, n + 1)), hdl_base, cache, key)
+    except:
+        sup.kill_all()
+        raise
     finally:
-        tf1.close()
-        tf2.close()
+        for (run, shard_dir, run_key, held) in running.values():
+            if (held != None):
+                held.release()
+    if (failure == SIM_TIMEOUT_ERR):
+        raise_err(SIM_TIMEOUT_ERR, (timed_out.timeout,))
+    elif (failure == LICENSE_ERR):
+        raise_err(LICENSE_ERR, (None, "simulation"))
+    return list(zip(*vcds))
 
-def compare_vcd(vcd1, vcd2, module, file1, file2):
-    """Compare all of the signals defined by the two VCD files
-    First uses Verilog_VCD to parse each of the files, then filters out
-    non-top-level signals. Finally goes through each signal and checks the
-    (time, value) tuples for any differences.
+class DumpPipe(object):
+    """A named pipe a simulation dumps its VCD file into, to be read while
+    the simulation runs. The pipe holds a write end of its own until
+    release() is called once the simulation has exited, so that the reader
+    neither sees the end of the file before the simulation opens the pipe
+    nor blocks forever if it never does.
 
     Args:
-        vcd1 (str):     path to the first VCD file
-        vcd2 (str):     path to the second VCD file
-        module (str):   name of the top-level module
-        file1 (str):    name of the first HDL file, for status printing
-        file2 (str):    name of the second HDL file, for status printing
+        path (str): path of the named pipe to create
+    """
+    def __init__(self, path):
+        os.mkfifo(path)
+        self.path = path
+        # A write end can only be opened while there is a read end
+        read_fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+        try:
+            self.hold_fd = os.open(path, os.O_WRONLY)
+        finally:
+            os.close(read_fd)
+        self.lock = threading.Lock()
+
+    def release(self):
+        """Closes the write end held by the pipe, so that the reader sees
+        the end of the file once the simulation has closed its own.
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        with self.lock:
+            if (self.hold_fd != None):
+                os.close(self.hold_fd)
+                self.hold_fd = None
+
+def is_pipe(path):
+    """Checks whether a path is a named pipe, which can only be read once
+    and from the start.
+
+    Args:
+        path (str): path to check
 
     Returns:
-        (bool, str):    tuple of a boolean that represents if there is a diff,
-                        and the string explaining what the diffs are
+        (bool): whether path is a named pipe
     """
-    col_offset = 10
-    # Get size of terminal for pretty printing
-    (trow, tcol) = subprocess.check_output(["stty", "size"]).split()
-    tcol = int(tcol)
-    trow = int(trow)
-    cwidth = (tcol - col_offset) // 2       # -4 for column separator
-    vcd_dict1 = filter_vcd(vcd.parse_vcd(vcd1), module)
-    vcd_dict2 = filter_vcd(vcd.parse_vcd(vcd2), module)
-    out_str = ""
+    try:
+        return stat.S_ISFIFO(os.stat(path).st_mode)
+    except OSError:
+        return False
 
-    # Check if any signal isn't in both dicts
-    diff_keys = set(vcd_dict1.keys()) ^ set(vcd_dict2.keys())
-    for key in diff_keys:
-        msg = "Warning: "
-        if (key in vcd_dict1):      # not in dict2
-            msg += "{} is in {}, but not in {}".format(key, file1, file2)
-        else:                       # not in dict1
-            msg += "{} is in {}, but not in {}".format(key, file2, file1)
-        print(msg)
-    if (len(diff_keys)):
-        print("Netlists cannot be equivalent. Please check your testbench.")
-        return (False, out_str)
-
-    is_equivalent = vcd_dict1 == vcd_dict2
+def compile_design(hdl_file, tb_file, work_dir, cache=None):
+    """Compiles a design for a piped simulation, through the compiled
+    simulator store of the cache.
 
-    # Feedback on what signals differ
-    if (not is_equivalent):
-        out_str += "\nSignal value changes not equivalent\n"
-        diff_list = []
-        # Keys in 1 should be same as keys in 2
-        for key in vcd_dict1.keys():
-            if (set(vcd_dict1[key]) != set(vcd_dict2[key])):
-                diff_list.append(key)
-        diff_list = sorted(diff_list)
-        out_str += "Inconsistent signals: {}\n\n".format(diff_list)
-        if (VERBOSE):
-            for key in diff_list:
-                out_str += "===== {}: <{}, {}> =====\n".format(key, file1, file2)
-                tv1 = ""
-                tv2 = ""
-                for tv in vcd_dict1[key]:
-                    tv1 += "{}\n".format(tv)
-                for tv in vcd_dict2[key]:
-                    tv2 += "{}\n".format(tv)
-                diff_str = get_diff(tv1, tv2)
-                if (diff_str != None):
-                    out_str += diff_str
-                out_str += "\n"
-            out_str += "Verbose output may be very long. Recommend outputting "
-            out_str += "to a file.\n"
-        else:
-            out_str += "Run tool with '-v' to see value change dumps\n"
-    return (is_equivalent, out_str)
+    Args:
+        hdl_file (str): path to the DUT description
+        tb_file (str):  path to the testbench
+        work_dir (str): directory to compile in
+        cache (ArtifactStore):  simulation cache, or None
 
-def equiv_check(vcd1, vcd2, module, hdl1, hdl2):
-    """Checks equivalence between the two hardware descriptions.
+    Returns:
+        (str):  path to the simv executable
+    """
+    try:
+        return compile_simv(hdl_file, tb_file, vcs_command(hdl_file, tb_file),
+                work_dir, cache)
+    except CalledProcessError as e:
+        output = e.output
+        if isinstance(output, bytes):
+            output = output.decode("utf-8", "replace")
+        raise_err(VCS_COMP_ERR, (output, e.returncode))
+
+def pipe_check(path1, path2, tb_path, module, parallel=True, timeout=None,
+        work_dir=None, cache=None):
+    """Checks equivalence with the two simulations dumping into named
+    pipes, which the comparison reads while they run. Nothing is written to
+    disk, so the simulation result cache is bypassed; compiled simulators
+    are still cached. Both simulations are killed as soon as the traces
+    diverge.
 
     Args:
-        vcd1 (str):     path to the first VCD file
-        vcd2 (str):     path to the second VCD file
+        path1 (str):    path to the first SV/V file
+        path2 (str):    path to the second SV/V file
+        tb_path (str):  path to the testbench file
         module (str):   name of the top-level module
-        hdl1 (str):     name of the first HDL file, for status printing
-        hdl2 (str):     name of the second HDL file, for status printing
+        parallel (bool):    compile the two designs concurrently
+        timeout (float):    seconds each simulation may run, defaults to the
+                            --timeout option
+        work_dir (str): directory to create the work directories in,
+                        defaults to the current directory
+        cache (ArtifactStore):  compiled simulator cache, or None
 
     Returns:
         (bool, str):    tuple of a boolean that represents if there is a diff,
                         and the string explaining what the diffs are
     """
+    for path in (path1, path2, tb_path):
+        if not (os.path.isfile(path)):
+            raise_err(NO_FILE_ERR, (path,))
+    if (timeout == None):
+        timeout = SIM_TIMEOUT
+    if (work_dir == None):
+        work_dir = os.getcwd()
+
+    print("Simulating through pipes:")
+    work_dirs = []
+    for n in (1, 2):
+        work_dirs.append(os.path.join(work_dir, "design{}".format(n)))
+        os.mkdir(work_dirs[-1])
+    # Compilation runs in subprocesses, so threads are enough to overlap it
+    with ThreadPoolExecutor(2 if (parallel) else 1) as executor:
+        jobs = [executor.submit(compile_design, path, tb_path, design_dir,
+                cache) for (path, design_dir) in zip((path1, path2),
+                work_dirs)]
+        simvs = [job.result() for job in jobs]
+
+    # Both simulations have to run at once, so they take their seats
+    #   together
+    held = take_seats(os.path.basename(path1), "simulate", 2)
+    sup = supervisor.Supervisor()
+    pipes = dict()
+    children = []
+    devnull = open(os.devnull, 'w')
+    try:
+        for (path, simv, design_dir) in zip((path1, path2), simvs,
+                work_dirs):
+            hdl_base = os.path.basename(path)
+            run_key = source_key(path, tb_path, vcs_command(path, tb_path))
+            pipe = DumpPipe(os.path.join(design_dir, SIM_DUMP))
+            sys.stdout.write("\tRunning sim of {} for {}...\n".format(
+                    hdl_base, os.path.basename(tb_path)))
+            sys.stdout.flush()
+            child = sup.spawn([simv], sim_timeout(timeout, run_key),
+                    stdout=devnull, stderr=devnull, cwd=design_dir)
+            pipes[child] = pipe
+            children.append(child)
+    except:
+        sup.kill_all()
+        for pipe in pipes.values():
+            pipe.release()
+        devnull.close()
+        if (held != None):
+            held.release()
+        raise
+
+    def watch():
+        # Enforces the timeouts, and ends the dump of each simulation when
+        # it exits
+        while (len(sup.children)):
+            for child in sup.wait_any():
+                pipes[child].release()
+    watcher = threading.Thread(target=watch)
+    watcher.daemon = True
+    watcher.start()
+
     print("Comparing VCD files...", end="")
     sys.stdout.flush()
-    if (hdl1 != None):
-        file1 = os.path.basename(hdl1)
-    else:
-        file1 = vcd1
-    if (hdl2 != None):
-        file2 = os.path.basename(hdl2)
-    else:
-        file2 = vcd2
-    (is_equivalent, out_str) = compare_vcd(vcd1, vcd2, module, file1, file2)
+    try:
+        result = compare_vcd(pipes[children[0]].path,
+                pipes[children[1]].path, module, os.path.basename(path1),
+                os.path.basename(path2))
+    except Exception as e:
+        result = e
+    finally:
+        # Kills the simulations still running, after a divergence or an
+        # error
+        for child in children:
+            if (child.duration == None):
+                sup.kill(child)
+        watcher.join()
+        for pipe in pipes.values():
+            pipe.release()
+        devnull.close()
+        if (held != None):
+            held.release()
     print("done")
-    return (is_equivalent, out_str)
 
-def main():
-    # Grab args from the command line
-    try:
-        args = parse_args()
-    except NotEnoughArgError as e:
-        print(e)
-        return BAD_ARG_ERR
+    for (path, child) in zip((path1, path2), children):
+        if (PROFILE != None):
+            record = {"phase": "simulate", "side": os.path.basename(path),
+                      "wall_s": child.duration, "piped": True}
+            record.update(profiler.usage_of(child.rusage))
+            PROFILE.merge([record])
+        if (TIMEOUT_HISTORY != None and child.returncode == 0):
+            TIMEOUT_HISTORY.record(source_key(path, tb_path,
+                    vcs_command(path, tb_path)), child.duration)
+    # A timed out simulation leaves a truncated trace, whatever it compared
+    # like
+    for child in children:
+        if (child.timed_out):
+            raise_err(SIM_TIMEOUT_ERR, (child.timeout,))
+    if isinstance(result, Exception):
+        raise result
+    return result
 
-    global VERBOSE
-    VERBOSE = args.verbose
-    no_compile = (args.vcd != None)
-    vcd_files = args.vcd
-    if (args.use_good or args.use_bad):
-        file1_path = EX_FILE1 if args.use_good else EX_FILE1_BAD
-        file2_path = EX_FILE2
-        tb_path = EX_TB
-        module = EX_MOD
-    else:
-        file1_path = args.file1
-        file2_path = args.file2
-        tb_path = args.testbench
-        module = args.module
+def filter_vcd(vcd_dict, top):
+    """Filters out the signals that aren't in the top-level scope.
 
-    # TODO: write functionality with sv2v tool
-    checkfile_path = args.in_file
-    if (checkfile_path != None):
-        try:
-            basic_check()
-            return 0
-        except BasicCheckError as e:
-            print(e)
-            return FAIL_BASIC
-        except KeyboardInterrupt:
-            # Suppress traceback
-            sys.exit(1)
+    Args:
+        vcd_dict (dict):    VCD dictionary generated by the Verilog_VCD module
+        top (str):          name of the top-level module
 
-    # Create a temp directory for our compilation/simulation
-    tempdir = tempfile.mkdtemp()
-    ori_dir = os.getcwd()
-    os.chdir(tempdir)
+    Returns:
+        (dict): new dictionary, with irrelevant signals filtered out
+    """
+    new_vcd = dict()
+    for key in vcd_dict:
+        tv = vcd_dict[key]["tv"]
+        for net in vcd_dict[key]["nets"]:
+            if (net["hier"] == top):    # If it is a signal we care about
+                sig_name = "{}.{}".format(net["hier"], net["name"])
+                new_vcd[sig_name] = tv
+    return new_vcd
+
+class MismatchReport(object):
+    """Streams the value change mismatches of a comparison to a file as they
+    are found. At most max_per_signal mismatches of each signal and
+    max_total mismatches overall are written; the rest are only counted.
+
+    Args:
+        out (file):             file to write the report to
+        file1 (str):            name of the first file, for the header
+        file2 (str):            name of the second file, for the header
+        max_per_signal (int):   cap on the mismatches written per signal
+        max_total (int):        cap on the mismatches written overall
+    """
+    def __init__(self, out, file1, file2, max_per_signal=MAX_SIGNAL_DIFFS,
+            max_total=MAX_DIFFS):
+        self.out = out
+        self.max_per_signal = max_per_signal
+        self.max_total = max_total
+        self.counts = dict()
+        self.shown_counts = dict()
+        self.shown = 0
+        self.out.write("\n===== Value change mismatches: <{}, {}> =====\n"
+                .format(file1, file2))
+        self.out.write("{:>12}  {}: {} | {}\n".format("time", "signal",
+                file1, file2))
+
+    def add(self, time, sig_name, values1, values2, size1=None, size2=None):
+        """Records a mismatch, writing it out unless a cap is reached.
+
+        Args:
+            time (int):         time of the mismatch
+            sig_name (str):     name of the signal
+            values1 ([str]):    values the signal took at time in the first
+                                file, or None if it didn't change
+            values2 ([str]):    same for the second file
+            size1 (int):        size of the signal in the first file, to
+                                write its values out to, or None
+            size2 (int):        same for the second file
+
+        Returns:
+            None
+        """
+        count = self.counts.get(sig_name, 0) + 1
+        self.counts[sig_name] = count
+        if (count > self.max_per_signal or self.shown >= self.max_total):
+            return
+        self.shown += 1
+        self.shown_counts[sig_name] = self.shown_counts.get(sig_name, 0) + 1
+        self.out.write("{:>12}  {}: {}\n".format(time, sig_name,
+                mismatch_values(values1, values2, size1, size2)))
+
+    def close(self):
+        """Writes the mismatch count of every signal and flushes the report.
+
+        Returns:
+            None
+        """
+        self.out.write("===== Mismatches per signal =====\n")
+        for sig_name in sorted(self.counts):
+            self.out.write("{}: {} mismatches, {} shown\n".format(sig_name,
+                    self.counts[sig_name], self.shown_counts.get(sig_name, 0)))
+        total = sum(self.counts.values())
+        if (total > self.shown):
+            self.out.write("{} of {} mismatches not shown\n".format(
+                    total - self.shown, total))
+        self.out.flush()
+
+class MismatchSummary(object):
+    """Summarizes the value change mismatches of a comparison in one pass
+    and bounded memory, and writes the summary once it is closed. Each
+    signal keeps its first mismatch, its mismatch count and a reservoir of
+    at most samples mismatches, sampled uniformly over the whole trace; the
+    summary ranks the signals by their first mismatch. Takes mismatches like
+    MismatchReport, and only writes out the values of those it keeps.
+
+    Args:
+        out (file):     file to write the summary to
+        file1 (str):    name of the first file, for the header
+        file2 (str):    name of the second file, for the header
+        samples (int):  size of the reservoir of each signal
+        seed (int):     seed of the sampling, so that summaries are
+                        reproducible
+    """
+    def __init__(self, out, file1, file2, samples=MAX_SIGNAL_DIFFS, seed=0):
+        self.out = out
+        self.file1 = file1
+        self.file2 = file2
+        self.samples = samples
+        self.random = random.Random(seed)
+        self.counts = dict()
+        self.first = dict()
+        self.reservoirs = dict()
+        # signal -> (count of the next mismatch to sample, weight)
+        self.next_samples = dict()
+
+    def _uniform(self):
+        return 1.0 - self.random.random()   # in (0, 1]
+
+    def _skip(self, sig_name, count, weight):
+        # Algorithm L: the number of mismatches until the next one replacing
+        #   a sample is drawn once, rather than a random number per mismatch
+        weight *= math.exp(math.log(self._uniform()) / self.samples)
+        if (weight < 1.0):
+            count += 1 + int(math.log(self._uniform()) / math.log1p(-weight))
+        else:
+            count = float("inf")
+        self.next_samples[sig_name] = (count, weight)
+
+    def add(self, time, sig_name, values1, values2, size1=None, size2=None):
+        """Records a mismatch.
+
+        Args:
+            time (int):         time of the mismatch
+            sig_name (str):     name of the signal
+            values1 ([str]):    values the signal took at time in the first
+                                file, or None if it didn't change
+            values2 ([str]):    same for the second file
+            size1 (int):        size of the signal in the first file, to
+                                write its values out to, or None
+            size2 (int):        same for the second file
+
+        Returns:
+            None
+        """
+        count = self.counts.get(sig_name, 0) + 1
+        self.counts[sig_name] = count
+        if (count == 1):
+            self.first[sig_name] = (time, values1, values2, size1, size2)
+            self.reservoirs[sig_name] = []
+        if (count <= self.samples):
+            self.reservoirs[sig_name].append((time, values1, values2, size1,
+                    size2))
+            if (count == self.samples):
+                self._skip(sig_name, count, 1.0)
+        elif (self.samples and count == self.next_samples[sig_name][0]):
+            reservoir = self.reservoirs[sig_name]
+            reservoir[self.random.randrange(self.samples)] = (time, values1,
+                    values2, size1, size2)
+            self._skip(sig_name, count, self.next_samples[sig_name][1])
+
+    def ranking(self):
+        """Ranks the mismatching signals by their first mismatch.
+
+        Returns:
+            ([(int, str, int)]):    (time of the first mismatch, signal,
+                                    mismatch count), earliest first
+        """
+        return sorted((self.first[sig_name][0], sig_name, count)
+                      for (sig_name, count) in self.counts.items())
+
+    def close(self):
+        """Writes the summary and flushes it.
+
+        Returns:
+            None
+        """
+        self.out.write("\n===== Mismatch summary: <{}, {}> =====\n".format(
+                self.file1, self.file2))
+        self.out.write("{:>5}  {:>12}  {:>10}  {}\n".format("rank",
+                "first time", "mismatches", "signal"))
+        ranking = self.ranking()
+        for (rank, (time, sig_name, count)) in enumerate(ranking, 1):
+            self.out.write("{:>5}  {:>12}  {:>10}  {}\n".format(rank, time,
+                    count, sig_name))
+        for (first_time, sig_name, count) in ranking:
+            if (self.samples == 0):
+                break
+            self.out.write("===== {}: {} mismatches, {} sampled =====\n"
+                    .format(sig_name, count, min(count, self.samples)))
+            self.out.write("{:>12}  {} | {}\n".format("time", self.file1,
+                    self.file2))
+            samples = sorted(self.reservoirs[sig_name],
+                             key=lambda mismatch: mismatch[0])
+            if (samples[0][0] != first_time):
+                # The first mismatch is always shown
+                samples = [self.first[sig_name]] + samples[1:]
+            for (time, values1, values2, size1, size2) in samples:
+                self.out.write("{:>12}  {}\n".format(time,
+                        mismatch_values(values1, values2, size1, size2)))
+        self.out.flush()
+
+def mismatch_values(values1, values2, size1=None, size2=None):
+    """Writes out the values of a mismatch for a report.
+
+    Args:
+        values1 ([str]):    values in the first file, or None
+        values2 ([str]):    values in the second file, or None
+        size1 (int):        size of the signal in the first file, or None
+        size2 (int):        same for the second file
+
+    Returns:
+        (str):  the values of both files, "-" for no change
+    """
+    values1 = shown_values(values1, size1)
+    values2 = shown_values(values2, size2)
+    return "{} | {}".format(",".join(values1) if values1 else "-",
+            ",".join(values2) if values2 else "-")
+
+def top_level_nets(vcd_dict, top):
+    """Maps the identifier codes of top-level signals to their names.
+
+    Args:
+        vcd_dict (dict):    VCD dictionary generated by the Verilog_VCD module
+        top (str):          name of the top-level module
+
+    Returns:
+        (dict): identifier code -> list of full signal names using that code
+    """
+    names = dict()
+    for key in vcd_dict:
+        for net in vcd_dict[key]["nets"]:
+            if (net["hier"] == top):
+                sig_name = "{}.{}".format(net["hier"], net["name"])
+                names.setdefault(key, []).append(sig_name)
+    return names
+
+def value_sizes(vcd_dict, names):
+    """Gets the declared sizes of the given signals, which their values are
+    packed to for comparison.
+
+    Args:
+        vcd_dict (dict):    VCD dictionary generated by the Verilog_VCD module
+        names (dict):       identifier code -> signal names, from top_level_nets
+
+    Returns:
+        (dict): identifier code -> size in bits, or None for real signals,
+                which are compared as written
+    """
+    return dict((code, vcd.value_size(vcd_dict[code]["nets"][0]))
+                for code in names)
+
+def alias_groups(names1, names2):
+    """Groups the signals by their identifier codes in both files. The
+    signals of a group share their value changes in each file, so a group
+    is compared once for all of its names.
+
+    Args:
+        names1 (dict):  identifier code -> signal names in the first file,
+                        from top_level_nets
+        names2 (dict):  same for the second file
+
+    Returns:
+        ([(str, str, (str))]):  (code in the first file, code in the second
+                                file, sorted signal names) of every group,
+                                with None for the code in a file that lacks
+                                the signals
+    """
+    codes2 = dict((sig_name, code) for (code, sig_names) in names2.items()
+                  for sig_name in sig_names)
+    groups = dict()
+    for (code, sig_names) in names1.items():
+        for sig_name in sig_names:
+            key = (code, codes2.pop(sig_name, None))
+            groups.setdefault(key, []).append(sig_name)
+    for (sig_name, code) in codes2.items():
+        groups.setdefault((None, code), []).append(sig_name)
+    return [(code1, code2, tuple(sorted(sig_names)))
+            for ((code1, code2), sig_names) in groups.items()]
+
+def packed_values(values, size):
+    """Packs the values a signal took at one timestamp with vcd.pack, so
+    that they compare by their 4-state bits extended to the signal's size.
+
+    Args:
+        values ([str]): values of the signal, or None if it didn't change
+        size (int):     size of the signal, or None for real signals
+
+    Returns:
+        ([int | str]):  packed values, or values itself if it is None or the
+                        signal is real
+    """
+    if (values == None or size == None):
+        return values
+    return [vcd.pack(value, size) for value in values]
+
+def shown_values(values, size):
+    """Writes the values a signal took out as digits extended to the
+    signal's size, the way they were compared.
+
+    Args:
+        values (str | [str]):   value or values of the signal, or None
+        size (int):             size of the signal, or None for real signals
+
+    Returns:
+        (str | [str]):  the values as strings of size digits, or values
+                        itself if it is None or the signal is real
+    """
+    if (values == None or size == None):
+        return values
+    if isinstance(values, list):
+        return [shown_values(value, size) for value in values]
+    return vcd.unpack(vcd.pack(values, size), size)
+
+def restrict_names(names, sig_names):
+    """Restricts a map of identifier codes to signal names to the given
+    signals.
+
+    Args:
+        names (dict):       identifier code -> signal names, from top_level_nets
+        sig_names (set):    names of the signals to keep
+
+    Returns:
+        (dict): identifier code -> kept signal names, without codes that have
+                none left
+    """
+    kept = dict()
+    for (code, code_names) in names.items():
+        code_names = [n for n in code_names if n in sig_names]
+        if (len(code_names)):
+            kept[code] = code_names
+    return kept
+
+def code_changes(stream, names, start=None, end=None, counts=None,
+        hasher=None):
+    """Generator over the value change blocks of a VCDStream, restricted to
+    the given identifier codes, with the changes of each code gathered.
+
+    Args:
+        stream (VCDStream): open VCD stream
+        names (dict):       identifier code -> signal names, from top_level_nets
+        start (int):        start of the time window, or None
+        end (int):          end of the time window, or None
+        counts (dict):      dict to count the timestamps and changes read in,
+                            or None
+        hasher (FingerprintHasher): hasher to feed every block to, which is
+                            finished once the stream is exhausted, or None
+
+    Returns:
+        (generator):    yields (time, {identifier code: [values]}) per
+                        timestamp, starting with the values of all signals
+                        at start
+    """
+    (timestamps, num_changes) = (0, 0)
+    try:
+        for (time, changes) in stream.changes(names, start, end):
+            block = dict()
+            for (code, value) in changes:
+                block.setdefault(code, []).append(value)
+            if (hasher != None):
+                hasher.add(time, changes)
+            timestamps += 1
+            num_changes += len(changes)
+            yield (time, block)
+        if (hasher != None):
+            hasher.finish(stream.endtime)
+    finally:
+        if (counts != None):
+            counts["timestamps"] = counts.get("timestamps", 0) + timestamps
+            counts["changes"] = counts.get("changes", 0) + num_changes
+
+def stream_compare_vcd(stream1, stream2, names1, names2, fail_fast=False,
+        report=None, start=None, end=None, counts=(None, None),
+        hashers=(None, None)):
+    """Walks the value change sections of two VCD streams in lockstep and
+    compares the top-level signals timestamp by timestamp. Only the current
+    value of each signal is kept, so memory use is independent of the
+    length of the traces. Aliases, i.e. signals sharing an identifier code
+    in both files, are compared once per timestamp, and a mismatch applies
+    to all of their names. Values written differently are compared as
+    packed 4-state bits extended to the declared size of their signal, so
+    e.g. b1 and b0001 of a 4-bit signal match.
+
+    Args:
+        stream1 (VCDStream):    first open VCD stream
+        stream2 (VCDStream):    second open VCD stream
+        names1 (dict):          top-level signal names of stream1
+        names2 (dict):          top-level signal names of stream2
+        fail_fast (bool):       stop at the first diverging timestamp
+        report (MismatchReport):    report to add every mismatch to, or None
+        start (int):            start of the time window, or None
+        end (int):              end of the time window, or None
+        counts (dict, dict):    dicts to count the timestamps and changes
+                                read from each stream in, or None
+        hashers (FingerprintHasher, FingerprintHasher): hashers to
+                                fingerprint each stream with while it is
+                                compared, or None
+
+    Returns:
+        (list, tuple | None):   sorted list of the inconsistent signals, and
+                                the first divergence as (time, [(signal,
+                                value1, value2), ...]), or None if equivalent
+    """
+    blocks1 = code_changes(stream1, names1, start, end, counts[0], hashers[0])
+    blocks2 = code_changes(stream2, names2, start, end, counts[1], hashers[1])
+    sizes1 = value_sizes(stream1.data, names1)
+    sizes2 = value_sizes(stream2.data, names2)
+    groups = alias_groups(names1, names2)
+    # code -> groups it belongs to, in each file
+    groups1 = dict()
+    groups2 = dict()
+    for group in groups:
+        groups1.setdefault(group[0], []).append(group)
+        groups2.setdefault(group[1], []).append(group)
+    block1 = next(blocks1, None)
+    block2 = next(blocks2, None)
+    cur1 = dict()
+    cur2 = dict()
+    diff_set = set()
+    first_diff = None
+
+    while (block1 != None or block2 != None):
+        if (block2 == None or (block1 != None and block1[0] < block2[0])):
+            (time, changes1) = block1
+            changes2 = dict()
+            block1 = next(blocks1, None)
+        elif (block1 == None or block2[0] < block1[0]):
+            (time, changes2) = block2
+            changes1 = dict()
+            block2 = next(blocks2, None)
+        else:
+            (time, changes1) = block1
+            changes2 = block2[1]
+            block1 = next(blocks1, None)
+            block2 = next(blocks2, None)
+
+        for (code, values) in changes1.items():
+            cur1[code] = values[-1]
+        for (code, values) in changes2.items():
+            cur2[code] = values[-1]
+
+        touched = set(chain.from_iterable(map(groups1.__getitem__, changes1)))
+        touched.update(chain.from_iterable(map(groups2.__getitem__, changes2)))
+        # Identical strings are identical values, so only values written
+        # differently need packing
+        bad = [(code1, code2, sig_names)
+               for (code1, code2, sig_names) in touched
+               if changes1.get(code1) != changes2.get(code2) and
+               packed_values(changes1.get(code1), sizes1.get(code1)) !=
+               packed_values(changes2.get(code2), sizes2.get(code2))]
+        if (len(bad)):
+            bad = sorted((sig_name, code1, code2)
+                         for (code1, code2, sig_names) in bad
+                         for sig_name in sig_names)
+            diff_set.update(sig_name for (sig_name, code1, code2) in bad)
+            if (report != None):
+                for (sig_name, code1, code2) in bad:
+                    report.add(time, sig_name, changes1.get(code1),
+                            changes2.get(code2), sizes1.get(code1),
+                            sizes2.get(code2))
+            if (first_diff == None):
+                first_diff = (time, [(sig_name,
+                        shown_values(cur1.get(code1), sizes1.get(code1)),
+                        shown_values(cur2.get(code2), sizes2.get(code2)))
+                        for (sig_name, code1, code2) in bad])
+            if (fail_fast):
+                break
+
+    return (sorted(diff_set), first_diff)
+
+def open_vcd(vcd_path, module, use_index=False, parse_jobs=1, start=None,
+        parsed_cache=None, profile=None):
+    """Opens a VCD file for streaming comparison. With use_index, the file
+    is loaded through its sidecar binary index instead of being re-read.
+    With a start time, the stream seeks through the sidecar time index of
+    the file (FILE.tix), which is built on first use. With a cache of
+    parsed files, as in a --serve server, the file is taken from the cache,
+    unless the cache streams it from disk.
+
+    Args:
+        vcd_path (str):     path to the VCD file
+        module (str):       name of the top-level module
+        use_index (bool):   load the file through its sidecar binary index
+        parse_jobs (int):   processes parsing the file for its index
+        start (int):        start of the time window to compare, or None
+        parsed_cache (ParsedCache): cache of parsed files, or None
+        profile (Profile):  profile to record the opening in, or None
+
+    Returns:
+        (VCDStream | DataStream | RecordedStream):  stream over the file's
+                                                    value changes
+    """
+    scope = vcd.scope_exact(module)
+    with phase_of(profile, "open", vcd_path, python=True):
+        if (is_pipe(vcd_path)):
+            # Read once and as it is written, without any sidecar
+            return vcd.VCDStream(vcd_path, scope=scope)
+        if (parsed_cache != None):
+            recording = parsed_cache.get(vcd_path, module)
+            if (recording != None):
+                return recording.stream()
+        if (use_index):
+            return vcd.DataStream(vcd.parse_vcd_cached(vcd_path, scope=scope,
+                    jobs=parse_jobs))
+        time_index = None
+        if (start != None):
+            time_index = vcd.load_time_index(vcd_path, top=module)
+        return vcd.VCDStream(vcd_path, scope=scope, time_index=time_index)
+
+class CompareResult(object):
+    """Outcome of comparing the top-level signals of two VCD files.
+
+    Attributes:
+        equivalent (bool):      whether the files are equivalent
+        signals ([str]):        sorted names of the inconsistent signals
+        first_diff_time (int):  time of the first divergence, or None
+        first_diff ([(str, str, str)]): (signal, value in the first file,
+                                        value in the second file) of every
+                                        signal diverging at first_diff_time
+        only_in1 ([str]):       sorted top-level signals missing from the
+                                second file, which make the files
+                                inequivalent without comparing them
+        only_in2 ([str]):       same for the first file
+        stopped (bool):         whether comparing stopped at the first
+                                divergence, so more signals may differ
+    """
+    def __init__(self, signals=(), first_diff=None, only_in1=(), only_in2=(),
+            stopped=False):
+        self.signals = list(signals)
+        self.first_diff_time = None
+        self.first_diff = []
+        if (first_diff != None):
+            (self.first_diff_time, self.first_diff) = first_diff
+        self.only_in1 = sorted(only_in1)
+        self.only_in2 = sorted(only_in2)
+        self.stopped = stopped and (first_diff != None)
+        self.equivalent = (first_diff == None and len(self.only_in1) == 0
+                           and len(self.only_in2) == 0)
+
+    def __bool__(self):
+        return self.equivalent
+
+    def __repr__(self):
+        return "CompareResult(equivalent={}, signals={}, " \
+               "first_diff_time={})".format(self.equivalent, self.signals,
+               self.first_diff_time)
+
+    def as_dict(self):
+        """Gets the attributes of the result, as sent back by a --serve
+        server.
+
+        Args:
+            None
+
+        Returns:
+            (dict): attribute name -> value, of JSON types
+        """
+        return {"equivalent": self.equivalent, "signals": self.signals,
+                "first_diff_time": self.first_diff_time,
+                "first_diff": [list(diff) for diff in self.first_diff],
+                "only_in1": self.only_in1, "only_in2": self.only_in2,
+                "stopped": self.stopped}
+
+def compare_vcd_files(vcd1, vcd2, module="top", fail_fast=False, start=None,
+        end=None, fingerprint=False, use_index=False, parse_jobs=1,
+        report=None, parsed_cache=None, profile=None):
+    """Compares all of the top-level signals of two VCD files. Streams both
+    files in lockstep, comparing the value changes of the top-level signals
+    at each timestamp. Prints nothing and only depends on its arguments, not
+    on the command line options set by set_options, so that it can be
+    called as a library function, also from several threads at once.
+
+    Args:
+        vcd1 (str):         path to the first VCD file
+        vcd2 (str):         path to the second VCD file
+        module (str):       name of the top-level module
+        fail_fast (bool):   stop comparing at the first divergence
+        start (int):        only compare from this time on, or None
+        end (int):          only compare up to this time, or None
+        fingerprint (bool): compare the fingerprints of the files first, and
+                            only stream the signals whose fingerprints differ.
+                            A file without stored fingerprints is hashed
+                            while it is streamed, and its fingerprints are
+                            stored if it was read to the end
+        use_index (bool):   load the files through sidecar binary indexes
+        parse_jobs (int):   processes parsing a file for its index
+        report (MismatchReport):    report to add every mismatch to, or None
+        parsed_cache (ParsedCache): cache of parsed files to take the files
+                                    from, or None
+        profile (Profile):  profile to record the phases of the comparison
+                            in, or None
+
+    Returns:
+        (CompareResult):    verdict, inconsistent signals and first
+                            divergence
+    """
+    # Piped simulations are killed at the first divergence, so there is
+    #   nothing to compare after it
+    piped = is_pipe(vcd1) or is_pipe(vcd2)
+    fail_fast = fail_fast or piped
+    with open_vcd(vcd1, module, use_index, parse_jobs, start, parsed_cache,
+                profile) as stream1, \
+            open_vcd(vcd2, module, use_index, parse_jobs, start, parsed_cache,
+                profile) as stream2:
+        with phase_of(profile, "filter", python=True):
+            names1 = top_level_nets(stream1.data, module)
+            names2 = top_level_nets(stream2.data, module)
+        sigs1 = set(n for sig_names in names1.values() for n in sig_names)
+        sigs2 = set(n for sig_names in names2.values() for n in sig_names)
+        if (sigs1 != sigs2):
+            return CompareResult(only_in1=sigs1 - sigs2,
+                    only_in2=sigs2 - sigs1)
+
+        hashers = [None, None]
+        if (fingerprint and not piped and start == None and end == None):
+            with phase_of(profile, "fingerprint", python=True):
+                fingerprints1 = vcd.stored_fingerprints(vcd1, module)
+                fingerprints2 = vcd.stored_fingerprints(vcd2, module)
+            if (fingerprints1 != None and fingerprints2 != None):
+                # Matching fingerprints mean matching value changes, so only
+                # the other signals need to be streamed
+                differing = set(fingerprints1.diff(fingerprints2))
+                names1 = restrict_names(names1, differing)
+                names2 = restrict_names(names2, differing)
+                if (len(differing) == 0):
+                    return CompareResult()
+            else:
+                # All signals are streamed anyway, so a file without
+                #   fingerprints is hashed on the way instead of being read
+                #   twice
+                if (fingerprints1 == None):
+                    hashers[0] = vcd.FingerprintHasher(stream1.data)
+                if (fingerprints2 == None):
+                    hashers[1] = vcd.FingerprintHasher(stream2.data)
+
+        counts = (dict(), dict())
+        with phase_of(profile, "compare", python=True):
+            (diff_list, first_diff) = stream_compare_vcd(stream1, stream2,
+                    names1, names2, fail_fast, report, start, end, counts,
+                    hashers)
+        for (path, hasher) in zip((vcd1, vcd2), hashers):
+            if (hasher != None and hasher.fingerprints != None):
+                vcd.store_fingerprints(path, hasher.fingerprints, module)
+        if (profile != None):
+            for (path, stream, n) in ((vcd1, stream1, 0), (vcd2, stream2, 1)):
+                size = stream.bytes_read() if (piped) else \
+                        os.path.getsize(path)
+                profile.count_file(path, bytes=size,
+                        bytes_read=stream.bytes_read(), **counts[n])
+    return CompareResult(diff_list, first_diff, stopped=fail_fast)
+
+class CompareSettings(object):
+    """Options of the comparison of one check, passed down to compare_vcd
+    so that a check run by a --serve server does not depend on the options
+    set by set_options, which the checks of other clients share.
+
+    Args:
+        verbose (bool):     report the mismatches of inconsistent signals
+        fail_fast (bool):   stop comparing at the first divergence
+        report_path (str):  file to write the mismatch report to, or None
+                            for the output of the check
+        max_signal_diffs (int): cap on the mismatches reported per signal
+        max_diffs (int):        cap on the mismatches reported in total
+        window_start (int): time to start comparing at, or None
+        window_end (int):   time to stop comparing at, or None
+        fingerprint (bool): compare fingerprints before streaming the traces
+        summary (bool):     summarize the mismatches instead of reporting
+                            every one
+        use_index (bool):   load VCD files through sidecar binary indexes
+        parse_jobs (int):   processes parsing a VCD file for its index
+        parsed_cache (ParsedCache): cache of parsed files, or None
+        profile (Profile):  profile to record the phases in, or None
+    """
+    def __init__(self, verbose=False, fail_fast=False, report_path=None,
+            max_signal_diffs=MAX_SIGNAL_DIFFS, max_diffs=MAX_DIFFS,
+            window_start=None, window_end=None, fingerprint=False,
+            summary=False, use_index=False, parse_jobs=1, parsed_cache=None,
+            profile=None):
+        self.verbose = verbose
+        self.fail_fast = fail_fast
+        self.report_path = report_path
+        self.max_signal_diffs = max_signal_diffs
+        self.max_diffs = max_diffs
+        self.window_start = window_start
+        self.window_end = window_end
+        self.fingerprint = fingerprint
+        self.summary = summary
+        self.use_index = use_index
+        self.parse_jobs = parse_jobs
+        self.parsed_cache = parsed_cache
+        self.profile = profile
+
+def compare_settings():
+    """Gets the comparison options set by set_options, the parsed files of
+    a --serve server and the --profile output.
+
+    Args:
+        None
+
+    Returns:
+        (CompareSettings):  the current comparison options
+    """
+    return CompareSettings(VERBOSE, FAIL_FAST, REPORT_PATH, MAX_SIGNAL_DIFFS,
+            MAX_DIFFS, WINDOW_START, WINDOW_END, FINGERPRINT, SUMMARY,
+            USE_INDEX, PARSE_JOBS, PARSED_CACHE, PROFILE)
+
+def compare_vcd(vcd1, vcd2, module, file1, file2, settings=None, out=None):
+    """Compare all of the signals defined by the two VCD files, with the
+    command line options. Signals missing from either file are warned about.
+    In verbose mode, the mismatches are streamed to a report as they are
+    found; with --summary, they are summarized instead.
+
+    Args:
+        vcd1 (str):     path to the first VCD file
+        vcd2 (str):     path to the second VCD file
+        module (str):   name of the top-level module
+        file1 (str):    name of the first HDL file, for status printing
+        file2 (str):    name of the second HDL file, for status printing
+        settings (CompareSettings): options of the comparison, defaults to
+                                    the command line options
+        out (file):     stream the warnings and the report go to, defaults
+                        to stdout
+
+    Returns:
+        (bool, str):    tuple of a boolean that represents if there is a diff,
+                        and the string explaining what the diffs are
+    """
+    (result, out_str) = explain_compare(vcd1, vcd2, module, file1, file2,
+            settings, out)
+    return (result.equivalent, out_str)
+
+def explain_compare(vcd1, vcd2, module, file1, file2, settings=None,
+        out=None):
+    """Compares two VCD files like compare_vcd, also returning the
+    comparison result itself.
+
+    Args:
+        vcd1 (str):     path to the first VCD file
+        vcd2 (str):     path to the second VCD file
+        module (str):   name of the top-level module
+        file1 (str):    name of the first HDL file, for status printing
+        file2 (str):    name of the second HDL file, for status printing
+        settings (CompareSettings): options of the comparison, defaults to
+                                    the command line options
+        out (file):     stream the warnings and the report go to, defaults
+                        to stdout
+
+    Returns:
+        (CompareResult, str):   result of the comparison, and the string
+                                explaining what the diffs are
+    """
+    if (settings == None):
+        settings = compare_settings()
+    if (out == None):
+        out = sys.stdout
+    out_str = ""
+    report = None
+    if (settings.verbose or settings.summary):
+        if (settings.report_path != None):
+            report_fh = open(settings.report_path, "w")
+        else:
+            report_fh = out
+        if (settings.summary):
+            report = MismatchSummary(report_fh, file1, file2,
+                    settings.max_signal_diffs)
+        else:
+            report = MismatchReport(report_fh, file1, file2,
+                    settings.max_signal_diffs, settings.max_diffs)
+    try:
+        result = compare_vcd_files(vcd1, vcd2, module, settings.fail_fast,
+                settings.window_start, settings.window_end,
+                settings.fingerprint, settings.use_index, settings.parse_jobs,
+                report, settings.parsed_cache, settings.profile)
+    finally:
+        if (report != None):
+            report.close()
+            if (settings.report_path != None):
+                report_fh.close()
+
+    # Check if any signal isn't in both files
+    for key in result.only_in1:
+        out.write("Warning: {} is in {}, but not in {}\n".format(key, file1,
+                file2))
+    for key in result.only_in2:
+        out.write("Warning: {} is in {}, but not in {}\n".format(key, file2,
+                file1))
+    if (len(result.only_in1) or len(result.only_in2)):
+        out.write("Netlists cannot be equivalent. Please check your "
+                  "testbench.\n")
+        return (result, out_str)
+
+    # Feedback on what signals differ
+    if not (result.equivalent):
+        out_str += "\nSignal value changes not equivalent\n"
+        out_str += "First divergence at time {}:\n".format(
+                result.first_diff_time)
+        for (sig_name, val1, val2) in result.first_diff:
+            out_str += "\t{}: {} in {}, {} in {}\n".format(sig_name, val1,
+                    file1, val2, file2)
+        out_str += "Inconsistent signals: {}\n\n".format(result.signals)
+        if (result.stopped):
+            out_str += "Stopped at the first divergence; more signals may "
+            out_str += "differ later in the trace.\n"
+        if (report != None and settings.report_path != None):
+            out_str += "Mismatch report written to {}\n".format(
+                    settings.report_path)
+        elif (report == None):
+            out_str += "Run tool with '-v' to see the mismatching value "
+            out_str += "changes, or with '--summary' for a summary of them\n"
+    return (result, out_str)
+
+def compare_shard(task):
+    """Compares the VCD files of one shard pair, capturing the output. Runs
+    in a pool worker when shard pairs are compared concurrently. With
+    --report, each shard pair gets a report file of its own, named after
+    the shard.
+
+    Args:
+        task (tuple):   (shard index, path to the first VCD file, path to the
+                        second VCD file, top-level module, first HDL file
+                        name, second HDL file name)
+
+    Returns:
+        (int, bool, str, str, [dict]):  the shard index, whether the shard
+                                        pair is equivalent, the string
+                                        explaining the diffs, the captured
+                                        output, and the phases recorded
+    """
+    (n, vcd1, vcd2, module, file1, file2) = task
+    global PROFILE, REPORT_PATH
+    saved = (PROFILE, REPORT_PATH, sys.stdout)
+    if (PROFILE != None):
+        PROFILE = profiler.Profile()
+    if (REPORT_PATH != None):
+        (root, ext) = os.path.splitext(REPORT_PATH)
+        REPORT_PATH = "{}.shard{}{}".format(root, n + 1, ext)
+    sys.stdout = StringIO()
+    try:
+        (is_equiv, out_str) = compare_vcd(vcd1, vcd2, module, file1, file2)
+        phases = PROFILE.phases if (PROFILE != None) else []
+        return (n, is_equiv, out_str, sys.stdout.getvalue(), phases)
+    finally:
+        (PROFILE, REPORT_PATH, sys.stdout) = saved
+
+def shard_check(shard_vcds, module, hdl1, hdl2, parallel=True):
+    """Checks equivalence shard by shard. The VCD files of each shard pair
+    are compared on their own, on a pool of --jobs worker processes unless
+    parallel is False, and the descriptions are equivalent if every shard
+    pair is. With --fail-fast, comparing stops at the first shard pair that
+    is not equivalent.
+
+    Args:
+        shard_vcds ([(str, str)]):  paths to the VCD files of the first and
+                                    second design, per shard
+        module (str):   name of the top-level module
+        hdl1 (str):     path to the first HDL file, for status printing
+        hdl2 (str):     path to the second HDL file, for status printing
+        parallel (bool):    compare the shard pairs concurrently
+
+    Returns:
+        (bool, str):    tuple of a boolean that represents if there is a diff,
+                        and the string explaining what the diffs are
+    """
+    (file1, file2) = (os.path.basename(hdl1), os.path.basename(hdl2))
+    tasks = [(n, vcd1, vcd2, module, file1, file2)
+             for (n, (vcd1, vcd2)) in enumerate(shard_vcds)]
+    print("Comparing VCD files of {} shards:".format(len(tasks)))
+    sys.stdout.flush()
+    pool = None
+    if (parallel and len(tasks) > 1):
+        pool = multiprocessing.Pool(min(len(tasks),
+                SIM_JOBS or multiprocessing.cpu_count()),
+                initializer=set_options, initargs=get_options())
+        results = pool.imap(compare_shard, tasks)
+    else:
+        results = (compare_shard(task) for task in tasks)
+
+    out_str = ""
+    failed = []
+    try:
+        for (n, is_equiv, shard_out, output, phases) in results:
+            desc = shard_desc(n, SHARDS[n])
+            # Warnings and verbose reports, in shard order
+            sys.stdout.write(output)
+            print("\t{}: {}".format(desc, "equivalent" if (is_equiv) else
+                    "not equivalent"))
+            if (PROFILE != None):
+                for record in phases:
+                    record["shard"] = n + 1
+                PROFILE.merge(phases)
+            if not (is_equiv):
+                failed.append(n + 1)
+                out_str += "\n===== {} =====".format(desc) + shard_out
+                if (FAIL_FAST):
+                    break
+    except KeyboardInterrupt:
+        if (pool != None):
+            pool.terminate()
+        raise
+    finally:
+        if (pool != None):
+            # Also stops the comparisons left after --fail-fast
+            pool.terminate()
+            pool.join()
+
+    if (len(failed)):
+        out_str += "\nNot equivalent in {} of {} shards: {}\n".format(
+                len(failed), len(tasks), ", ".join(map(str, failed)))
+        if (FAIL_FAST and failed[-1] < len(tasks)):
+            out_str += "Stopped at the first shard that is not equivalent; "
+            out_str += "later shards were not compared.\n"
+    return (len(failed) == 0, out_str)
+
+def equiv_check(vcd1, vcd2, module, hdl1, hdl2):
+    """Checks equivalence between the two hardware descriptions.
+
+    Args:
+        vcd1 (str):     path to the first VCD file
+        vcd2 (str):     path to the second VCD file
+        module (str):   name of the top-level module
+        hdl1 (str):     name of the first HDL file, for status printing
+        hdl2 (str):     name of the second HDL file, for status printing
+
+    Returns:
+        (bool, str):    tuple of a boolean that represents if there is a diff,
+                        and the string explaining what the diffs are
+    """
+    print("Comparing VCD files...", end="")
+    sys.stdout.flush()
+    if (hdl1 != None):
+        file1 = os.path.basename(hdl1)
+    else:
+        file1 = vcd1
+    if (hdl2 != None):
+        file2 = os.path.basename(hdl2)
+    else:
+        file2 = vcd2
+    (is_equivalent, out_str) = compare_vcd(vcd1, vcd2, module, file1, file2)
+    print("done")
+    return (is_equivalent, out_str)
+
+def set_options(verbose=False, fail_fast=False, use_index=False,
+        cache=None, timeout=None, history=None, report_path=None,
+        max_signal_diffs=MAX_SIGNAL_DIFFS, max_diffs=MAX_DIFFS, parse_jobs=1,
+        window_start=None, window_end=None, compression=None,
+        fingerprint=False, pipe=False, shards=None, sim_jobs=None,
+        summary=False, seat_pool=None):
+    """Sets the global comparison options. Also used as the initializer of
+    batch worker processes, so that they see the options of the parent.
+
+    Args:
+        verbose (bool):     print value change dumps of inconsistent signals
+        fail_fast (bool):   stop comparing at the first divergence
+        use_index (bool):   load VCD files through sidecar binary indexes
+        cache (ArtifactStore):  simulation result cache, or None
+        timeout (float):    simulation timeout in seconds, or None for
+                            TIMEOUT or an adaptive one
+        history (DurationHistory):  simulation durations for adaptive
+                                    timeouts, or None
+        report_path (str):  file to write the mismatch report of verbose mode
+                            to, or None for stdout
+        max_signal_diffs (int): cap on the mismatches reported per signal
+        max_diffs (int):        cap on the mismatches reported in total
+        parse_jobs (int):   processes parsing a VCD file for its index
+        window_start (int): time to start comparing at, or None
+        window_end (int):   time to stop comparing at, or None
+        compression (str):  format to compress simulation dumps in, or None
+        fingerprint (bool): compare fingerprints before streaming the traces
+        pipe (bool):        compare the simulation dumps through named pipes
+                            while the simulations run
+        shards ([[str]]):   plusargs of every shard to simulate, or None to
+                            simulate each design once without plusargs
+        sim_jobs (int):     shard simulations and comparisons run at once,
+                            or None for the number of CPUs
+        summary (bool):     summarize the mismatches instead of reporting
+                            every one in verbose mode
+        seat_pool (SeatPool):   VCS seats shared with the other runs on the
+                                host, or None for no limit
+
+    Returns:
+        None
+    """
+    global VERBOSE, FAIL_FAST, USE_INDEX, SIM_CACHE, SIM_TIMEOUT
+    global TIMEOUT_HISTORY, REPORT_PATH, MAX_SIGNAL_DIFFS, MAX_DIFFS
+    global PARSE_JOBS, WINDOW_START, WINDOW_END, DUMP_COMPRESSION
+    global FINGERPRINT, PIPE, SHARDS, SIM_JOBS, SUMMARY, SEAT_POOL
+    VERBOSE = verbose
+    FAIL_FAST = fail_fast
+    USE_INDEX = use_index
+    SIM_CACHE = cache
+    SIM_TIMEOUT = timeout
+    TIMEOUT_HISTORY = history
+    REPORT_PATH = report_path
+    MAX_SIGNAL_DIFFS = max_signal_diffs
+    MAX_DIFFS = max_diffs
+    PARSE_JOBS = parse_jobs
+    WINDOW_START = window_start
+    WINDOW_END = window_end
+    DUMP_COMPRESSION = compression
+    FINGERPRINT = fingerprint
+    PIPE = pipe
+    SHARDS = shards
+    SIM_JOBS = sim_jobs
+    SUMMARY = summary
+    SEAT_POOL = seat_pool
+
+def get_options():
+    """Gets the global options, in the argument order of set_options.
+
+    Args:
+        None
+
+    Returns:
+        (tuple):    the current options
+    """
+    return (VERBOSE, FAIL_FAST, USE_INDEX, SIM_CACHE, SIM_TIMEOUT,
+            TIMEOUT_HISTORY, REPORT_PATH, MAX_SIGNAL_DIFFS, MAX_DIFFS,
+            PARSE_JOBS, WINDOW_START, WINDOW_END, DUMP_COMPRESSION,
+            FINGERPRINT, PIPE, SHARDS, SIM_JOBS, SUMMARY, SEAT_POOL)
+
+# Default options, for use as a library
+set_options()
+
+def run_check(file1_path, file2_path, tb_path, module, vcd_files=None,
+        parallel=True, timeout=None):
+    """Runs one equivalence check in its own temp directory, either by
+    simulating both descriptions or by comparing two existing VCD files.
+
+    Args:
+        file1_path (str):   path to the first SV/V file
+        file2_path (str):   path to the second SV/V file
+        tb_path (str):      path to the testbench file
+        module (str):       name of the top-level module, or None
+        vcd_files ([str]):  paths to two VCD files to compare instead
+        parallel (bool):    simulate both descriptions concurrently
+        timeout (float):    seconds each simulation may run, defaults to the
+                            --timeout option
+
+    Returns:
+        (int, bool):    exit code of the check, and whether the descriptions
+                        were found equivalent
+    """
+    # Create a temp directory for our compilation/simulation
+    tempdir = tempfile.mkdtemp()
+    ori_dir = os.getcwd()
     try:
-        if (no_compile):
-            # Prepend path since we are in the tempdir, only if paths are not absolute
+        if (vcd_files != None):
             vcd1 = path_make_absolute(vcd_files[0], ori_dir)
             vcd2 = path_make_absolute(vcd_files[1], ori_dir)
             path1 = None
@@ -433,39 +2340,414 @@ def main():
             path1 = path_make_absolute(file1_path, ori_dir)
             path2 = path_make_absolute(file2_path, ori_dir)
             tb_path = path_make_absolute(tb_path, ori_dir)
-            generate_vcds(path1, path2, tb_path)
-            vcd1 = "out1.vcd"
-            vcd2 = "out2.vcd"
+            if (SHARDS != None):
+                shard_vcds = generate_shard_vcds(path1, path2, tb_path,
+                        parallel, timeout, tempdir, SIM_CACHE)
+            elif not (PIPE):
+                (vcd1, vcd2) = generate_vcds(path1, path2, tb_path, parallel,
+                        timeout, tempdir, SIM_CACHE)
             # Module name is name of tb file, unless otherwise specified
             if (module == None):
                 base = os.path.basename(tb_path)
                 module = os.path.splitext(base)[0]
                 print("No top module specified. Defaulting to '{}'".format(module))
 
-        (is_equiv, out_str) = equiv_check(vcd1, vcd2, module, path1, path2)
+        if (vcd_files == None and SHARDS != None):
+            (is_equiv, out_str) = shard_check(shard_vcds, module, path1,
+                    path2, parallel)
+        elif (vcd_files == None and PIPE):
+            (is_equiv, out_str) = pipe_check(path1, path2, tb_path, module,
+                    parallel, timeout, tempdir, SIM_CACHE)
+        else:
+            (is_equiv, out_str) = equiv_check(vcd1, vcd2, module, path1,
+                    path2)
         if (is_equiv):
             print("\nDescriptions are equivalent!")
         else:
             print(out_str)
-        return 0
+        return (0, is_equiv)
     except NoFileError as e:
         print(e)
-        return NO_FILE_ERR
+        return (NO_FILE_ERR, False)
     except VCSCompileError as e:
         print(e)
-        return VCS_COMP_ERR
+        return (VCS_COMP_ERR, False)
     except SimTimeoutError as e:
         print(e)
-        return SIM_TIMEOUT_ERR
+        return (SIM_TIMEOUT_ERR, False)
+    except LicenseError as e:
+        print(e)
+        return (LICENSE_ERR, False)
     except KeyboardInterrupt:
-        sys.exit(1)
+        raise
     except Exception as e:
         print("an unknown error has occurred:")
         print(e)
-        return UNKNOWN_ERR
+        return (UNKNOWN_ERR, False)
     finally:
         # Cleanup
-        os.chdir(ori_dir)
         shutil.rmtree(tempdir)
+        if (SIM_CACHE != None):
+            SIM_CACHE.release()
+
+def check_equivalence(file1, file2, testbench, module=None, timeout=TIMEOUT,
+        cache=None, parallel=True, **options):
+    """Simulates two descriptions with a testbench and compares their dumps,
+    as a library function: nothing is printed, and neither the options set
+    by set_options nor the working directory are changed, so that checks
+    can run in several threads at once. The simulations run in a temp
+    directory, which is removed afterwards.
+
+    Args:
+        file1 (str):        path to the first SV/V file
+        file2 (str):        path to the second SV/V file
+        testbench (str):    path to the testbench file
+        module (str):       name of the top-level module, defaults to the
+                            name of the testbench file
+        timeout (float):    seconds each simulation may run
+        cache (ArtifactStore):  simulation cache, or None
+        parallel (bool):    simulate both descriptions concurrently
+        **options:          comparison options of compare_vcd_files()
+
+    Returns:
+        (CompareResult):    verdict, inconsistent signals and first
+                            divergence
+
+    Raises:
+        NoFileError:        if a file is missing
+        VCSCompileError:    if a description fails to compile
+        SimTimeoutError:    if a simulation times out
+    """
+    if (module == None):
+        module = os.path.splitext(os.path.basename(testbench))[0]
+    paths = [os.path.abspath(path) for path in (file1, file2, testbench)]
+    tempdir = tempfile.mkdtemp()
+    # Progress messages, also those of the pool workers forked meanwhile
+    quiet = getattr(QUIET, "on", False)
+    QUIET.on = True
+    # The entries this check uses stay locked until it is done, whatever
+    #   the checks of other threads release
+    store = cache.session() if (cache != None) else None
+    try:
+        (vcd1, vcd2) = generate_vcds(paths[0], paths[1], paths[2],
+                parallel, timeout, tempdir, store, SimSettings(timeout))
+        return compare_vcd_files(vcd1, vcd2, module, **options)
+    finally:
+        QUIET.on = quiet
+        shutil.rmtree(tempdir)
+        if (store != None):
+            store.release()
+
+def read_manifest(manifest_path):
+    """Reads a batch manifest. Each non-empty line that isn't a '#' comment
+    describes one job as "file1 file2 testbench [module] [timeout=SECONDS]".
+    Relative paths are taken relative to the manifest's directory.
+
+    Args:
+        manifest_path (str):    path to the manifest file
+
+    Returns:
+        ([dict]):   one dictionary of job parameters per job
+    """
+    if not (os.path.isfile(manifest_path)):
+        raise_err(NO_FILE_ERR, (manifest_path,))
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    jobs = []
+    with open(manifest_path, "r") as fh:
+        for (lineno, line) in enumerate(fh, 1):
+            fields = line.split("#", 1)[0].split()
+            if (len(fields) == 0):
+                continue
+            timeout = None
+            if (fields[-1].startswith("timeout=")):
+                try:
+                    timeout = float(fields.pop()[len("timeout="):])
+                except ValueError:
+                    raise_err(BAD_MANIFEST_ERR, (manifest_path, lineno))
+            if (len(fields) not in (3, 4)):
+                raise_err(BAD_MANIFEST_ERR, (manifest_path, lineno))
+            jobs.append({
+                "index": len(jobs),
+                "file1_path": os.path.join(base_dir, fields[0]),
+                "file2_path": os.path.join(base_dir, fields[1]),
+                "tb_path": os.path.join(base_dir, fields[2]),
+                "module": fields[3] if (len(fields) == 4) else None,
+                "timeout": timeout,
+            })
+    return jobs
+
+def run_batch_job(job):
+    """Runs one batch job in a worker process, capturing its output.
+    The designs of a job are simulated one after the other, since pool
+    workers cannot start pools of their own.
+
+    Args:
+        job (dict): job parameters, as returned by read_manifest
+
+    Returns:
+        (dict, int, str):   the job, its exit code and its captured output
+    """
+    # Jobs would clobber a shared --report file, so each job's mismatches
+    # go to its captured output instead
+    global REPORT_PATH
+    REPORT_PATH = None
+    ori_stdout = sys.stdout
+    sys.stdout = StringIO()
+    try:
+        (code, is_equiv) = run_check(job["file1_path"], job["file2_path"],
+                job["tb_path"], job["module"], parallel=False,
+                timeout=job["timeout"])
+        if (code == 0 and not is_equiv):
+            code = NOT_EQUIV_ERR
+        return (job, code, sys.stdout.getvalue())
+    finally:
+        sys.stdout = ori_stdout
+
+def run_batch(manifest_path, num_workers=None):
+    """Runs every job of a batch manifest on a pool of worker processes and
+    prints an aggregated summary.
+
+    Args:
+        manifest_path (str):    path to the manifest file
+        num_workers (int):      size of the worker pool, defaults to the
+                                number of CPUs
+
+    Returns:
+        (int):  0 if every job passed, BATCH_FAIL_ERR otherwise
+    """
+    jobs = read_manifest(manifest_path)
+    print("Running {} jobs from {}".format(len(jobs), manifest_path))
+    codes = [None] * len(jobs)
+    pool = multiprocessing.Pool(num_workers, initializer=set_options,
+            initargs=get_options())
+    try:
+        for (job, code, output) in pool.imap_unordered(run_batch_job, jobs):
+            codes[job["index"]] = code
+            desc = "{} vs {}".format(os.path.basename(job["file1_path"]),
+                    os.path.basename(job["file2_path"]))
+            if (code == 0):
+                print("[PASS] {}".format(desc))
+            else:
+                print("[FAIL {}] {}".format(code, desc))
+                print(output.rstrip() + "\n")
+        pool.close()
+    except KeyboardInterrupt:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+    passed = codes.count(0)
+    not_equiv = codes.count(NOT_EQUIV_ERR)
+    errors = len(codes) - passed - not_equiv
+    print("\nBatch summary: {} passed, {} not equivalent, {} errors, "
+          "{} jobs".format(passed, not_equiv, errors, len(codes)))
+    for (job, code) in zip(jobs, codes):
+        print("\t{:3d}  {} {} {}".format(code, job["file1_path"],
+                job["file2_path"], job["tb_path"]))
+    return 0 if (passed == len(codes)) else BATCH_FAIL_ERR
+
+def parse_for_cache(vcd_path, module):
+    """Records the value changes of the top-level signals of a VCD file for
+    the cache of a --serve server.
+
+    Args:
+        vcd_path (str):     path to the VCD file
+        module (str):       name of the top-level module
+
+    Returns:
+        (Recording):    recording of the file, to be replayed by every
+                        comparison using it
+    """
+    return vcd.Recording(vcd_path, scope=vcd.scope_exact(module))
+
+def run_server_job(job):
+    """Runs one comparison job of a --serve server, capturing its output.
+    Jobs of several clients run at once, each in a thread of its own, so a
+    job's options go into CompareSettings of its own rather than through
+    set_options, and its output into a string rather than stdout.
+
+    Args:
+        job (dict): "vcd": paths to the two VCD files, "module": name of the
+                    top-level module or None, "options": set_options()
+                    arguments out of SERVER_OPTIONS
+
+    Returns:
+        (dict): "code": exit code, "equivalent": verdict, "output": what the
+                check printed, "result": CompareResult.as_dict() of the
+                comparison or None if it failed, "cache_hits": VCD files
+                found parsed
+    """
+    settings = compare_settings()
+    for (name, value) in job.get("options", dict()).items():
+        if (name not in SERVER_OPTIONS):
+            raise ValueError("unknown option {}".format(name))
+        setattr(settings, name, value)
+    settings.parsed_cache = PARSED_CACHE.session()
+    (vcd1, vcd2) = job["vcd"]
+    module = job["module"]
+    out = StringIO()
+    if (module == None):
+        out.write("No top module specified. Defaulting to 'top'.\n")
+        module = "top"
+    out.write("Comparing VCD files...")
+    try:
+        (result, out_str) = explain_compare(vcd1, vcd2, module, vcd1, vcd2,
+                settings, out)
+        out.write("done\n")
+        if (result.equivalent):
+            out.write("\nDescriptions are equivalent!\n")
+        else:
+            out.write(out_str + "\n")
+        code = 0
+    except Exception as e:
+        out.write("an unknown error has occurred:\n{}\n".format(e))
+        (result, code) = (None, UNKNOWN_ERR)
+    reply = {"code": code,
+             "equivalent": result != None and result.equivalent,
+             "output": out.getvalue(),
+             "result": result.as_dict() if (result != None) else None,
+             "cache_hits": settings.parsed_cache.hits}
+    # One write, as other jobs report concurrently
+    sys.stdout.write("[{}] {} {}: {} parsed files reused\n".format(code,
+            vcd1, vcd2, reply["cache_hits"]))
+    sys.stdout.flush()
+    return reply
+
+def run_serve(socket_path, cache_mib):
+    """Runs a comparison server until it is interrupted.
+
+    Args:
+        socket_path (str):  path of the UNIX socket to listen on
+        cache_mib (int):    memory budget of the parsed VCD files, in MiB
+
+    Returns:
+        (int):  exit code
+    """
+    global PARSED_CACHE
+    PARSED_CACHE = daemon.ParsedCache(cache_mib * 1024 ** 2, parse_for_cache)
+    try:
+        server = daemon.Server(socket_path, run_server_job)
+    except (IOError, OSError) as e:
+        print("ERROR: cannot serve on {}: {}".format(socket_path, e))
+        return UNKNOWN_ERR
+    print("Serving comparisons on {}".format(socket_path))
+    sys.stdout.flush()
+    daemon.serve(server)
+    return 0
+
+def run_remote(socket_path, vcd_files, module):
+    """Runs a --vcd comparison on a --serve server, printing its output.
+
+    Args:
+        socket_path (str):  path of the server's UNIX socket
+        vcd_files ([str]):  paths to the two VCD files
+        module (str):       name of the top-level module, or None
+
+    Returns:
+        (int | None):   exit code of the comparison, or None if no server
+                        could run it
+    """
+    options = dict(zip(SERVER_OPTIONS, (VERBOSE, FAIL_FAST, REPORT_PATH,
+            MAX_SIGNAL_DIFFS, MAX_DIFFS, WINDOW_START, WINDOW_END,
+            FINGERPRINT, SUMMARY)))
+    job = {"vcd": [os.path.abspath(path) for path in vcd_files],
+           "module": module, "options": options}
+    try:
+        result = daemon.request(socket_path, job)
+    except (IOError, OSError, ValueError) as e:
+        sys.stderr.write("Warning: no comparison server on {} ({}), "
+                         "comparing locally\n".format(socket_path, e))
+        return None
+    if ("error" in result):
+        print("ERROR: the comparison server failed: {}".format(
+                result["error"]))
+        return UNKNOWN_ERR
+    sys.stdout.write(result["output"])
+    return result["code"]
+
+def main():
+    # Grab args from the command line
+    try:
+        args = parse_args()
+    except NotEnoughArgError as e:
+        print(e)
+        return BAD_ARG_ERR
+
+    # run_check() works in a temp directory
+    args.cache_dir = os.path.abspath(args.cache_dir)
+    args.seat_dir = os.path.abspath(args.seat_dir)
+    if (args.report != None):
+        args.report = os.path.abspath(args.report)
+    cache = None
+    if not (args.no_cache):
+        cache = sim_cache.ArtifactStore(args.cache_dir,
+                args.cache_size * 1024 ** 2)
+    history = None
+    if (args.adaptive_timeout):
+        history = supervisor.DurationHistory(os.path.join(args.cache_dir,
+                HISTORY_FILE))
+    seat_pool = None
+    if (args.vcs_seats != None):
+        seat_pool = seats.SeatPool(args.vcs_seats, args.seat_dir,
+                args.priority)
+    set_options(args.verbose, args.fail_fast, args.use_index, cache,
+            args.timeout, history, args.report, args.max_signal_diffs,
+            args.max_diffs, args.parse_jobs, args.start, args.end,
+            args.compress_dumps, args.fingerprint, args.pipe, args.shards,
+            args.jobs, args.summary, seat_pool)
+    if (args.use_good or args.use_bad):
+        file1_path = EX_FILE1 if args.use_good else EX_FILE1_BAD
+        file2_path = EX_FILE2
+        tb_path = EX_TB
+        module = EX_MOD
+    else:
+        file1_path = args.file1
+        file2_path = args.file2
+        tb_path = args.testbench
+        module = args.module
+
+    # TODO: write functionality with sv2v tool
+    checkfile_path = args.in_file
+    if (checkfile_path != None):
+        try:
+            basic_check()
+            return 0
+        except BasicCheckError as e:
+            print(e)
+            return FAIL_BASIC
+        except KeyboardInterrupt:
+            # Suppress traceback
+            sys.exit(1)
+
+    if (args.serve != None):
+        return run_serve(args.serve, args.serve_cache)
+
+    global PROFILE
+    if (args.profile != None):
+        # run_check() works in a temp directory
+        args.profile = os.path.abspath(args.profile)
+        if (args.profile_python != None):
+            args.profile_python = os.path.abspath(args.profile_python)
+        PROFILE = profiler.Profile(args.profile_python)
+    try:
+        if (args.manifest != None):
+            return run_batch(args.manifest, args.jobs)
+        if (args.server != None and args.vcd != None):
+            code = run_remote(args.server, args.vcd, module)
+            if (code != None):
+                return code
+        (code, is_equiv) = run_check(file1_path, file2_path, tb_path, module,
+                args.vcd)
+        return code
+    except (NoFileError, ManifestError) as e:
+        print(e)
+        return NO_FILE_ERR if isinstance(e, NoFileError) else BAD_MANIFEST_ERR
+    except KeyboardInterrupt:
+        sys.exit(1)
+    finally:
+        if (PROFILE != None):
+            PROFILE.write(args.profile, sys.argv)
 
-sys.exit(main())
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+# fake_vcs.py
+# Stand-in for the vcs command, for tests that compile and simulate without
+# VCS. The "design" passed to the fake vcs is the VCD file its simulator
+# dumps: compiling writes a simv script holding the contents of the design,
+# and running simv writes them to the dump file.
+
+import os
+import sys
+
+VCS = """#!{python}
+import os
+import sys
+
+sources = [arg for arg in sys.argv[1:] if arg.endswith((".sv", ".v"))]
+dump = "dump.vcd"
+for arg in sys.argv[1:]:
+    if arg.startswith("+vcs+dumpvars+"):
+        dump = arg[len("+vcs+dumpvars+"):]
+if "FAKE_VCS_LOG" in os.environ:
+    with open(os.environ["FAKE_VCS_LOG"], "a") as fh:
+        fh.write(os.path.basename(sources[0]) + "\\n")
+with open(sources[0]) as fh:
+    design = fh.read()
+if design.startswith("error"):
+    sys.stdout.write("Error-[SE] Syntax error in " + sources[0] + "\\n")
+    sys.exit(1)
+with open("simv", "w") as fh:
+    fh.write(SIMV.format(python=sys.executable, dump=dump, design=design))
+os.chmod("simv", 0o755)
+"""
+
+SIMV = '''#!{python}
+import os
+import sys
+import time
+
+time.sleep(float(os.environ.get("FAKE_SIM_SLEEP", 0)))
+dump = {dump!r}
+for arg in sys.argv[1:]:
+    if arg.startswith("+vcs+dumpvars+"):
+        dump = arg[len("+vcs+dumpvars+"):]
+with open(dump, "w") as fh:
+    fh.write({design!r})
+'''
+
+def install(bin_dir):
+    """Writes the fake vcs into a directory and puts it first on the PATH.
+
+    Args:
+        bin_dir (str):  directory to write the vcs script to
+
+    Returns:
+        (str):  the PATH before, to restore once done
+    """
+    vcs = os.path.join(bin_dir, "vcs")
+    with open(vcs, "w") as fh:
+        fh.write(VCS.format(python=sys.executable).replace("SIMV",
+                repr(SIMV)))
+    os.chmod(vcs, 0o755)
+    path = os.environ["PATH"]
+    os.environ["PATH"] = bin_dir + os.pathsep + path
+    return path
@@ -0,0 +1,104 @@
+# test_alias_groups.py
+# Tests of how signals sharing identifier codes are grouped and compared.
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+        __file__))))
+
+from sv2v_test import alias_groups, compare_vcd_files
+
+HEADER = """$timescale 1ns $end
+$scope module top $end
+{}$upscope $end
+$enddefinitions $end
+"""
+
+def write_vcd(path, variables, changes):
+    """Writes a VCD file of 1-bit signals of module top.
+
+    Args:
+        path (str):         path of the file
+        variables ([(str, str)]):   (identifier code, signal name) pairs
+        changes ([(int, [(str, str)])]):    (time, [(code, value)]) blocks
+
+    Returns:
+        None
+    """
+    with open(path, "w") as fh:
+        fh.write(HEADER.format("".join(
+                "$var wire 1 {} {} $end\n".format(code, name)
+                for (code, name) in variables)))
+        for (time, block) in changes:
+            fh.write("#{}\n".format(time))
+            for (code, value) in block:
+                fh.write("{}{}\n".format(value, code))
+
+class AliasGroupsTest(unittest.TestCase):
+    def test_same_codes(self):
+        names = {"!": ["top.a", "top.b"], "\"": ["top.c"]}
+        self.assertEqual(sorted(alias_groups(names, names)),
+                [("!", "!", ("top.a", "top.b")), ("\"", "\"", ("top.c",))])
+
+    def test_groups_split_differently(self):
+        # a and b share a code in the first file, b and c in the second
+        names1 = {"!": ["top.a", "top.b"], "\"": ["top.c"]}
+        names2 = {"#": ["top.a"], "$": ["top.b", "top.c"]}
+        self.assertEqual(sorted(alias_groups(names1, names2)),
+                [("!", "#", ("top.a",)), ("!", "$", ("top.b",)),
+                 ("\"", "$", ("top.c",))])
+
+    def test_every_signal_in_one_group(self):
+        names1 = {"!": ["top.a", "top.b", "top.c"], "\"": ["top.d"]}
+        names2 = {"#": ["top.a", "top.d"], "$": ["top.b"], "%": ["top.c"]}
+        groups = alias_groups(names1, names2)
+        sig_names = [n for (code1, code2, group) in groups for n in group]
+        self.assertEqual(sorted(sig_names),
+                ["top.a", "top.b", "top.c", "top.d"])
+
+    def test_missing_signals(self):
+        names1 = {"!": ["top.a", "top.b"]}
+        names2 = {"#": ["top.a"], "$": ["top.c"]}
+        self.assertEqual(sorted(alias_groups(names1, names2),
+                key=lambda group: group[2]),
+                [("!", "#", ("top.a",)), ("!", None, ("top.b",)),
+                 (None, "$", ("top.c",))])
+
+class CompareAliasesTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.vcd1 = os.path.join(self.tmp, "a.vcd")
+        self.vcd2 = os.path.join(self.tmp, "b.vcd")
+        # a and b share a code in the first file
+        write_vcd(self.vcd1, [("!", "a"), ("!", "b"), ("\"", "c")],
+                [(0, [("!", "0"), ("\"", "0")]), (10, [("!", "1")]),
+                 (20, [("\"", "1")])])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_equivalent_with_other_aliases(self):
+        # a alone and b and c sharing a code, with the same values
+        write_vcd(self.vcd2, [("#", "a"), ("$", "b"), ("%", "c")],
+                [(0, [("#", "0"), ("$", "0"), ("%", "0")]),
+                 (10, [("#", "1"), ("$", "1")]), (20, [("%", "1")])])
+        result = compare_vcd_files(self.vcd1, self.vcd2, "top")
+        self.assertTrue(result.equivalent)
+
+    def test_only_diverging_alias_is_reported(self):
+        # b and c share a code, so b follows c instead of a
+        write_vcd(self.vcd2, [("#", "a"), ("$", "b"), ("$", "c")],
+                [(0, [("#", "0"), ("$", "0")]), (10, [("#", "1")]),
+                 (20, [("$", "1")])])
+        result = compare_vcd_files(self.vcd1, self.vcd2, "top")
+        self.assertFalse(result.equivalent)
+        self.assertEqual(result.signals, ["top.b"])
+        self.assertEqual(result.first_diff_time, 10)
+        self.assertEqual(result.first_diff, [("top.b", "1", "0")])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+# test_batch.py
+# Tests of --batch manifests and of the exit codes of their jobs.
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+        __file__))))
+
+import fake_vcs
+import sv2v_test
+from sv2v_test import ManifestError, NoFileError, read_manifest, run_batch
+
+VCD = """$timescale 1ns $end
+$scope module top $end
+$var wire 1 ! a $end
+$upscope $end
+$enddefinitions $end
+#0
+0!
+#10
+{}!
+"""
+
+class ReadManifestTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.manifest = os.path.join(self.tmp, "jobs.txt")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def read(self, text):
+        with open(self.manifest, "w") as fh:
+            fh.write(text)
+        return read_manifest(self.manifest)
+
+    def test_jobs(self):
+        jobs = self.read("# regression\n\n"
+                "a.sv b.v tb.sv\n"
+                "c.sv /abs/d.v tb.sv dut timeout=2.5  # slow one\n")
+        self.assertEqual(len(jobs), 2)
+        self.assertEqual(jobs[0], {"index": 0,
+                "file1_path": os.path.join(self.tmp, "a.sv"),
+                "file2_path": os.path.join(self.tmp, "b.v"),
+                "tb_path": os.path.join(self.tmp, "tb.sv"),
+                "module": None, "timeout": None})
+        self.assertEqual(jobs[1]["index"], 1)
+        self.assertEqual(jobs[1]["file2_path"], "/abs/d.v")
+        self.assertEqual(jobs[1]["module"], "dut")
+        self.assertEqual(jobs[1]["timeout"], 2.5)
+
+    def test_bad_lines(self):
+        for line in ("a.sv b.sv\n", "a.sv b.sv tb.sv top extra\n",
+                "a.sv b.sv tb.sv timeout=soon\n"):
+            with self.assertRaises(ManifestError) as cm:
+                self.read("a.sv b.sv tb.sv\n" + line)
+            self.assertIn("line 2", str(cm.exception))
+
+    def test_missing_manifest(self):
+        self.assertRaises(NoFileError, read_manifest, self.manifest)
+
+class RunBatchTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.tmp, "bin"))
+        self.path = fake_vcs.install(os.path.join(self.tmp, "bin"))
+        self.options = sv2v_test.get_options()
+        for (name, value) in (("good", 1), ("same", 1), ("bad", 0)):
+            self.write(name + ".sv", VCD.format(value))
+        self.write("broken.sv", "error\n")
+        self.write("top.sv", "")
+
+    def tearDown(self):
+        os.environ["PATH"] = self.path
+        sv2v_test.set_options(*self.options)
+        shutil.rmtree(self.tmp)
+
+    def write(self, name, text):
+        with open(os.path.join(self.tmp, name), "w") as fh:
+            fh.write(text)
+
+    def run_batch(self, jobs):
+        self.write("jobs.txt", "".join(job + "\n" for job in jobs))
+        out = StringIO()
+        with redirect_stdout(out):
+            code = run_batch(os.path.join(self.tmp, "jobs.txt"), 2)
+        rows = out.getvalue().split("Batch summary:")[1].split("\n")[1:]
+        return (code, [int(row.split()[0]) for row in rows if row])
+
+    def test_all_passed(self):
+        self.assertEqual(self.run_batch(["good.sv same.sv top.sv"] * 2),
+                (0, [0, 0]))
+
+    def test_exit_code_of_every_job(self):
+        (code, codes) = self.run_batch(["good.sv same.sv top.sv",
+                "good.sv bad.sv top.sv",
+                "good.sv missing.sv top.sv",
+                "good.sv broken.sv top.sv"])
+        self.assertEqual(code, sv2v_test.BATCH_FAIL_ERR)
+        self.assertEqual(codes, [0, sv2v_test.NOT_EQUIV_ERR,
+                sv2v_test.NO_FILE_ERR, sv2v_test.VCS_COMP_ERR])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+# test_check_equivalence.py
+# Tests of check_equivalence as a library call, also from several threads
+# sharing one simulation cache.
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+        __file__))))
+
+import fake_vcs
+import sim_cache
+import sv2v_test
+import Verilog_VCD as vcd
+from sim_cache import ArtifactStore
+from sv2v_test import check_equivalence
+
+VCD = """$timescale 1ns $end
+$scope module top $end
+$var wire 1 ! a $end
+$upscope $end
+$enddefinitions $end
+#0
+0!
+#10
+{}!
+"""
+
+class UnusedSeats(object):
+    """Seat pool that fails whatever takes a seat from it."""
+    priority = 0
+
+    def acquire(self, count=1, block=True):
+        raise AssertionError("seat taken from the pool of set_options")
+
+class CheckEquivalenceTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.tmp, "bin"))
+        self.path = fake_vcs.install(os.path.join(self.tmp, "bin"))
+        os.environ["FAKE_SIM_SLEEP"] = "0.3"
+        self.options = sv2v_test.get_options()
+        self.cache = ArtifactStore(os.path.join(self.tmp, "cache"))
+        for (name, value) in (("good", 1), ("same", 1), ("bad", 0)):
+            self.write(name + ".sv", VCD.format(value))
+        self.write("top.sv", "")
+
+    def tearDown(self):
+        os.environ["PATH"] = self.path
+        del os.environ["FAKE_SIM_SLEEP"]
+        sv2v_test.set_options(*self.options)
+        self.cache.release()
+        shutil.rmtree(self.tmp)
+
+    def write(self, name, text):
+        with open(os.path.join(self.tmp, name), "w") as fh:
+            fh.write(text)
+
+    def check(self, name1, name2, **kwargs):
+        return check_equivalence(os.path.join(self.tmp, name1),
+                os.path.join(self.tmp, name2),
+                os.path.join(self.tmp, "top.sv"), "top", cache=self.cache,
+                **kwargs)
+
+    def test_threads_share_cache(self):
+        results = {}
+        def run(name2):
+            results[name2] = self.check("good.sv", name2)
+        out = StringIO()
+        with redirect_stdout(out):
+            threads = [threading.Thread(target=run, args=(name,))
+                       for name in ("same.sv", "bad.sv")]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(60)
+        self.assertEqual(out.getvalue(), "")
+        self.assertTrue(results["same.sv"].equivalent)
+        self.assertFalse(results["bad.sv"].equivalent)
+        self.assertEqual(self.cache.held, {})
+        # same.sv has the contents of good.sv, so they share their entries
+        self.assertEqual(len(os.listdir(self.cache.dir)), 2)
+        self.assertEqual(len(os.listdir(self.cache.sub("simv").dir)), 2)
+
+    def test_options_ignored(self):
+        # Every simulation would time out, be compressed, or fail to take a
+        #   seat, under the options set for the command line
+        sv2v_test.set_options(timeout=0.01, compression="gzip",
+                seat_pool=UnusedSeats())
+        options = sv2v_test.get_options()
+        out = StringIO()
+        with redirect_stdout(out):
+            for parallel in (True, False):
+                self.assertTrue(self.check("good.sv", "same.sv",
+                        parallel=parallel).equivalent)
+        self.assertEqual(out.getvalue(), "")
+        self.assertEqual(sv2v_test.get_options(), options)
+        for name in os.listdir(self.cache.dir):
+            self.assertEqual(vcd.detect(os.path.join(self.cache.dir, name,
+                    sv2v_test.SIM_DUMP)), None)
+
+class SessionTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.grace = sim_cache.EVICT_GRACE
+        sim_cache.EVICT_GRACE = 0
+
+    def tearDown(self):
+        sim_cache.EVICT_GRACE = self.grace
+        shutil.rmtree(self.tmp)
+
+    def test_release_keeps_other_sessions(self):
+        src = os.path.join(self.tmp, "dump.vcd")
+        with open(src, "w") as fh:
+            fh.write("a" * 100)
+        store = ArtifactStore(os.path.join(self.tmp, "cache"), 150)
+        (first, second) = (store.session(), store.session())
+        path = first.put("a", {"dump.vcd": src})
+        self.assertEqual(second.get("a"), path)
+        first.release()
+        # b does not fit next to a, which the second session still holds
+        store.put("b", {"dump.vcd": src})
+        store.release()
+        self.assertTrue(os.path.isdir(path))
+        second.release()
+        store.put("c", {"dump.vcd": src})
+        store.release()
+        self.assertFalse(os.path.isdir(path))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+# test_compact.py
+# Tests of the array-backed storage of parse_vcd(file, compact=1).
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+        __file__))))
+
+import Verilog_VCD as vcd
+from Verilog_VCD import CompactSignal, Net, TVList, ValueTable
+
+VCD = """$timescale 1ns $end
+$scope module top $end
+$var wire 1 ! clk $end
+$var wire 8 " data [7:0] $end
+$var real 64 # level $end
+$var wire 1 ! clk_copy $end
+$upscope $end
+$enddefinitions $end
+#0
+0!
+b0 "
+r0.5 #
+#5
+1!
+b1010 "
+#10
+0!
+bx "
+r1.25 #
+#15
+1!
+b1010 "
+"""
+
+class ValueTableTest(unittest.TestCase):
+    def test_values_interned_once(self):
+        table = ValueTable()
+        self.assertEqual(table.intern("0"), 0)
+        self.assertEqual(table.intern("1"), 1)
+        self.assertEqual(table.intern("0"), 0)
+        self.assertEqual(table.values, ["0", "1"])
+
+class CompactSignalTest(unittest.TestCase):
+    def test_tv_view(self):
+        table = ValueTable()
+        (sig1, sig2) = (CompactSignal(table), CompactSignal(table))
+        for (time, value) in ((0, "0"), (5, "1"), (10, "0")):
+            sig1.append(time, value)
+        sig2.append(3, "1")
+        self.assertEqual(table.values, ["0", "1"])
+        tv = sig1["tv"]
+        self.assertEqual(len(tv), 3)
+        self.assertEqual(tv[1], (5, "1"))
+        self.assertEqual(tv[-1], (10, "0"))
+        self.assertEqual(tv[1:], [(5, "1"), (10, "0")])
+        self.assertEqual(list(tv), [(0, "0"), (5, "1"), (10, "0")])
+        self.assertEqual(sig2["tv"], [(3, "1")])
+        self.assertTrue("tv" in sig1 and "nets" in sig1)
+        self.assertRaises(KeyError, sig1.__getitem__, "size")
+
+    def test_tv_equality(self):
+        table = ValueTable()
+        (sig1, sig2) = (CompactSignal(table), CompactSignal(table))
+        for sig in (sig1, sig2):
+            sig.append(0, "0")
+            sig.append(5, "1")
+        self.assertEqual(sig1["tv"], sig2["tv"])
+        self.assertEqual(sig1["tv"], [(0, "0"), (5, "1")])
+        self.assertNotEqual(sig1["tv"], [(0, "0"), (5, "0")])
+        self.assertNotEqual(sig1["tv"], [(0, "0")])
+        other = TVList([0, 5], [0, 0], ["0"])
+        self.assertNotEqual(sig1["tv"], other)
+
+    def test_net_item_access(self):
+        net = Net("wire", "clk", "1", "top")
+        self.assertEqual(net["hier"], "top")
+        self.assertRaises(KeyError, net.__getitem__, "tv")
+        self.assertEqual(net, {"type": "wire", "name": "clk", "size": "1",
+                "hier": "top"})
+        self.assertEqual(len(set([net, Net("wire", "clk", "1", "top")])), 1)
+
+class CompactParseTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.vcd = os.path.join(self.tmp, "a.vcd")
+        with open(self.vcd, "w") as fh:
+            fh.write(VCD)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_same_as_default_result(self):
+        for siglist in ([], ["top.data[7:0]"]):
+            default = vcd.parse_vcd(self.vcd, siglist=siglist)
+            compact = vcd.parse_vcd(self.vcd, siglist=siglist, compact=1)
+            self.assertEqual(sorted(default), sorted(compact))
+            for code in default:
+                self.assertEqual(compact[code]["nets"], default[code]["nets"])
+                self.assertEqual(compact[code]["tv"], default[code]["tv"])
+
+    def test_columns(self):
+        data = vcd.parse_vcd(self.vcd, compact=1)
+        sig = data["\""]
+        self.assertEqual(list(sig.times), [0, 5, 10, 15])
+        self.assertEqual(sig.times.typecode, "q")
+        self.assertEqual(sig.index.typecode, "I")
+        # Repeated values share one entry of the table of the whole parse
+        self.assertEqual(sig.index[1], sig.index[3])
+        self.assertIs(sig.table, data["!"].table)
+        self.assertEqual([n["name"] for n in data["!"]["nets"]],
+                ["clk", "clk_copy"])
+
+if __name__ == "__main__":
+    unittest.main()
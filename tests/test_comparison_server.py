@@ -0,0 +1,154 @@
+# test_comparison_server.py
+# Tests of the --serve comparison server: concurrent connections, and the
+# jobs and results of sv2v_test's server.
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+        __file__))))
+
+import daemon
+import sv2v_test
+
+VCD = """$timescale 1ns $end
+$scope module top $end
+$var wire 1 ! a $end
+$var wire 1 " b $end
+$upscope $end
+$enddefinitions $end
+#0
+0!
+0"
+#10
+1!
+{}"
+"""
+
+class ServerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.socket = os.path.join(self.tmp, "sv2v.sock")
+        self.servers = []
+
+    def tearDown(self):
+        for (server, thread) in self.servers:
+            server.shutdown()
+            server.server_close()
+            thread.join(10)
+        shutil.rmtree(self.tmp)
+
+    def start(self, run_job):
+        server = daemon.Server(self.socket, run_job)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.servers.append((server, thread))
+        return server
+
+    def test_connections_served_concurrently(self):
+        (started, release) = (threading.Event(), threading.Event())
+        def run_job(job):
+            if (job["wait"]):
+                started.set()
+                release.wait(30)
+            return {"done": job["n"]}
+        self.start(run_job)
+        results = []
+        thread = threading.Thread(target=lambda: results.append(
+                daemon.request(self.socket, {"wait": True, "n": 1})))
+        thread.daemon = True
+        thread.start()
+        self.assertTrue(started.wait(10))
+        # Served while the first job still runs
+        self.assertEqual(daemon.request(self.socket, {"wait": False, "n": 2},
+                timeout=10), {"done": 2})
+        self.assertEqual(results, [])
+        release.set()
+        thread.join(10)
+        self.assertEqual(results, [{"done": 1}])
+
+    def test_error_result(self):
+        def run_job(job):
+            raise KeyError("vcd")
+        self.start(run_job)
+        self.assertEqual(daemon.request(self.socket, {}),
+                {"error": "KeyError: 'vcd'"})
+
+class ServerJobTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.cache = sv2v_test.PARSED_CACHE
+        sv2v_test.PARSED_CACHE = daemon.ParsedCache(1024 ** 2,
+                sv2v_test.parse_for_cache)
+        self.vcds = {}
+        for (name, value) in (("golden", 1), ("same", 1), ("bad", 0)):
+            path = os.path.join(self.tmp, name + ".vcd")
+            with open(path, "w") as fh:
+                fh.write(VCD.format(value))
+            self.vcds[name] = path
+
+    def tearDown(self):
+        sv2v_test.PARSED_CACHE = self.cache
+        shutil.rmtree(self.tmp)
+
+    def run_job(self, name, **options):
+        job = {"vcd": [self.vcds["golden"], self.vcds[name]],
+               "module": "top", "options": options}
+        return sv2v_test.run_server_job(job)
+
+    def test_result_fields(self):
+        result = self.run_job("bad")
+        self.assertEqual(result["code"], 0)
+        self.assertFalse(result["equivalent"])
+        self.assertEqual(result["result"], {"equivalent": False,
+                "signals": ["top.b"], "first_diff_time": 10,
+                "first_diff": [["top.b", "1", "0"]], "only_in1": [],
+                "only_in2": [], "stopped": False})
+        self.assertIn("Inconsistent signals: ['top.b']", result["output"])
+        result = self.run_job("same")
+        self.assertTrue(result["equivalent"])
+        self.assertTrue(result["result"]["equivalent"])
+
+    def test_failed_job(self):
+        job = {"vcd": [self.vcds["golden"],
+                       os.path.join(self.tmp, "missing.vcd")],
+               "module": "top"}
+        result = sv2v_test.run_server_job(job)
+        self.assertEqual(result["code"], sv2v_test.UNKNOWN_ERR)
+        self.assertEqual(result["result"], None)
+        self.assertIn("an unknown error has occurred", result["output"])
+
+    def test_concurrent_jobs_keep_their_options(self):
+        options = sv2v_test.get_options()
+        results = {}
+        def run(name, **job_options):
+            results[name] = self.run_job(name, **job_options)
+        threads = [threading.Thread(target=run, args=("bad",),
+                           kwargs={"verbose": True}),
+                   threading.Thread(target=run, args=("same",),
+                           kwargs={"fail_fast": True})]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30)
+        self.assertEqual(sv2v_test.get_options(), options)
+        # The verbose report goes to the output of its job alone
+        self.assertIn("top.b", results["bad"]["output"])
+        self.assertNotIn("Run tool with '-v'", results["bad"]["output"])
+        self.assertIn("Descriptions are equivalent!",
+                results["same"]["output"])
+        self.assertNotIn("top.b", results["same"]["output"])
+
+    def test_cache_hits_per_job(self):
+        self.assertEqual(self.run_job("same")["cache_hits"], 0)
+        # golden.vcd is parsed on its second use, and kept from then on
+        self.assertEqual(self.run_job("bad")["cache_hits"], 0)
+        self.assertEqual(self.run_job("same")["cache_hits"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+# test_compressed.py
+# Tests of the recognition and transparent decoding of compressed VCD files.
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+        __file__))))
+
+import Verilog_VCD as vcd
+from Verilog_VCD.compressed import FORMATS, compress_file, detect, \
+        open_vcd_file
+
+VCD = """$timescale 1ns $end
+$scope module top $end
+$var wire 1 ! a $end
+$var wire 4 " b [3:0] $end
+$upscope $end
+$enddefinitions $end
+#0
+0!
+b0 "
+#10
+1!
+b1010 "
+"""
+
+class CompressedTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.vcd = os.path.join(self.tmp, "a.vcd")
+        with open(self.vcd, "w") as fh:
+            fh.write(VCD)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def compressed(self, name):
+        """Returns the path of a copy of the VCD file compressed in format
+        name, under a name that does not tell the format."""
+        path = os.path.join(self.tmp, name + ".vcd")
+        compress_file(self.vcd, path, name)
+        return path
+
+    def test_detected_by_magic_bytes(self):
+        self.assertEqual(detect(self.vcd), None)
+        for name in FORMATS:
+            self.assertEqual(detect(self.compressed(name)), name)
+
+    def test_not_detected(self):
+        self.assertEqual(detect(os.path.join(self.tmp, "missing.vcd")), None)
+        self.assertEqual(detect(self.tmp), None)
+        empty = os.path.join(self.tmp, "empty.vcd")
+        open(empty, "w").close()
+        self.assertEqual(detect(empty), None)
+
+    def test_pipe_not_read(self):
+        fifo = os.path.join(self.tmp, "fifo")
+        os.mkfifo(fifo)
+        # opening the FIFO to read it would block without a writer
+        self.assertEqual(detect(fifo), None)
+
+    def test_open_decodes(self):
+        for name in list(FORMATS) + [None]:
+            path = self.vcd if (name == None) else self.compressed(name)
+            with open_vcd_file(path) as fh:
+                self.assertEqual(fh.read(), VCD.encode("latin-1"))
+            with open_vcd_file(path, "r") as fh:
+                self.assertEqual(fh.read(), VCD)
+
+    def test_parsed_like_plain_file(self):
+        plain = vcd.parse_vcd(self.vcd)
+        for name in FORMATS:
+            path = self.compressed(name)
+            self.assertEqual(vcd.parse_vcd(path), plain)
+            self.assertEqual(vcd.list_sigs(path), ["top.a", "top.b[3:0]"])
+
+if __name__ == "__main__":
+    unittest.main()
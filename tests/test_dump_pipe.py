@@ -0,0 +1,120 @@
+# test_dump_pipe.py
+# Tests of the named pipes simulations dump into, and of --pipe checks.
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+        __file__))))
+
+import fake_vcs
+import sv2v_test
+from sv2v_test import DumpPipe, SimTimeoutError, is_pipe, pipe_check
+
+VCD = """$timescale 1ns $end
+$scope module top $end
+$var wire 1 ! a $end
+$upscope $end
+$enddefinitions $end
+#0
+0!
+#10
+{}!
+"""
+
+class DumpPipeTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "dump.vcd")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_is_pipe(self):
+        self.assertFalse(is_pipe(self.path))
+        pipe = DumpPipe(self.path)
+        self.assertTrue(is_pipe(self.path))
+        pipe.release()
+        open(os.path.join(self.tmp, "file"), "w").close()
+        self.assertFalse(is_pipe(os.path.join(self.tmp, "file")))
+
+    def test_end_of_file_only_after_release(self):
+        pipe = DumpPipe(self.path)
+        # opening the read end does not wait for the simulation
+        with open(self.path) as reader:
+            with open(self.path, "w") as writer:
+                writer.write("#0\n")
+            self.assertEqual(reader.readline(), "#0\n")
+            # the simulation has closed its write end, the pipe has not
+            done = threading.Event()
+            def read_rest():
+                reader.read()
+                done.set()
+            thread = threading.Thread(target=read_rest)
+            thread.daemon = True
+            thread.start()
+            self.assertFalse(done.wait(0.3))
+            pipe.release()
+            self.assertTrue(done.wait(5))
+
+    def test_release_twice(self):
+        pipe = DumpPipe(self.path)
+        pipe.release()
+        pipe.release()
+        self.assertEqual(pipe.hold_fd, None)
+
+class PipeCheckTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.tmp, "bin"))
+        self.path = fake_vcs.install(os.path.join(self.tmp, "bin"))
+        self.options = sv2v_test.get_options()
+        for (name, value) in (("good", 1), ("same", 1), ("bad", 0)):
+            self.write(name + ".sv", VCD.format(value))
+        self.write("top.sv", "")
+
+    def tearDown(self):
+        os.environ["PATH"] = self.path
+        os.environ.pop("FAKE_SIM_SLEEP", None)
+        sv2v_test.set_options(*self.options)
+        shutil.rmtree(self.tmp)
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp, name)
+        with open(path, "w") as fh:
+            fh.write(text)
+        return path
+
+    def check(self, name1, name2, timeout=30):
+        work_dir = tempfile.mkdtemp(dir=self.tmp)
+        with redirect_stdout(StringIO()):
+            return pipe_check(os.path.join(self.tmp, name1),
+                    os.path.join(self.tmp, name2),
+                    os.path.join(self.tmp, "top.sv"), "top", timeout=timeout,
+                    work_dir=work_dir)
+
+    def test_equivalent(self):
+        (is_equiv, out_str) = self.check("good.sv", "same.sv")
+        self.assertTrue(is_equiv)
+
+    def test_not_equivalent(self):
+        (is_equiv, out_str) = self.check("good.sv", "bad.sv")
+        self.assertFalse(is_equiv)
+        self.assertIn("top.a", out_str)
+
+    def test_timeout(self):
+        os.environ["FAKE_SIM_SLEEP"] = "30"
+        start = time.monotonic()
+        self.assertRaises(SimTimeoutError, self.check, "good.sv", "same.sv",
+                0.5)
+        self.assertTrue(time.monotonic() - start < 20)
+
+if __name__ == "__main__":
+    unittest.main()
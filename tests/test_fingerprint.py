@@ -0,0 +1,128 @@
+# test_fingerprint.py
+# Tests of per-signal trace fingerprints and of their sidecar file.
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+        __file__))))
+
+import Verilog_VCD as vcd
+from Verilog_VCD import fingerprint
+from Verilog_VCD.fingerprint import FingerprintHasher, Fingerprints
+
+VCD = """$timescale 1ns $end
+$scope module top $end
+$var wire 1 ! clk $end
+$var wire 4 " count [3:0] $end
+$scope module sub $end
+$var wire 1 # flag $end
+$var wire 1 ! clk $end
+$upscope $end
+$upscope $end
+$enddefinitions $end
+#0
+0!
+b0 "
+0#
+{}
+"""
+
+def changes(steps, flag=1):
+    """Returns the value changes after time 0, with a flag value of flag
+    at the last step."""
+    lines = []
+    for step in range(1, steps + 1):
+        lines.append("#{}\n{}!\nb{:b} \"".format(step * 5, step % 2,
+                step % 16))
+    lines.append("{}#".format(flag))
+    return "\n".join(lines)
+
+class FingerprintsTest(unittest.TestCase):
+    def test_diff(self):
+        a = Fingerprints({"top.a": "1", "top.b": "2", "top.c": "3"})
+        b = Fingerprints({"top.a": "1", "top.b": "4", "top.d": "5"})
+        self.assertEqual(a.diff(b), ["top.b", "top.c", "top.d"])
+        self.assertEqual(b.diff(a), ["top.b", "top.c", "top.d"])
+        self.assertEqual(a.diff(Fingerprints(dict(a.signals))), [])
+
+    def test_digest(self):
+        a = Fingerprints({"top.a": "1", "top.b": "2"})
+        self.assertEqual(a.digest,
+                Fingerprints({"top.b": "2", "top.a": "1"}).digest)
+        self.assertNotEqual(a.digest,
+                Fingerprints({"top.a": "2", "top.b": "1"}).digest)
+        self.assertNotEqual(a.digest, Fingerprints({"top.a": "1"}).digest)
+
+class FingerprintVcdTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.block_size = fingerprint.BLOCK_SIZE
+        # several blocks per signal
+        fingerprint.BLOCK_SIZE = 16
+
+    def tearDown(self):
+        fingerprint.BLOCK_SIZE = self.block_size
+        shutil.rmtree(self.tmp)
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp, name)
+        with open(path, "w") as fh:
+            fh.write(text)
+        return path
+
+    def hashed_from_stream(self, path, scope=None):
+        """Returns the fingerprints of a FingerprintHasher fed by a stream
+        of every change of a file."""
+        with vcd.VCDStream(path, scope=scope) as stream:
+            hasher = FingerprintHasher(stream.data)
+            for (time, block) in stream.changes():
+                hasher.add(time, block)
+            return hasher.finish(stream.endtime)
+
+    def test_differing_signals(self):
+        a = vcd.fingerprint_vcd(self.write("a.vcd", VCD.format(changes(50))))
+        b = vcd.fingerprint_vcd(self.write("b.vcd",
+                VCD.format(changes(50, 0))))
+        self.assertEqual(sorted(a.signals), ["top.clk", "top.count[3:0]",
+                "top.sub.clk", "top.sub.flag"])
+        self.assertEqual(a.signals["top.clk"], a.signals["top.sub.clk"])
+        self.assertEqual(a.diff(b), ["top.sub.flag"])
+        self.assertNotEqual(a.digest, b.digest)
+        self.assertEqual(a.endtime, 250)
+
+    def test_same_as_hasher(self):
+        path = self.write("a.vcd", VCD.format(changes(50)))
+        for scope in (None, vcd.scope_exact("top")):
+            expected = vcd.fingerprint_vcd(path, scope)
+            hashed = self.hashed_from_stream(path, scope)
+            self.assertEqual(hashed.signals, expected.signals)
+            self.assertEqual(hashed.digest, expected.digest)
+            self.assertEqual(hashed.endtime, expected.endtime)
+
+    def test_scope(self):
+        path = self.write("a.vcd", VCD.format(changes(5)))
+        fingerprints = vcd.fingerprint_vcd(path, vcd.scope_exact("top"))
+        self.assertEqual(sorted(fingerprints.signals), ["top.clk",
+                "top.count[3:0]"])
+
+    def test_sidecar(self):
+        path = self.write("a.vcd", VCD.format(changes(5)))
+        top = vcd.load_fingerprints(path, "top")
+        self.assertTrue(os.path.exists(path + ".fp"))
+        whole = vcd.load_fingerprints(path)
+        self.assertEqual(vcd.stored_fingerprints(path, "top").signals,
+                top.signals)
+        self.assertEqual(vcd.stored_fingerprints(path).digest, whole.digest)
+        # a changed file has none stored
+        self.write("a.vcd", VCD.format(changes(6)))
+        os.utime(path, (1, 1))
+        self.assertEqual(vcd.stored_fingerprints(path, "top"), None)
+        self.assertNotEqual(vcd.load_fingerprints(path, "top").digest,
+                top.digest)
+
+if __name__ == "__main__":
+    unittest.main()
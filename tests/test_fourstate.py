@@ -0,0 +1,64 @@
+# test_fourstate.py
+# Tests of the packed 4-state values of Verilog_VCD.fourstate.
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+        __file__))))
+
+from Verilog_VCD import pack, unpack, value_size
+
+class PackTest(unittest.TestCase):
+    def test_binary_values_pack_to_their_value(self):
+        self.assertEqual(pack("0", 1), 0)
+        self.assertEqual(pack("1", 1), 1)
+        self.assertEqual(pack("1010", 4), 10)
+
+    def test_binary_values_extend_with_zeros(self):
+        self.assertEqual(pack("1", 4), pack("0001", 4))
+        self.assertEqual(pack("10", 8), pack("00000010", 8))
+        self.assertEqual(unpack(pack("1", 4), 4), "0001")
+
+    def test_x_and_z_extend_with_themselves(self):
+        self.assertEqual(pack("x", 4), pack("xxxx", 4))
+        self.assertEqual(pack("z", 4), pack("zzzz", 4))
+        self.assertEqual(pack("x0", 4), pack("xxx0", 4))
+        self.assertEqual(pack("z1", 4), pack("zzz1", 4))
+        self.assertEqual(unpack(pack("x0", 4), 4), "xxx0")
+        self.assertEqual(unpack(pack("z1", 4), 4), "zzz1")
+
+    def test_states_differ(self):
+        packed = set(pack(value, 1) for value in ("0", "1", "x", "z"))
+        self.assertEqual(len(packed), 4)
+        self.assertNotEqual(pack("x", 4), pack("0001", 4))
+        self.assertNotEqual(pack("z", 4), pack("x", 4))
+
+    def test_case_does_not_matter(self):
+        self.assertEqual(pack("X1", 4), pack("x1", 4))
+        self.assertEqual(pack("Z1", 4), pack("z1", 4))
+
+    def test_wider_values_only_match_themselves(self):
+        self.assertEqual(pack("10001", 4), "10001")
+        self.assertNotEqual(pack("10001", 4), pack("0001", 4))
+        self.assertEqual(unpack(pack("10001", 4), 4), "10001")
+
+    def test_invalid_digits_are_not_packed(self):
+        for value in ("1_0", " 1", "1 ", "12", "0b1", "-1", "u", ""):
+            self.assertEqual(pack(value, 4), value)
+        self.assertNotEqual(pack("1_0", 4), pack("10", 4))
+        self.assertNotEqual(pack(" 1", 4), pack("1", 4))
+
+    def test_round_trip(self):
+        for value in ("0000", "1111", "x01z", "zzzz", "1x0z"):
+            self.assertEqual(unpack(pack(value, 4), 4), value)
+
+class ValueSizeTest(unittest.TestCase):
+    def test_sizes(self):
+        self.assertEqual(value_size({"type": "wire", "size": "8"}), 8)
+        self.assertEqual(value_size({"type": "wire", "size": "?"}), 1)
+        self.assertEqual(value_size({"type": "real", "size": "64"}), None)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+# test_mismatch_summary.py
+# Tests of the reservoir sampling and ranking of --summary.
+
+import os
+import sys
+import unittest
+from io import StringIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+        __file__))))
+
+from sv2v_test import MismatchSummary
+
+def summarize(mismatches, samples, seed=0):
+    """Feeds (time, signal) mismatches to a MismatchSummary.
+
+    Args:
+        mismatches ([(int, str)]):  mismatches, in time order
+        samples (int):  size of the reservoir of each signal
+        seed (int):     seed of the sampling
+
+    Returns:
+        (MismatchSummary):  the summary, not yet closed
+    """
+    summary = MismatchSummary(StringIO(), "a.sv", "b.sv", samples, seed)
+    for (time, sig_name) in mismatches:
+        summary.add(time, sig_name, ["0"], ["1"])
+    return summary
+
+class ReservoirTest(unittest.TestCase):
+    def test_size(self):
+        for count in (1, 4, 5, 6, 100, 1000):
+            summary = summarize([(t, "top.a") for t in range(count)], 5)
+            self.assertEqual(summary.counts["top.a"], count)
+            self.assertEqual(len(summary.reservoirs["top.a"]), min(count, 5))
+
+    def test_samples_are_distinct_mismatches(self):
+        summary = summarize([(t, "top.a") for t in range(1000)], 10)
+        times = [sample[0] for sample in summary.reservoirs["top.a"]]
+        self.assertEqual(len(set(times)), 10)
+        self.assertTrue(all(0 <= t < 1000 for t in times))
+
+    def test_first_mismatch_kept(self):
+        summary = summarize([(t, "top.a") for t in range(10, 1010)], 3)
+        self.assertEqual(summary.first["top.a"][0], 10)
+        summary.close()
+        rows = summary.out.getvalue().split("=====\n")[-1].split("\n")
+        # The samples are listed by time, starting with the first mismatch
+        self.assertEqual(rows[1].split()[0], "10")
+        self.assertEqual(len([row for row in rows[1:] if row]), 3)
+
+    def test_uniform_over_trace(self):
+        # Each of n mismatches is sampled with probability samples / n
+        (n, samples, runs) = (40, 4, 2000)
+        hits = [0] * n
+        for seed in range(runs):
+            summary = summarize([(t, "top.a") for t in range(n)], samples,
+                    seed)
+            for sample in summary.reservoirs["top.a"]:
+                hits[sample[0]] += 1
+        expected = runs * samples / n
+        for count in hits:
+            self.assertTrue(0.6 * expected < count < 1.4 * expected,
+                    (count, expected))
+        # Late mismatches are as likely as early ones
+        self.assertTrue(0.8 < sum(hits[n // 2:]) / sum(hits[:n // 2]) < 1.25)
+
+    def test_reproducible(self):
+        mismatches = [(t, "top.a") for t in range(500)]
+        self.assertEqual(summarize(mismatches, 5, 7).reservoirs,
+                summarize(mismatches, 5, 7).reservoirs)
+
+    def test_no_samples(self):
+        summary = summarize([(t, "top.a") for t in range(100)], 0)
+        self.assertEqual(summary.reservoirs["top.a"], [])
+        summary.close()
+        self.assertNotIn("sampled", summary.out.getvalue())
+
+class RankingTest(unittest.TestCase):
+    def test_ranked_by_first_mismatch(self):
+        summary = summarize([(5, "top.b"), (7, "top.a"), (9, "top.b"),
+                (12, "top.c")], 2)
+        self.assertEqual(summary.ranking(),
+                [(5, "top.b", 2), (7, "top.a", 1), (12, "top.c", 1)])
+
+if __name__ == "__main__":
+    unittest.main()
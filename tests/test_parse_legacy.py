@@ -0,0 +1,128 @@
+# test_parse_legacy.py
+# Tests that parse_vcd reads value changes as the original parser does, on
+# every path of the value change scan and on irregularly written files.
+
+import functools
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+        __file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))), "bench"))
+
+import legacy_vcd
+import Verilog_VCD as vcd
+
+# single-byte codes, and two-byte codes ending with some of them
+CODES = [chr(33 + n) for n in range(30)] + \
+        ["{}{}".format(chr(65 + n), chr(33 + n)) for n in range(10)]
+
+def make_vcd(steps=300, seed=1):
+    """Returns the lines of a VCD file with scalar and vector signals
+    changing at random.
+
+    Args:
+        steps (int):  number of time stamps
+        seed (int):  seed of the random changes
+
+    Returns:
+        (list):  lines of the file, without line ends
+    """
+    rand = random.Random(seed)
+    lines = ["$timescale 1ns $end", "$scope module top $end"]
+    for (n, code) in enumerate(CODES):
+        if (n % 3 == 0):
+            lines.append("$var wire 8 {} v{} [7:0] $end".format(code, n))
+        else:
+            lines.append("$var wire 1 {} s{} $end".format(code, n))
+    lines += ["$upscope $end", "$enddefinitions $end", "$dumpvars"]
+    for (n, code) in enumerate(CODES):
+        lines.append("bx {}".format(code) if (n % 3 == 0) else "x" + code)
+    lines.append("$end")
+    for step in range(steps):
+        lines.append("#{}".format(step * 10))
+        for n in rand.sample(range(len(CODES)), rand.randint(1, 6)):
+            if (n % 3 == 0):
+                value = "".join(rand.choice("01xz") for k in range(8))
+                lines.append("b{} {}".format(value.lstrip("0") or "0",
+                        CODES[n]))
+            else:
+                lines.append(rand.choice("01xXzZ") + CODES[n])
+    return lines
+
+def signal_name(n):
+    """Returns the full name of the signal declared for CODES[n]."""
+    if (n % 3 == 0):
+        return "top.v{}[7:0]".format(n)
+    return "top.s{}".format(n)
+
+class ParseLegacyTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.settings = dict((name, getattr(vcd, name)) for name in
+                ("_chunks", "ANCHOR_SPACING", "FIND_SPARSE"))
+
+    def tearDown(self):
+        for (name, value) in self.settings.items():
+            setattr(vcd, name, value)
+        shutil.rmtree(self.tmp)
+
+    def write(self, lines, newline="\n"):
+        path = os.path.join(self.tmp, "dump.vcd")
+        with open(path, "w", newline="") as fh:
+            fh.write("".join(line + newline for line in lines))
+        return path
+
+    def assertSameParse(self, path):
+        """Asserts that parse_vcd and the legacy parser agree on a file,
+        for all signals and for selections of every size."""
+        for count in (0, 1, 3, 8, 20, len(CODES)):
+            # the first signals have the codes that others end with
+            for siglist in ([signal_name(n) for n in range(count)],
+                    [signal_name(n) for n in range(len(CODES) - count,
+                    len(CODES))]):
+                self.assertEqual(vcd.parse_vcd(path, siglist=siglist),
+                        legacy_vcd.parse_vcd(path, siglist=siglist),
+                        "{} signals".format(count))
+
+    def test_regular(self):
+        self.assertSameParse(self.write(make_vcd()))
+
+    def test_carriage_returns(self):
+        self.assertSameParse(self.write(make_vcd(), "\r\n"))
+
+    def test_indented_and_trailing_spaces(self):
+        lines = make_vcd()
+        lines = [("  " + line) if (n % 7 == 0) else line
+                 for (n, line) in enumerate(lines)]
+        lines = [(line + " \t") if (n % 5 == 0) else line
+                 for (n, line) in enumerate(lines)]
+        self.assertSameParse(self.write(lines))
+
+    def test_tabs_between_value_and_code(self):
+        lines = [line.replace(" ", "\t", 1) if line.startswith("b") else line
+                 for line in make_vcd()]
+        self.assertSameParse(self.write(lines))
+
+    def test_block_boundaries(self):
+        vcd._chunks = functools.partial(self.settings["_chunks"],
+                chunk_size=97)
+        self.assertSameParse(self.write(make_vcd()))
+        self.assertSameParse(self.write(make_vcd(), "\r\n"))
+
+    def test_every_search_mode(self):
+        path = self.write(make_vcd(seed=2))
+        # search every selection, through one of its bytes, then for all
+        #   of it
+        vcd.FIND_SPARSE = 0
+        for spacing in (0, 1 << 30):
+            vcd.ANCHOR_SPACING = spacing
+            self.assertSameParse(path)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+# test_parse_parallel.py
+# Tests of the split of the value change section into byte ranges, and of
+# their parse in a pool of processes.
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+        __file__))))
+
+import Verilog_VCD as vcd
+
+HEADER = """$timescale 1ns $end
+$scope module top $end
+$var wire 1 ! clk $end
+$var wire 8 " count [7:0] $end
+$var wire 1 # rare $end
+$upscope $end
+$enddefinitions $end
+"""
+
+def make_vcd(steps):
+    """Returns a VCD file whose values change at every one of steps time
+    stamps, and some only every 97 of them."""
+    lines = [HEADER]
+    for step in range(steps):
+        lines.append("#{}\n{}!\nb{:b} \"\n".format(step * 5, step % 2,
+                step % 256))
+        if (step % 97 == 0):
+            lines.append("{}#\n".format("xz"[step % 2]))
+    return "".join(lines)
+
+class SplitRangesTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.vcd = os.path.join(self.tmp, "a.vcd")
+        with open(self.vcd, "w") as fh:
+            fh.write(make_vcd(2000))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def split(self, jobs, min_size=None):
+        """Returns the ranges of the value change section of the file, and
+        where the section starts."""
+        with open(self.vcd, "rb") as fh:
+            fh.seek(len(HEADER))
+            return (vcd._split_ranges(fh, jobs, min_size), fh.tell())
+
+    def test_ranges_start_at_time_stamps(self):
+        (ranges, start) = self.split(4, 1000)
+        self.assertEqual(len(ranges), 4)
+        self.assertEqual(ranges[0][0], start)
+        self.assertEqual(ranges[-1][1], os.path.getsize(self.vcd))
+        with open(self.vcd, "rb") as fh:
+            data = fh.read()
+        for (n, (begin, end)) in enumerate(ranges):
+            if (n > 0):
+                self.assertEqual(begin, ranges[n - 1][1])
+                self.assertEqual(data[begin - 1:begin + 1], b"\n#")
+
+    def test_at_least_min_size(self):
+        size = os.path.getsize(self.vcd) - len(HEADER)
+        self.assertEqual(len(self.split(8, size // 3)[0]), 3)
+        self.assertEqual(len(self.split(8, size * 2)[0]), 1)
+
+    def test_default_min_size_read_at_call_time(self):
+        chunk_size = vcd.CHUNK_SIZE
+        try:
+            self.assertEqual(len(self.split(4)[0]), 1)
+            vcd.CHUNK_SIZE = 1000
+            self.assertEqual(len(self.split(4)[0]), 4)
+        finally:
+            vcd.CHUNK_SIZE = chunk_size
+
+    def test_unmappable_input(self):
+        (read_fd, write_fd) = os.pipe()
+        os.close(write_fd)
+        with os.fdopen(read_fd, "rb") as fh:
+            self.assertEqual(vcd._split_ranges(fh, 4, 1000), None)
+
+class ParseParallelTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.vcd = os.path.join(self.tmp, "a.vcd")
+        with open(self.vcd, "w") as fh:
+            fh.write(make_vcd(2000))
+        self.chunk_size = vcd.CHUNK_SIZE
+        vcd.CHUNK_SIZE = 1000
+
+    def tearDown(self):
+        vcd.CHUNK_SIZE = self.chunk_size
+        shutil.rmtree(self.tmp)
+
+    def test_same_as_serial_parse(self):
+        calls = []
+        parse_parallel = vcd._parse_parallel
+        def record(file, ranges, *args):
+            calls.append(len(ranges))
+            return parse_parallel(file, ranges, *args)
+        vcd._parse_parallel = record
+        try:
+            self.check_same_as_serial_parse()
+        finally:
+            vcd._parse_parallel = parse_parallel
+        self.assertEqual(calls, [3] * 6)
+
+    def check_same_as_serial_parse(self):
+        for siglist in ([], ["top.rare"], ["top.clk", "top.count[7:0]"]):
+            serial = vcd.parse_vcd(self.vcd, siglist=siglist)
+            self.assertEqual(vcd.parse_vcd(self.vcd, siglist=siglist,
+                    jobs=3), serial)
+            compact = vcd.parse_vcd(self.vcd, siglist=siglist, compact=1,
+                    jobs=3)
+            self.assertEqual(sorted(compact), sorted(serial))
+            for code in serial:
+                self.assertEqual(compact[code]["tv"], serial[code]["tv"])
+
+    def test_end_time(self):
+        vcd.parse_vcd(self.vcd, jobs=3)
+        self.assertEqual(vcd.get_endtime(), 1999 * 5)
+
+if __name__ == "__main__":
+    unittest.main()
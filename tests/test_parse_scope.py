@@ -0,0 +1,112 @@
+# test_parse_scope.py
+# Tests of the scope filter of parse_vcd and of the times it reads.
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+        __file__))))
+
+import Verilog_VCD as vcd
+
+VCD = """{}$scope module top $end
+$var wire 1 ! a $end
+$scope module sub $end
+$var wire 1 " b $end
+$var wire 1 ! a_in $end
+$scope module leaf $end
+$var wire 1 # c $end
+$upscope $end
+$upscope $end
+$upscope $end
+$enddefinitions $end
+#0
+0!
+0"
+0#
+#5
+1!
+#12
+1"
+1#
+#20
+0!
+"""
+
+def net_names(data):
+    """Returns the sorted full names of the nets of a parsed VCD file."""
+    return sorted(n["hier"] + "." + n["name"]
+                  for code in data for n in data[code]["nets"])
+
+class ParseScopeTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.vcd = os.path.join(self.tmp, "a.vcd")
+        self.write("$timescale 10ns $end\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def write(self, header):
+        with open(self.vcd, "w") as fh:
+            fh.write(VCD.format(header))
+
+    def stream_times(self, scope=None):
+        """Returns {code: [(time, value)]} as read by a VCDStream."""
+        tv = dict()
+        with vcd.VCDStream(self.vcd, scope=scope) as stream:
+            for (time, changes) in stream.changes():
+                for (code, value) in changes:
+                    tv.setdefault(code, []).append((time, value))
+        return tv
+
+    def test_exact_scope(self):
+        data = vcd.parse_vcd(self.vcd, scope=vcd.scope_exact("top"))
+        self.assertEqual(net_names(data), ["top.a"])
+        self.assertEqual(list(data), ["!"])
+
+    def test_prefix_scope(self):
+        data = vcd.parse_vcd(self.vcd, scope=vcd.scope_prefix("top.sub"))
+        self.assertEqual(net_names(data),
+                ["top.sub.a_in", "top.sub.b", "top.sub.leaf.c"])
+
+    def test_depth_scope(self):
+        data = vcd.parse_vcd(self.vcd, scope=vcd.scope_depth(2))
+        self.assertEqual(net_names(data),
+                ["top.a", "top.sub.a_in", "top.sub.b"])
+
+    def test_same_as_filtering_afterwards(self):
+        scope = vcd.scope_prefix("top.sub")
+        for compact in (0, 1):
+            scoped = vcd.parse_vcd(self.vcd, scope=scope, compact=compact)
+            filtered = vcd.filter_scope(vcd.parse_vcd(self.vcd,
+                    compact=compact), scope)
+            self.assertEqual(sorted(scoped), sorted(filtered))
+            for code in scoped:
+                self.assertEqual(list(scoped[code]["tv"]),
+                        list(filtered[code]["tv"]))
+
+    def test_times_scaled_by_timescale(self):
+        data = vcd.parse_vcd(self.vcd, opt_timescale="ns")
+        self.assertEqual(data["!"]["tv"], [(0, "0"), (50, "1"), (200, "0")])
+        data = vcd.parse_vcd(self.vcd)
+        self.assertEqual(data["!"]["tv"], [(0, "0"), (5, "1"), (20, "0")])
+
+    def test_times_as_written_without_timescale(self):
+        self.write("")
+        data = vcd.parse_vcd(self.vcd)
+        self.assertEqual(data["!"]["tv"], [(0, "0"), (5, "1"), (20, "0")])
+        self.assertEqual(data["#"]["tv"], [(0, "0"), (12, "1")])
+
+    def test_parse_and_stream_agree(self):
+        for header in ("", "$timescale 1ps $end\n", "$timescale 10ns $end\n"):
+            self.write(header)
+            data = vcd.parse_vcd(self.vcd)
+            self.assertEqual(self.stream_times(),
+                    dict((code, data[code]["tv"]) for code in data), header)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+# test_parsed_cache.py
+# Tests of the admission and eviction of the --serve server's ParsedCache.
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+        __file__))))
+
+from daemon import ParsedCache
+
+class Parsed(object):
+    """Stand-in for a Recording, as large in memory as its file on disk."""
+    def __init__(self, path):
+        self.path = path
+        self.size = os.path.getsize(path)
+
+    def nbytes(self):
+        return self.size
+
+class ParsedCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.parsed = []
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def parse(self, path, scope_name):
+        self.parsed.append(path)
+        return Parsed(path)
+
+    def write(self, name, size):
+        path = os.path.join(self.tmp, name)
+        with open(path, "w") as fh:
+            fh.write("0" * size)
+        return path
+
+    def test_kept_from_second_use(self):
+        cache = ParsedCache(1000, self.parse)
+        golden = self.write("golden.vcd", 100)
+        self.assertEqual(cache.get(golden, "top"), None)
+        self.assertEqual(self.parsed, [])
+        self.assertEqual(cache.get(golden, "top").path, golden)
+        self.assertEqual(cache.get(golden, "top").path, golden)
+        self.assertEqual(self.parsed, [golden])
+        self.assertEqual(cache.hits, 1)
+
+    def test_one_off_files_keep_goldens(self):
+        cache = ParsedCache(250, self.parse)
+        golden = self.write("golden.vcd", 100)
+        cache.get(golden, "top")
+        cache.get(golden, "top")
+        for n in range(5):
+            candidate = self.write("new{}.vcd".format(n), 100)
+            self.assertEqual(cache.get(candidate, "top"), None)
+            self.assertNotEqual(cache.get(golden, "top"), None)
+        self.assertEqual(self.parsed, [golden])
+
+    def test_files_over_budget_are_never_parsed(self):
+        cache = ParsedCache(1000, self.parse)
+        big = self.write("big.vcd", 600)
+        for n in range(3):
+            self.assertEqual(cache.get(big, "top"), None)
+        self.assertEqual(self.parsed, [])
+
+    def test_estimate_learns_from_parsed_files(self):
+        cache = ParsedCache(1000, self.parse)
+        small = self.write("small.vcd", 100)
+        cache.get(small, "top")
+        cache.get(small, "top")
+        # Parsed files are as large as on disk, so 600 bytes now fit
+        big = self.write("big.vcd", 600)
+        cache.get(big, "top")
+        self.assertNotEqual(cache.get(big, "top"), None)
+        self.assertEqual(self.parsed, [small, big])
+
+    def test_least_recently_used_dropped(self):
+        cache = ParsedCache(250, self.parse)
+        paths = [self.write("g{}.vcd".format(n), 100) for n in range(3)]
+        for path in paths:
+            cache.get(path, "top")
+            cache.get(path, "top")
+        self.assertEqual(cache.bytes, 200)
+        self.assertEqual(cache.get(paths[0], "top"), None)
+
+    def test_changed_file_counts_as_new(self):
+        cache = ParsedCache(1000, self.parse)
+        golden = self.write("golden.vcd", 100)
+        cache.get(golden, "top")
+        cache.get(golden, "top")
+        self.write("golden.vcd", 120)
+        self.assertEqual(cache.get(golden, "top"), None)
+        self.assertEqual(cache.get(golden, "top").size, 120)
+
+if __name__ == "__main__":
+    unittest.main()
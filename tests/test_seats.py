@@ -0,0 +1,71 @@
+# test_seats.py
+# Tests of the VCS license seats shared between runs.
+
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+        __file__))))
+
+from seats import SeatPool, license_failure
+
+class LicenseFailureTest(unittest.TestCase):
+    def test_checkout_errors(self):
+        for output in ("Error-[LICENSE] Failed to obtain VCS license\n",
+                "FLEXlm error: -4,132\n",
+                "FlexNet Licensing error:-15,570\n",
+                "Error: Failed to check out license for feature VCSRuntime "
+                "(SCL-6)\n"):
+            self.assertTrue(license_failure(1, output), output)
+            self.assertTrue(license_failure(1, output, pooled=True), output)
+
+    def test_plain_messages_need_a_pool(self):
+        for output in ("Unable to checkout license\n",
+                "Error: Failed to check out license\n",
+                "Licensed number of users already reached.\n"):
+            self.assertFalse(license_failure(1, output), output)
+            self.assertTrue(license_failure(1, output, pooled=True), output)
+
+    def test_other_mentions_do_not_count(self):
+        for output in ("Error: /proj/license_check/tb.sv:10: $fatal\n",
+                "license plate 42 rejected\n",
+                "Error-[SE] Syntax error in licence.sv\n",
+                "tb: checking license bits... Unable to checkout license\n"):
+            self.assertFalse(license_failure(1, output, pooled=True), output)
+
+    def test_successful_runs(self):
+        self.assertFalse(license_failure(0, "FLEXlm error: -4,132\n"))
+
+class SeatPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.dir = os.path.join(self.tmp, "seats")
+        self.umask = os.umask(0o077)
+
+    def tearDown(self):
+        os.umask(self.umask)
+        shutil.rmtree(self.tmp)
+
+    def test_seats_taken_and_given_back(self):
+        pool = SeatPool(2, self.dir, poll=0.01)
+        held = pool.acquire(2)
+        self.assertEqual(len(held.fds), 2)
+        self.assertEqual(pool.acquire(1, block=False), None)
+        held.release()
+        with pool.acquire(1) as held:
+            self.assertEqual(len(held.fds), 1)
+        self.assertEqual(os.listdir(pool.queue_dir), [])
+
+    def test_shareable_whatever_the_umask(self):
+        SeatPool(1, self.dir).acquire().release()
+        for path in (self.dir, os.path.join(self.dir, "queue")):
+            self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o2775)
+        seat = os.path.join(self.dir, "seat.0")
+        self.assertEqual(stat.S_IMODE(os.stat(seat).st_mode), 0o664)
+
+if __name__ == "__main__":
+    unittest.main()
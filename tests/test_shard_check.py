@@ -0,0 +1,103 @@
+# test_shard_check.py
+# Tests of the shard by shard comparison of --shard runs.
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+        __file__))))
+
+import sv2v_test
+from sv2v_test import shard_check
+
+VCD = """$timescale 1ns $end
+$scope module top $end
+$var wire 1 ! a $end
+$upscope $end
+$enddefinitions $end
+#0
+0!
+#10
+{}!
+"""
+
+SHARDS = [["+seed=1"], ["+seed=2"], []]
+
+class ShardCheckTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.options = sv2v_test.get_options()
+
+    def tearDown(self):
+        sv2v_test.set_options(*self.options)
+        shutil.rmtree(self.tmp)
+
+    def shard_vcds(self, values):
+        """Writes a VCD file pair per shard, the second of which ends with
+        the given value of signal a, and returns their paths."""
+        pairs = []
+        for (n, value) in enumerate(values):
+            pair = []
+            for (side, last) in ((1, 1), (2, value)):
+                path = os.path.join(self.tmp, "{}_{}.vcd".format(side, n))
+                with open(path, "w") as fh:
+                    fh.write(VCD.format(last))
+                pair.append(path)
+            pairs.append(tuple(pair))
+        return pairs
+
+    def check(self, values, parallel=True, **options):
+        sv2v_test.set_options(shards=SHARDS, sim_jobs=2, **options)
+        out = StringIO()
+        with redirect_stdout(out):
+            (is_equiv, out_str) = shard_check(self.shard_vcds(values), "top",
+                    "a.sv", "b.v", parallel)
+        return (is_equiv, out_str, out.getvalue())
+
+    def test_all_equivalent(self):
+        for parallel in (True, False):
+            (is_equiv, out_str, output) = self.check([1, 1, 1], parallel)
+            self.assertTrue(is_equiv)
+            self.assertEqual(out_str, "")
+            self.assertEqual(output.count(": equivalent"), 3)
+
+    def test_failed_shards_listed(self):
+        for parallel in (True, False):
+            (is_equiv, out_str, output) = self.check([1, 0, 0], parallel)
+            self.assertFalse(is_equiv)
+            self.assertIn("===== shard 2 (+seed=2) =====", out_str)
+            self.assertIn("===== shard 3 (no plusargs) =====", out_str)
+            self.assertIn("Not equivalent in 2 of 3 shards: 2, 3", out_str)
+            # results are printed in shard order, whatever order they
+            #   finish in
+            self.assertTrue(output.index("shard 1 ") <
+                    output.index("shard 2 ") < output.index("shard 3 "))
+
+    def test_fail_fast(self):
+        for parallel in (True, False):
+            (is_equiv, out_str, output) = self.check([0, 0, 1], parallel,
+                    fail_fast=True)
+            self.assertFalse(is_equiv)
+            self.assertIn("Not equivalent in 1 of 3 shards: 1", out_str)
+            self.assertIn("later shards were not compared", out_str)
+            self.assertNotIn("shard 2 ", output)
+
+    def test_report_per_shard(self):
+        report = os.path.join(self.tmp, "report.txt")
+        (is_equiv, out_str, output) = self.check([0, 1, 0], verbose=True,
+                report_path=report)
+        self.assertFalse(is_equiv)
+        self.assertEqual(sorted(name for name in os.listdir(self.tmp)
+                if name.startswith("report")),
+                ["report.shard1.txt", "report.shard2.txt",
+                 "report.shard3.txt"])
+        with open(os.path.join(self.tmp, "report.shard1.txt")) as fh:
+            self.assertIn("top.a", fh.read())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+# test_sim_cache.py
+# Tests of the simulation artifact store: lookups, locking and eviction.
+
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+        __file__))))
+
+import sim_cache
+from sim_cache import ArtifactStore, hash_key
+
+class ArtifactStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.root = os.path.join(self.tmp, "cache")
+        self.grace = sim_cache.EVICT_GRACE
+        sim_cache.EVICT_GRACE = 0
+        # entries put by put() look unused for hours
+        self.used = time.time() - 10000
+
+    def tearDown(self):
+        sim_cache.EVICT_GRACE = self.grace
+        shutil.rmtree(self.tmp)
+
+    def put(self, store, key, size=100):
+        """Puts an entry of one file of size bytes, last used after every
+        entry put so far but hours ago, and releases it."""
+        src = os.path.join(self.tmp, "dump.vcd")
+        with open(src, "w") as fh:
+            fh.write(key[0] * size)
+        path = store.put(key, {"dump.vcd": src})
+        store.release()
+        self.used += 1
+        os.utime(path, (self.used, self.used))
+        return path
+
+    def keys(self, store):
+        return sorted(name for name in os.listdir(store.dir)
+                      if not name.startswith("."))
+
+    def test_get_and_put(self):
+        store = ArtifactStore(self.root, 1000)
+        self.assertEqual(store.get("a"), None)
+        path = self.put(store, "a")
+        self.assertEqual(store.get("a"), path)
+        with open(os.path.join(path, "dump.vcd")) as fh:
+            self.assertEqual(fh.read(), "a" * 100)
+        store.release()
+        self.assertEqual(store.held, {})
+
+    def test_keys(self):
+        self.assertNotEqual(hash_key("ab", "c"), hash_key("a", "bc"))
+        self.assertEqual(hash_key("a", 1), hash_key("a", "1"))
+
+    def test_least_recently_used_evicted(self):
+        store = ArtifactStore(self.root, 250)
+        for key in ("a", "b"):
+            self.put(store, key)
+        # a is used again, so b is the least recently used
+        store.get("a")
+        store.release()
+        self.put(store, "c")
+        self.assertEqual(self.keys(store), ["a", "c"])
+
+    def test_limit_shared_by_namespaces(self):
+        sims = ArtifactStore(self.root, 250)
+        simv = sims.sub("simv")
+        self.put(simv, "a")
+        self.put(sims, "b")
+        self.put(sims, "c")
+        self.assertEqual(self.keys(simv), [])
+        self.assertEqual(self.keys(sims), ["b", "c"])
+        self.put(simv, "d")
+        self.assertEqual((self.keys(sims), self.keys(simv)), (["c"], ["d"]))
+
+    def test_held_entries_not_evicted(self):
+        store = ArtifactStore(self.root, 150)
+        self.put(store, "a")
+        # Another run uses a, so b and c cannot both be kept
+        other = ArtifactStore(self.root, 150)
+        self.assertNotEqual(other.get("a"), None)
+        self.put(store, "b")
+        self.assertEqual(self.keys(store), ["a", "b"])
+        other.release()
+        self.put(store, "c")
+        self.assertEqual(self.keys(store), ["c"])
+
+    def test_recent_entries_not_evicted(self):
+        sim_cache.EVICT_GRACE = 3600
+        store = ArtifactStore(self.root, 150)
+        self.put(store, "a")
+        path = self.put(store, "b")
+        os.utime(path, None)
+        store.put("c", {"dump.vcd": os.path.join(self.tmp, "dump.vcd")})
+        self.assertEqual(self.keys(store), ["b", "c"])
+
+    def test_locks_stay_with_their_process(self):
+        store = ArtifactStore(self.root, 1000)
+        self.put(store, "a")
+        store.get("a")
+        copy = pickle.loads(pickle.dumps(store))
+        self.assertEqual(copy.held, {})
+        self.assertEqual(copy.get("a"), store.get("a"))
+        copy.release()
+        store.release()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+# test_simv_cache.py
+# Tests of the reuse of compiled simulators through the artifact store.
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+        __file__))))
+
+import fake_vcs
+from sim_cache import ArtifactStore
+from sv2v_test import compile_simv, generate_vcd, vcs_command
+
+VCD = """$timescale 1ns $end
+$scope module top $end
+$var wire 1 ! a $end
+$upscope $end
+$enddefinitions $end
+#0
+{}!
+"""
+
+class SimvCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.tmp, "bin"))
+        self.path = fake_vcs.install(os.path.join(self.tmp, "bin"))
+        self.log = os.path.join(self.tmp, "vcs.log")
+        os.environ["FAKE_VCS_LOG"] = self.log
+        self.cache = ArtifactStore(os.path.join(self.tmp, "cache"))
+        self.design = self.write("design.sv", VCD.format(1))
+        self.tb = self.write("top.sv", "")
+
+    def tearDown(self):
+        os.environ["PATH"] = self.path
+        del os.environ["FAKE_VCS_LOG"]
+        self.cache.release()
+        shutil.rmtree(self.tmp)
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp, name)
+        with open(path, "w") as fh:
+            fh.write(text)
+        return path
+
+    def compiles(self):
+        if not os.path.exists(self.log):
+            return []
+        with open(self.log) as fh:
+            return fh.read().split()
+
+    def compile(self, design, tb=None):
+        tb = self.tb if (tb == None) else tb
+        work_dir = tempfile.mkdtemp(dir=self.tmp)
+        with redirect_stdout(StringIO()):
+            return compile_simv(design, tb, vcs_command(design, tb), work_dir,
+                    self.cache)
+
+    def test_compiled_once(self):
+        simv = self.compile(self.design)
+        self.assertTrue(simv.startswith(self.cache.root))
+        self.assertEqual(self.compile(self.design), simv)
+        self.assertEqual(self.compiles(), ["design.sv"])
+        work_dir = tempfile.mkdtemp(dir=self.tmp)
+        subprocess.check_call([simv], cwd=work_dir)
+        with open(os.path.join(work_dir, "dump.vcd")) as fh:
+            self.assertEqual(fh.read(), VCD.format(1))
+
+    def test_keyed_by_contents_not_paths(self):
+        self.compile(self.design)
+        self.compile(shutil.copy(self.design, os.path.join(self.tmp,
+                "copy.sv")))
+        self.assertEqual(self.compiles(), ["design.sv"])
+        self.compile(self.write("other.sv", VCD.format(0)))
+        self.compile(self.design, self.write("top2.sv", "// new tb\n"))
+        self.assertEqual(self.compiles(), ["design.sv", "other.sv",
+                "design.sv"])
+
+    def test_simulated_again_without_compiling(self):
+        with redirect_stdout(StringIO()):
+            vcd1 = generate_vcd(self.design, self.tb, "a.vcd",
+                    tempfile.mkdtemp(dir=self.tmp), self.cache)
+        self.cache.release()
+        # The dump is evicted, the simulator is not
+        shutil.rmtree(os.path.dirname(vcd1))
+        out = StringIO()
+        with redirect_stdout(out):
+            vcd2 = generate_vcd(self.design, self.tb, "a.vcd",
+                    tempfile.mkdtemp(dir=self.tmp), self.cache)
+        self.assertIn("Using compiled simulator of design.sv",
+                out.getvalue())
+        self.assertEqual(self.compiles(), ["design.sv"])
+        with open(vcd2) as fh:
+            self.assertEqual(fh.read(), VCD.format(1))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+# test_stream_compare.py
+# Tests of the lockstep comparison of two VCD streams.
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+        __file__))))
+
+import Verilog_VCD as vcd
+from sv2v_test import compare_vcd_files, stream_compare_vcd, top_level_nets
+
+HEADER = """$timescale 1ns $end
+$scope module top $end
+$var wire 1 ! a $end
+$var wire 4 " b $end
+$upscope $end
+$enddefinitions $end
+"""
+
+def write_vcd(path, changes):
+    """Writes a VCD file of module top, with a 1-bit a (!) and a 4-bit b (").
+
+    Args:
+        path (str):                         path of the file
+        changes ([(int, [(str, str)])]):    (time, [(code, value)]) blocks
+
+    Returns:
+        None
+    """
+    with open(path, "w") as fh:
+        fh.write(HEADER)
+        for (time, block) in changes:
+            fh.write("#{}\n".format(time))
+            for (code, value) in block:
+                if (code == "\""):
+                    fh.write("b{} {}\n".format(value, code))
+                else:
+                    fh.write("{}{}\n".format(value, code))
+
+class StreamCompareTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.vcd1 = os.path.join(self.tmp, "a.vcd")
+        self.vcd2 = os.path.join(self.tmp, "b.vcd")
+        write_vcd(self.vcd1, [(0, [("!", "0"), ("\"", "0000")]),
+                (10, [("!", "1")]), (20, [("\"", "0101")]),
+                (30, [("!", "0"), ("\"", "1111")])])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def compare(self, **kwargs):
+        scope = vcd.scope_exact("top")
+        with vcd.VCDStream(self.vcd1, scope=scope) as stream1, \
+                vcd.VCDStream(self.vcd2, scope=scope) as stream2:
+            return stream_compare_vcd(stream1, stream2,
+                    top_level_nets(stream1.data, "top"),
+                    top_level_nets(stream2.data, "top"), **kwargs)
+
+    def test_identical_files(self):
+        shutil.copy(self.vcd1, self.vcd2)
+        self.assertEqual(self.compare(), ([], None))
+
+    def test_values_compared_by_their_bits(self):
+        write_vcd(self.vcd2, [(0, [("!", "0"), ("\"", "0")]),
+                (10, [("!", "1")]), (20, [("\"", "101")]),
+                (30, [("!", "0"), ("\"", "1111")])])
+        self.assertEqual(self.compare(), ([], None))
+
+    def test_first_divergence(self):
+        write_vcd(self.vcd2, [(0, [("!", "0"), ("\"", "0000")]),
+                (10, [("!", "1")]), (20, [("\"", "0111")]),
+                (30, [("!", "1"), ("\"", "1111")])])
+        (diff_list, first_diff) = self.compare()
+        self.assertEqual(diff_list, ["top.a", "top.b"])
+        self.assertEqual(first_diff, (20, [("top.b", "0101", "0111")]))
+
+    def test_fail_fast_stops_at_first_divergence(self):
+        write_vcd(self.vcd2, [(0, [("!", "0"), ("\"", "0000")]),
+                (10, [("!", "1")]), (20, [("\"", "0111")]),
+                (30, [("!", "1"), ("\"", "1111")])])
+        (diff_list, first_diff) = self.compare(fail_fast=True)
+        self.assertEqual(diff_list, ["top.b"])
+        self.assertEqual(first_diff[0], 20)
+
+    def test_change_at_a_time_missing_from_the_other_file(self):
+        # b changes at 25 instead of 20, so it differs at both times
+        write_vcd(self.vcd2, [(0, [("!", "0"), ("\"", "0000")]),
+                (10, [("!", "1")]), (25, [("\"", "0101")]),
+                (30, [("!", "0"), ("\"", "1111")])])
+        (diff_list, first_diff) = self.compare()
+        self.assertEqual(diff_list, ["top.b"])
+        self.assertEqual(first_diff, (20, [("top.b", "0101", "0000")]))
+
+    def test_trailing_changes(self):
+        write_vcd(self.vcd2, [(0, [("!", "0"), ("\"", "0000")]),
+                (10, [("!", "1")]), (20, [("\"", "0101")]),
+                (30, [("!", "0"), ("\"", "1111")]), (40, [("!", "1")])])
+        (diff_list, first_diff) = self.compare()
+        self.assertEqual(diff_list, ["top.a"])
+        self.assertEqual(first_diff, (40, [("top.a", "0", "1")]))
+
+    def test_time_window(self):
+        write_vcd(self.vcd2, [(0, [("!", "1"), ("\"", "0000")]),
+                (10, [("!", "1")]), (20, [("\"", "0101")]),
+                (30, [("!", "0"), ("\"", "1111")])])
+        self.assertNotEqual(self.compare()[1], None)
+        self.assertEqual(self.compare(start=15), ([], None))
+
+class CompareFilesTest(StreamCompareTest):
+    def compare(self, fail_fast=False, start=None):
+        result = compare_vcd_files(self.vcd1, self.vcd2, "top", fail_fast,
+                start)
+        first_diff = None
+        if (result.first_diff_time != None):
+            first_diff = (result.first_diff_time, result.first_diff)
+        self.assertEqual(result.equivalent, first_diff == None)
+        return (result.signals, first_diff)
+
+    def test_missing_signals(self):
+        with open(self.vcd2, "w") as fh:
+            fh.write(HEADER.replace(" b ", " c "))
+        result = compare_vcd_files(self.vcd1, self.vcd2, "top")
+        self.assertFalse(result.equivalent)
+        self.assertEqual((result.only_in1, result.only_in2),
+                (["top.b"], ["top.c"]))
+
+if __name__ == "__main__":
+    unittest.main()
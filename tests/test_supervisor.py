@@ -0,0 +1,152 @@
+# test_supervisor.py
+# Tests of the supervision of simulations and of their adaptive timeouts.
+
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+        __file__))))
+
+import supervisor
+from supervisor import DurationHistory, Supervisor
+
+def python(code):
+    """Returns the command line running Python code in a child."""
+    return [sys.executable, "-c", code]
+
+def gone(pid):
+    """Checks whether a process has exited, also if nothing reaps it."""
+    try:
+        with open("/proc/{}/stat".format(pid)) as fh:
+            return fh.read().rsplit(")", 1)[1].split()[0] == "Z"
+    except (IOError, OSError):
+        return True
+
+class SupervisorTest(unittest.TestCase):
+    def test_exit_codes(self):
+        sup = Supervisor()
+        child = sup.wait(sup.spawn(python("import sys; sys.exit(3)"), 10))
+        self.assertEqual(child.returncode, 3)
+        self.assertFalse(child.timed_out)
+        self.assertTrue(0 < child.duration < 10)
+        self.assertNotEqual(child.rusage, None)
+
+    def test_children_in_exit_order(self):
+        sup = Supervisor()
+        slow = sup.spawn(python("import time; time.sleep(0.5)"))
+        fast = sup.spawn(python("pass"))
+        self.assertEqual(sup.wait_all(), [fast, slow])
+        self.assertEqual(sup.children, [])
+
+    def test_timeout_terminates(self):
+        sup = Supervisor(grace=10)
+        child = sup.wait(sup.spawn(python("import time; time.sleep(30)"),
+                0.5))
+        self.assertTrue(child.timed_out)
+        self.assertEqual(child.returncode, -signal.SIGTERM)
+        self.assertTrue(child.duration < 10)
+
+    def test_killed_after_grace_period(self):
+        sup = Supervisor(grace=0.5)
+        start = time.monotonic()
+        child = sup.wait(sup.spawn(python(
+                "import signal, time\n"
+                "signal.signal(signal.SIGTERM, signal.SIG_IGN)\n"
+                "time.sleep(30)\n"), 1))
+        self.assertTrue(child.timed_out)
+        self.assertEqual(child.returncode, -signal.SIGKILL)
+        self.assertTrue(1.5 <= time.monotonic() - start < 10)
+
+    def test_whole_process_group_killed(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            pid_file = os.path.join(tmp, "pid")
+            sup = Supervisor(grace=0.5)
+            sup.wait(sup.spawn(python(
+                    "import subprocess, sys, time\n"
+                    "p = subprocess.Popen([sys.executable, '-c', "
+                    "'import time; time.sleep(30)'])\n"
+                    "open({!r}, 'w').write(str(p.pid))\n"
+                    "time.sleep(30)\n".format(pid_file)), 1))
+            with open(pid_file) as fh:
+                pid = int(fh.read())
+            deadline = time.monotonic() + 5
+            while not gone(pid) and time.monotonic() < deadline:
+                time.sleep(0.05)
+            self.assertTrue(gone(pid))
+        finally:
+            shutil.rmtree(tmp)
+
+    def test_kill_all(self):
+        sup = Supervisor()
+        children = [sup.spawn(python("import time; time.sleep(30)"))
+                    for n in range(2)]
+        sup.kill_all()
+        self.assertEqual(sup.children, [])
+        for child in children:
+            self.assertEqual(child.returncode, -signal.SIGKILL)
+
+class WatcherSupervisorTest(SupervisorTest):
+    """Same tests, with a watcher thread per child instead of pidfds."""
+    def setUp(self):
+        self.pidfd_open = getattr(os, "pidfd_open", None)
+        if (self.pidfd_open != None):
+            del os.pidfd_open
+
+    def tearDown(self):
+        if (self.pidfd_open != None):
+            os.pidfd_open = self.pidfd_open
+
+class DurationHistoryTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.history = DurationHistory(os.path.join(self.tmp, "cache",
+                "durations.json"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_default_without_history(self):
+        self.assertEqual(self.history.timeout("a", 10), 10)
+        self.history.record("b", 4)
+        self.assertEqual(self.history.timeout("a", 10), 10)
+
+    def test_multiple_of_longest_duration(self):
+        for duration in (4, 7.5, 2):
+            self.history.record("a", duration)
+        self.assertEqual(self.history.timeout("a", 10),
+                supervisor.ADAPT_FACTOR * 7.5)
+
+    def test_lower_bound(self):
+        self.history.record("a", 0.01)
+        self.assertEqual(self.history.timeout("a", 10), supervisor.ADAPT_MIN)
+
+    def test_only_recent_durations_kept(self):
+        self.history.record("a", 100)
+        for n in range(supervisor.HISTORY_LEN):
+            self.history.record("a", 2)
+        self.assertEqual(self.history.timeout("a", 10),
+                supervisor.ADAPT_FACTOR * 2)
+
+    def test_unreadable_history(self):
+        os.mkdir(os.path.dirname(self.history.path))
+        with open(self.history.path, "w") as fh:
+            fh.write("{not json")
+        self.assertEqual(self.history.timeout("a", 10), 10)
+        self.history.record("a", 4)
+        self.assertEqual(self.history.timeout("a", 10),
+                supervisor.ADAPT_FACTOR * 4)
+
+    def test_unwritable_history(self):
+        history = DurationHistory(os.path.join(self.tmp, "file", "d.json"))
+        open(os.path.join(self.tmp, "file"), "w").close()
+        history.record("a", 4)
+        self.assertEqual(history.timeout("a", 10), 10)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+# test_time_index.py
+# Tests that VCDStream.changes() reports the same changes from a time index
+# checkpoint as from the start of the file.
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+        __file__))))
+
+import Verilog_VCD as vcd
+
+GOOD = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(
+        __file__))), "examples", "good.vcd")
+TOP = "hamFix_test"
+WINDOWS = [(0, None), (1000, None), (1000, 5000), (9999, 12000),
+           (20000, None), (20000, 20400), (30000, None)]
+
+class TimeIndexTest(unittest.TestCase):
+    def changes(self, index, codes=None):
+        """Returns the changes of every window, read through the index, or
+        from the start of the file if index is None."""
+        windows = []
+        for (start, end) in WINDOWS:
+            with vcd.VCDStream(GOOD, scope=vcd.scope_exact(TOP),
+                    time_index=index) as stream:
+                if (codes == None):
+                    windows.append(list(stream.changes(None, start, end)))
+                else:
+                    windows.append(list(stream.changes(stream.data, start,
+                            end)))
+        return windows
+
+    def test_checkpoints(self):
+        index = vcd.build_time_index(GOOD, 2000, TOP)
+        self.assertTrue(len(index) > 5)
+        self.assertEqual(list(index.times), sorted(index.times))
+
+    def test_scope_codes_from_checkpoints(self):
+        index = vcd.build_time_index(GOOD, 2000, TOP)
+        with vcd.VCDStream(GOOD, scope=vcd.scope_exact(TOP),
+                time_index=index) as stream:
+            self.assertTrue(stream._indexed(stream.data))
+        self.assertEqual(self.changes(index, "data"),
+                self.changes(None, "data"))
+
+    def test_all_codes_without_scope_index(self):
+        # nested scopes are not in the checkpoints, so they are not used
+        index = vcd.build_time_index(GOOD, 2000, TOP)
+        with vcd.VCDStream(GOOD, time_index=index) as stream:
+            self.assertFalse(stream._indexed(None))
+        self.assertEqual(self.changes(index), self.changes(None))
+
+    def test_all_codes_from_index_of_all_signals(self):
+        index = vcd.build_time_index(GOOD, 2000)
+        with vcd.VCDStream(GOOD, time_index=index) as stream:
+            self.assertTrue(stream._indexed(None))
+        self.assertEqual(self.changes(index), self.changes(None))
+
+if __name__ == "__main__":
+    unittest.main()
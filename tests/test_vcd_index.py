@@ -0,0 +1,97 @@
+# test_vcd_index.py
+# Tests of the sidecar binary index of parse_vcd_cached.
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+        __file__))))
+
+import Verilog_VCD as vcd
+
+VCD = b"""$timescale 1ns $end
+$scope module top $end
+$var wire 1 ! clk $end
+$var wire 4 " data [3:0] $end
+$scope module sub $end
+$var wire 1 # en $end
+$upscope $end
+$upscope $end
+$enddefinitions $end
+#0
+0!
+b0 "
+0#
+#5
+1!
+b1\xe9 "
+#10
+0!
+b1010 "
+1#
+"""
+
+def tv_lists(data):
+    """Returns {code: [(time, value)]} of a parsed VCD file."""
+    return dict((code, list(data[code]["tv"])) for code in data)
+
+class IndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.vcd = os.path.join(self.tmp, "a.vcd")
+        with open(self.vcd, "wb") as fh:
+            fh.write(VCD)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_round_trip(self):
+        parsed = vcd.parse_vcd(self.vcd)
+        first = vcd.parse_vcd_cached(self.vcd)
+        self.assertTrue(os.path.exists(vcd.index_path(self.vcd)))
+        second = vcd.parse_vcd_cached(self.vcd)
+        self.assertIsInstance(second["!"].times, memoryview)
+        for data in (first, second):
+            self.assertEqual(tv_lists(data), tv_lists(parsed))
+            for code in parsed:
+                self.assertEqual(data[code]["nets"], parsed[code]["nets"])
+
+    def test_non_ascii_values(self):
+        for n in range(2):
+            data = vcd.parse_vcd_cached(self.vcd)
+            self.assertEqual(tv_lists(data),
+                    tv_lists(vcd.parse_vcd(self.vcd)))
+            self.assertEqual(data["\""]["tv"][1], (5, "1\xe9"))
+
+    def test_scope_and_siglist_served_by_one_index(self):
+        vcd.parse_vcd_cached(self.vcd)
+        data = vcd.parse_vcd_cached(self.vcd, scope=vcd.scope_exact("top"))
+        self.assertEqual(sorted(data), ["!", "\""])
+        data = vcd.parse_vcd_cached(self.vcd, siglist=["top.sub.en"])
+        self.assertEqual(sorted(data), ["#"])
+
+    def test_changed_file_reparsed(self):
+        vcd.parse_vcd_cached(self.vcd)
+        with open(self.vcd, "ab") as fh:
+            fh.write(b"#15\n1!\n")
+        self.assertEqual(vcd.parse_vcd_cached(self.vcd)["!"]["tv"][-1],
+                (15, "1"))
+
+    def test_stale_key_ignored(self):
+        index = vcd.index_path(self.vcd)
+        vcd.write_index(index, "stale", vcd.parse_vcd(self.vcd, compact=1))
+        self.assertEqual(vcd.read_index(index, "stale")[0]["!"]["tv"][0],
+                (0, "0"))
+        self.assertEqual(vcd.read_index(index, vcd.file_key(self.vcd)), None)
+
+    def test_unwritable_index_is_skipped(self):
+        index = os.path.join(self.tmp, "missing", "a.vcd.idx")
+        data = vcd.parse_vcd_cached(self.vcd, cache_file=index)
+        self.assertFalse(os.path.exists(index))
+        self.assertEqual(tv_lists(data), tv_lists(vcd.parse_vcd(self.vcd)))
+
+if __name__ == "__main__":
+    unittest.main()